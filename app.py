@@ -1,5 +1,8 @@
+import importlib
 import streamlit as st
+import pandas as pd
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
 
 # --- 1. CONFIGURACIÓN DE PÁGINA ---
 st.set_page_config(
@@ -8,27 +11,62 @@ st.set_page_config(
     layout="wide"
 )
 
-# Importación de tus módulos
+# Importación de tus módulos (las páginas se importan al abrirlas, ver PAGINAS)
 from modulos import (
-    inicio, 
-    ubicaciones, 
-    directorio,
-    ventas, 
-    cobranza, 
-    credito, 
-    comisiones, 
-    gastos
+    datos,
+    sincronizacion,
+    almacen,
+    instrumentacion,
+    antiguedad,
+    devengo,
+    escrituras
 )
 
+# Opción del menú -> (módulo en modulos/, función que dibuja la página)
+PAGINAS = {
+    "🏠 Inicio": ("inicio", "render_inicio"),
+    "📍 Mapa de Lotes": ("ubicaciones", "render_ubicaciones"),
+    "👤 Directorio": ("directorio", "render_directorio"),
+    "📝 Ventas": ("ventas", "render_ventas"),
+    "💰 Cobranza": ("cobranza", "render_cobranza"),
+    "📊 Detalle de Crédito": ("credito", "render_detalle_credito"),
+    "🎖️ Comisiones": ("comisiones", "render_comisiones"),
+    "💸 Gastos": ("gastos", "render_gastos"),
+}
+
 # --- 2. CONEXIÓN A SUPABASE ---
 SUPABASE_URL = st.secrets["supabase_url"]
 SUPABASE_KEY = st.secrets["supabase_key"]
 
+QUERY_TIMEOUT = st.secrets.get("query_timeout", 15)
+
 @st.cache_resource
 def init_connection():
-    return create_client(SUPABASE_URL, SUPABASE_KEY)
+    # El límite del cliente HTTP libera el hilo de una consulta que ya pasó
+    # el timeout de datos.en_paralelo
+    return create_client(SUPABASE_URL, SUPABASE_KEY, options=ClientOptions(postgrest_client_timeout=QUERY_TIMEOUT))
 
 supabase = init_connection()
+datos.configurar(ttl=st.secrets.get("cache_ttl", 300), timeout=QUERY_TIMEOUT)
+
+# Modo de sincronización incremental (requiere sql/sincronizacion.sql).
+# Con "snapshot_path" la copia local se guarda en SQLite y sobrevive reinicios.
+SNAPSHOT_PATH = st.secrets.get("snapshot_path")
+SYNC_INCREMENTAL = st.secrets.get("sync_incremental", False) or bool(SNAPSHOT_PATH)
+
+@st.cache_resource
+def init_almacen(ruta):
+    return almacen.AlmacenSQLite(ruta) if ruta else almacen.AlmacenMemoria()
+
+if SYNC_INCREMENTAL:
+    sincronizacion.activar(supabase, init_almacen(SNAPSHOT_PATH))
+
+# Antigüedad calculada por worker.py (requiere sql/precalculos.sql); con el
+# mismo secreto Crédito toma el plan de pagos de la tabla plan_pagos y
+# Comisiones el devengo de comisiones_devengo
+if st.secrets.get("antiguedad_precalculada", False):
+    antiguedad.usar_precalculado()
+    devengo.usar_precalculado()
 
 # --- 3. ESTILOS PERSONALIZADOS ---
 st.markdown("""
@@ -48,54 +86,67 @@ with st.sidebar:
     st.markdown("<p style='text-align: center; color: #8892b0;'>Gestión Inmobiliaria</p>", unsafe_allow_html=True)
     st.markdown("---")
     
-    menu = st.radio(
-        "📂 Menú Principal",
-        ["🏠 Inicio", 
-         "📍 Mapa de Lotes", 
-         "👤 Directorio", 
-         "📝 Ventas", 
-         "💰 Cobranza", 
-         "📊 Detalle de Crédito", 
-         "🎖️ Comisiones", 
-         "💸 Gastos"]
-    )
+    menu = st.radio("📂 Menú Principal", list(PAGINAS))
     
     st.markdown("---")
     
     # BOTÓN DE ACTUALIZACIÓN MANUAL
     if st.button("🔄 Sincronizar Datos"):
-        st.cache_resource.clear()
+        if SYNC_INCREMENTAL:
+            # Solo se traen y se invalidan las tablas con cambios
+            sincronizacion.sincronizar(supabase)
+        else:
+            st.cache_resource.clear()
+            datos.limpiar_cache()
+        antiguedad.reiniciar()
+        devengo.reiniciar()
         st.rerun()
         
+    # Panel de diagnóstico (secreto "diagnostico"); apagado no añade costo
+    diagnostico = st.secrets.get("diagnostico", False) and st.toggle("🐞 Diagnóstico")
+
     st.caption("v2.1 - SQL Sync Active")
 
+if diagnostico:
+    traza = st.session_state.setdefault("traza", instrumentacion.Traza())
+    traza.nueva_corrida(menu)
+    instrumentacion.activar(traza)
+    cliente = instrumentacion.ClienteInstrumentado(supabase)
+else:
+    instrumentacion.desactivar()
+    cliente = supabase
+
 # --- 5. ENRUTADOR DE MÓDULOS ---
+# Avisos de las escrituras optimistas que terminaron desde la corrida anterior
+escrituras.revisar()
+
 try:
-    if menu == "🏠 Inicio":
-        inicio.render_inicio(supabase)
-        
-    elif menu == "📍 Mapa de Lotes":
-        # Usando el nombre de función que definimos en pasos anteriores
-        ubicaciones.render_ubicaciones(supabase)
-        
-    elif menu == "👤 Directorio":
-        directorio.render_directorio(supabase)
-        
-    elif menu == "📝 Ventas":
-        ventas.render_ventas(supabase)
-        
-    elif menu == "💰 Cobranza":
-        cobranza.render_cobranza(supabase)
-        
-    elif menu == "📊 Detalle de Crédito":
-        credito.render_detalle_credito(supabase)
-        
-    elif menu == "🎖️ Comisiones":
-        comisiones.render_comisiones(supabase)
-        
-    elif menu == "💸 Gastos":
-        gastos.render_gastos(supabase)
+    modulo, funcion = PAGINAS[menu]
+    with instrumentacion.fase("pagina"):
+        # Solo se importa la página que se va a mostrar; Python la deja en caché
+        pagina = importlib.import_module(f"modulos.{modulo}")
+        getattr(pagina, funcion)(cliente)
 
 except Exception as e:
     st.error(f"🚨 Error en la carga del módulo: {e}")
     st.info("Tip: Si acabas de hacer cambios en SQL, usa el botón 'Sincronizar Datos'.")
+
+# La página ya está dibujada: se espera a las escrituras en curso para avisar
+# cuando la base las confirme
+escrituras.revisar(esperar=escrituras.ESPERA_SEGUNDOS)
+
+# --- 6. PANEL DE DIAGNÓSTICO ---
+if diagnostico:
+    instrumentacion.desactivar()
+    eventos = traza.ultima_corrida()
+    with st.sidebar.expander("🐞 Última carga", expanded=True):
+        if eventos:
+            df_t = pd.DataFrame(eventos)
+            consultas = df_t[df_t["tipo"] == "consulta"]
+            c1, c2 = st.columns(2)
+            c1.metric("Consultas", len(consultas))
+            c2.metric("ms en red", f"{consultas['ms'].sum():,.0f}")
+            columnas = [c for c in ("tipo", "nombre", "ms", "filas", "bytes") if c in df_t]
+            st.dataframe(df_t[columnas], hide_index=True, use_container_width=True)
+        st.download_button("⬇️ Exportar traza", traza.exportar(), file_name="traza.jsonl",
+                           mime="application/x-ndjson")
@@ -0,0 +1,188 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks import sintetico
+from modulos import antiguedad, datos, buscador
+from modulos.cliente_local import ClienteLocal
+
+# --- BENCHMARKS SIN RED ---
+# Genera una cartera sintética por escala, la sirve con ClienteLocal y mide
+# las fases de carga y cálculo de cada página. El reporte es JSON para poder
+# compararlo entre versiones:
+#
+#   python -m benchmarks.ejecutar --escalas 1000 10000 --salida base.json
+#   python -m benchmarks.ejecutar --escalas 1000 10000 --comparar base.json
+
+
+def medir(funcion, repeticiones, antes=None):
+    tiempos, resultado = [], None
+    for _ in range(repeticiones):
+        if antes:
+            antes()
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return resultado, {
+        "min": min(tiempos),
+        "mediana": statistics.median(tiempos),
+        "max": max(tiempos),
+        "repeticiones": repeticiones,
+    }
+
+
+def _filas(resultado):
+    if isinstance(resultado, tuple):
+        resultado = resultado[0]
+    return len(resultado) if hasattr(resultado, "__len__") else None
+
+
+# --- FASES POR PÁGINA ---
+# Cada fase es (página, fase, función(cliente, contexto), en_frio). Las fases
+# llaman a los mismos cargadores que las páginas; las "en frío" vacían antes
+# de cada repetición la caché de datos y la antigüedad materializada.
+
+def _cartera_inicio(cliente, ctx):
+    ctx["cartera"] = antiguedad.cartera(cliente)
+    return ctx["cartera"]
+
+
+def _busqueda_inicio(cliente, ctx):
+    df = ctx["cartera"]
+    df["Lote"], df["Cliente"] = df["lote_ref"], df["cliente_nombre"].fillna("N/A")
+    return buscador.filtrar(df, "garcia m0", ["Cliente", "Lote"], "bench_cartera")
+
+
+def _carga_pagina(cliente, ctx):
+    # Cobranza y Crédito cargan lo mismo al abrir
+    res = datos.en_paralelo({
+        "ventas": lambda: datos.cargar_ventas(cliente),
+        "lotes": lambda: datos.cargar_lotes(cliente),
+    }, estricto=True)
+    ctx["ventas"], ctx["lotes"] = res["ventas"], res["lotes"]
+    return ctx["ventas"]
+
+
+def _carga_cobranza(cliente, ctx):
+    ctx["pagina"] = datos.pagina_pagos(cliente, 50)
+    return _carga_pagina(cliente, ctx)
+
+
+def _pagina_cobranza(cliente, ctx):
+    return datos.pagina_pagos(cliente, 50, ctx["pagina"][1])
+
+
+def _plan_credito(cliente, ctx):
+    return datos.plan_cartera(ctx["ventas"], ctx["lotes"])
+
+
+def _recibos_credito(cliente, ctx):
+    return datos.pagos_por_venta(cliente, ctx["ventas"]["id"].astype(int).tolist())
+
+
+def _en_frio():
+    datos.limpiar_cache()
+    antiguedad.reiniciar()
+
+
+FASES = [
+    ("inicio", "carga_fria", _cartera_inicio, True),
+    ("inicio", "carga_cache", _cartera_inicio, False),
+    ("inicio", "busqueda", _busqueda_inicio, False),
+    ("cobranza", "carga_fria", _carga_cobranza, True),
+    ("cobranza", "pagina_siguiente", _pagina_cobranza, True),
+    ("credito", "carga_fria", _carga_pagina, True),
+    ("credito", "plan_de_pagos", _plan_credito, False),
+    ("credito", "recibos", _recibos_credito, True),
+]
+
+
+def ejecutar(escalas, repeticiones, semilla):
+    resultados = []
+    for escala in escalas:
+        inicio = time.perf_counter()
+        cliente = ClienteLocal(sintetico.generar(escala, semilla))
+        print(f"[{escala:>7} contratos] datos generados en {time.perf_counter() - inicio:.2f}s "
+              f"({len(cliente.tablas['pagos'])} pagos)", file=sys.stderr)
+        ctx = {}
+        for pagina, fase, funcion, en_frio in FASES:
+            resultado, tiempos = medir(lambda: funcion(cliente, ctx), repeticiones,
+                                       _en_frio if en_frio else None)
+            resultados.append({"escala": escala, "pagina": pagina, "fase": fase,
+                               "filas": _filas(resultado), **tiempos})
+            print(f"  {pagina:<10} {fase:<18} {tiempos['mediana'] * 1000:10.2f} ms", file=sys.stderr)
+        _en_frio()
+    return resultados
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=Path(__file__).parent).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def comparar(actual, base, umbral):
+    # Devuelve las fases cuya mediana empeoró más que `umbral` (ej. 1.25 = +25%)
+    previos = {(r["escala"], r["pagina"], r["fase"]): r["mediana"] for r in base["resultados"]}
+    regresiones = []
+    for r in actual["resultados"]:
+        previo = previos.get((r["escala"], r["pagina"], r["fase"]))
+        if not previo:
+            continue
+        razon = r["mediana"] / previo
+        marca = "  <-- regresión" if razon > umbral else ""
+        print(f"{r['escala']:>7} {r['pagina']:<10} {r['fase']:<18} x{razon:6.2f}{marca}")
+        if razon > umbral:
+            regresiones.append(r)
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de Valle Mart con datos sintéticos")
+    parser.add_argument("--escalas", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", help="archivo JSON para guardar el reporte")
+    parser.add_argument("--comparar", help="reporte JSON previo contra el que comparar")
+    parser.add_argument("--umbral", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    reporte = {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "semilla": args.semilla,
+            "repeticiones": args.repeticiones,
+        },
+        "resultados": ejecutar(args.escalas, args.repeticiones, args.semilla),
+    }
+
+    texto = json.dumps(reporte, indent=2)
+    if args.salida:
+        Path(args.salida).write_text(texto)
+    else:
+        print(texto)
+
+    if args.comparar:
+        base = json.loads(Path(args.comparar).read_text())
+        if comparar(reporte, base, args.umbral):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+# --- GENERADOR DE CARTERA SINTÉTICA ---
+# Produce directorio, ubicaciones, ventas, pagos, gastos y comisiones
+# con proporciones parecidas a las reales para N contratos.
+
+LOTES_POR_MANZANA = 30
+MANZANAS_POR_ETAPA = 10
+CATEGORIAS_GASTO = ["Publicidad", "Comisiones", "Mantenimiento", "Papelería", "Servicios", "Sueldos", "Otros"]
+NOMBRES = ["José", "María", "Juan", "Guadalupe", "Luis", "Ana", "Carlos", "Lucía", "Jorge", "Sofía",
+           "Miguel", "Fernanda", "Andrés", "Valeria", "Ricardo", "Ximena"]
+APELLIDOS = ["Hernández", "García", "Martínez", "López", "González", "Pérez", "Rodríguez", "Sánchez",
+             "Ramírez", "Cruz", "Flores", "Gómez", "Morales", "Vázquez", "Jiménez", "Núñez"]
+
+
+def _registros(df):
+    return df.to_dict("records")
+
+
+def generar(contratos, semilla=42, hoy=None):
+    """Devuelve un dict tabla -> lista de filas para `contratos` ventas."""
+    rng = np.random.default_rng(semilla)
+    hoy = pd.Timestamp(hoy or datetime.now()).normalize()
+    marca = hoy.isoformat()
+
+    # --- Directorio ---
+    n_clientes = max(1, int(contratos * 0.85))
+    n_vendedores = max(1, contratos // 500 + 5)
+    nombres = (pd.Series(rng.choice(NOMBRES, n_clientes + n_vendedores)) + " "
+               + pd.Series(rng.choice(APELLIDOS, n_clientes + n_vendedores)) + " "
+               + pd.Series(rng.choice(APELLIDOS, n_clientes + n_vendedores)))
+    directorio = pd.DataFrame({
+        "id": np.arange(1, n_clientes + n_vendedores + 1),
+        "nombre": nombres + " " + pd.Series(np.arange(n_clientes + n_vendedores)).astype(str),
+        "tipo": ["Cliente"] * n_clientes + ["Vendedor"] * n_vendedores,
+        "telefono": pd.Series(rng.integers(5500000000, 9999999999, n_clientes + n_vendedores)).astype(str),
+        "correo": None,
+        "updated_at": marca,
+    })
+
+    # --- Ubicaciones (hay más lotes que ventas) ---
+    n_lotes = int(contratos * 1.25) + 1
+    i = np.arange(n_lotes)
+    por_etapa = LOTES_POR_MANZANA * MANZANAS_POR_ETAPA
+    precio = rng.choice([80000, 120000, 150000, 180000, 250000, 300000], n_lotes).astype(float)
+    ubicaciones = pd.DataFrame({
+        "id": i + 1,
+        "etapa": i // por_etapa + 1,
+        "manzana": (i % por_etapa) // LOTES_POR_MANZANA + 1,
+        "lote": i % LOTES_POR_MANZANA + 1,
+        "precio": precio,
+        "enganche_req": np.round(precio * rng.choice([0.1, 0.15, 0.2], n_lotes), 2),
+        "updated_at": marca,
+    })
+
+    # --- Ventas ---
+    lotes = rng.choice(n_lotes, contratos, replace=False)
+    dias_atras = rng.integers(0, 365 * 5, contratos)
+    plazo = rng.choice([12, 24, 36, 48, 60], contratos)
+    ventas = pd.DataFrame({
+        "id": np.arange(1, contratos + 1),
+        "ubicacion_id": lotes + 1,
+        "cliente_id": rng.integers(1, n_clientes + 1, contratos),
+        "vendedor_id": rng.integers(n_clientes + 1, n_clientes + n_vendedores + 1, contratos),
+        "fecha_venta": (hoy - pd.to_timedelta(dias_atras, unit="D")).strftime("%Y-%m-%d"),
+        "plazo": plazo,
+        "comision_monto": rng.choice([3000.0, 5000.0, 8000.0], contratos),
+        "updated_at": marca,
+    })
+
+    # --- Pagos: enganche + mensualidades con puntualidad variable por cliente ---
+    meses = np.minimum(dias_atras // 30, plazo)
+    puntualidad = rng.beta(5, 1.5, contratos)
+    pagadas = rng.binomial(meses, puntualidad)
+    precio_v = precio[lotes]
+    enganche_v = ubicaciones["enganche_req"].to_numpy()[lotes]
+    mensualidad = np.round((precio_v - enganche_v) / plazo, 2)
+
+    n_pagos = pagadas + 1
+    venta = np.repeat(np.arange(contratos), n_pagos)
+    inicio = np.concatenate([[0], np.cumsum(n_pagos)[:-1]])
+    num = np.arange(len(venta)) - np.repeat(inicio, n_pagos)
+    fecha = (pd.to_datetime(ventas["fecha_venta"]).to_numpy()[venta]
+             + (num * 30 + rng.integers(0, 10, len(venta))).astype("timedelta64[D]"))
+    pagos = pd.DataFrame({
+        "id": np.arange(1, len(venta) + 1),
+        "venta_id": venta + 1,
+        "monto": np.where(num == 0, enganche_v[venta], mensualidad[venta]),
+        "fecha": pd.to_datetime(np.minimum(fecha, hoy.to_datetime64())).strftime("%Y-%m-%d"),
+        "folio": ["R" + str(n).zfill(7) for n in range(1, len(venta) + 1)],
+        "comentarios": "",
+        "updated_at": marca,
+    })
+
+    # --- Gastos: ~20 por mes en los últimos 5 años ---
+    n_gastos = max(1, contratos // 10 + 1200)
+    gastos = pd.DataFrame({
+        "id": np.arange(1, n_gastos + 1),
+        "fecha": (hoy - pd.to_timedelta(rng.integers(0, 365 * 5, n_gastos), unit="D")).strftime("%Y-%m-%d"),
+        "categoria": rng.choice(CATEGORIAS_GASTO, n_gastos),
+        "monto": np.round(rng.gamma(2.0, 4000.0, n_gastos), 2),
+        "concepto": "Gasto sintético",
+        "notas": "",
+        "updated_at": marca,
+    })
+
+    # --- Comisiones pagadas: aprox. la mitad de lo generado ---
+    generado = ventas.groupby("vendedor_id")["comision_monto"].sum()
+    comisiones = pd.DataFrame({
+        "id": np.arange(1, len(generado) + 1),
+        "vendedor_id": generado.index,
+        "monto_pagado": np.round(generado.to_numpy() * rng.uniform(0.3, 0.8, len(generado)), 2),
+        "referencia": "SPEI",
+        "fecha_pago": hoy.strftime("%Y-%m-%d"),
+    })
+
+    return {
+        "directorio": _registros(directorio),
+        "ubicaciones": _registros(ubicaciones),
+        "ventas": _registros(ventas),
+        "pagos": _registros(pagos),
+        "gastos": _registros(gastos),
+        "comisiones_pagadas": _registros(comisiones),
+    }
@@ -0,0 +1,72 @@
+import json
+import sqlite3
+import threading
+
+# --- ALMACENES PARA LA COPIA LOCAL ---
+# Backends intercambiables donde la sincronización guarda el último estado
+# de cada tabla y su cursor. Todos exponen cargar() y guardar().
+
+
+class AlmacenMemoria:
+    # No persiste nada: cada proceso arranca con la copia vacía
+
+    def cargar(self):
+        return {}, {}
+
+    def guardar(self, tabla, filas=(), borrados=(), cursor=None):
+        pass
+
+
+class AlmacenSQLite:
+    # Copia persistente en un archivo SQLite: sobrevive reinicios del proceso
+    # y permite pintar el dashboard desde disco mientras se sincroniza.
+
+    def __init__(self, ruta):
+        self.ruta = str(ruta)
+        self._lock = threading.Lock()
+        with self._conectar() as con:
+            con.executescript("""
+                create table if not exists filas (
+                    tabla text not null,
+                    id integer not null,
+                    datos text not null,
+                    primary key (tabla, id)
+                );
+                create table if not exists cursores (
+                    tabla text primary key,
+                    marca text,
+                    ultimo_id integer
+                );
+            """)
+
+    def _conectar(self):
+        return sqlite3.connect(self.ruta, timeout=30)
+
+    def cargar(self):
+        snapshot, cursores = {}, {}
+        with self._lock, self._conectar() as con:
+            for tabla, marca, ultimo_id in con.execute("select tabla, marca, ultimo_id from cursores"):
+                snapshot.setdefault(tabla, {})
+                if marca is not None:
+                    cursores[tabla] = (marca, ultimo_id)
+            for tabla, id_fila, datos in con.execute("select tabla, id, datos from filas"):
+                snapshot.setdefault(tabla, {})[id_fila] = json.loads(datos)
+        return snapshot, cursores
+
+    def guardar(self, tabla, filas=(), borrados=(), cursor=None):
+        with self._lock, self._conectar() as con:
+            con.executemany(
+                "insert or replace into filas (tabla, id, datos) values (?, ?, ?)",
+                [(tabla, f["id"], json.dumps(f, default=str)) for f in filas],
+            )
+            con.executemany(
+                "delete from filas where tabla = ? and id = ?",
+                [(tabla, id_fila) for id_fila in borrados],
+            )
+            if cursor is not None:
+                con.execute(
+                    "insert or replace into cursores (tabla, marca, ultimo_id) values (?, ?, ?)",
+                    (tabla, cursor[0], cursor[1]),
+                )
+            else:
+                con.execute("insert or ignore into cursores (tabla) values (?)", (tabla,))
@@ -0,0 +1,135 @@
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from modulos import datos, finanzas, normalizacion
+
+# --- ANTIGÜEDAD DE CARTERA (MATERIALIZADA) ---
+# Una fila por venta con esperado, pagado, vencido, días de atraso y grupo.
+# Se arma completa y después cada escritura en pagos o ventas solo marca sus
+# contratos y en la siguiente lectura se recalculan esas filas. Al cambiar el
+# día se recalcula toda la cartera con lo que ya está en memoria, sin volver
+# a leer la base. Pasado el TTL de la caché se vuelve a leer completa (ver
+# datos.Pendientes).
+
+AL_DIA = "🟢 Al día"
+MORA = "🟡 Mora"
+CRITICO = "🔴 Crítico"
+DIAS_CRITICO = 60
+
+_BASE = ["id", "cliente_id", "cliente_nombre", "cliente_telefono", "lote_ref",
+         "fecha_venta", "plazo", "precio", "enganche_req", "pagado"]
+
+_snapshot = None
+_dia = None
+_precalculado = False
+_pendientes = datos.Pendientes()
+_lock_calculo = threading.Lock()
+
+
+def grupo(atraso):
+    atraso = np.asarray(atraso)
+    return np.select([atraso > DIAS_CRITICO, atraso > 0], [CRITICO, MORA], AL_DIA)
+
+
+def calcular(base, hoy):
+    mora = finanzas.calcular_mora(base, hoy)
+    df = base.copy()
+    df[["esperado", "monto_vencido", "atraso"]] = mora[["esperado", "monto_vencido", "atraso"]]
+    df["estatus"] = grupo(df["atraso"])
+    return df
+
+
+def _base(ventas, totales):
+    if ventas.empty:
+        return pd.DataFrame(columns=_BASE)
+    pagado = pd.DataFrame(totales, columns=["venta_id", "total_pagado"])
+    pagado = pagado.set_index("venta_id")["total_pagado"].astype(float)
+    df = ventas[_BASE[:-1]].copy()
+    df["pagado"] = df["id"].map(pagado).fillna(0.0)
+    return df.reset_index(drop=True)
+
+
+def leer(supabase, ids=None):
+    # Sin `ids` lee toda la cartera; con `ids` solo esos contratos
+    if ids is None:
+        res = datos.en_paralelo({
+            "ventas": lambda: datos.cargar_ventas(supabase),
+            "totales": lambda: datos.totales_por_venta(supabase),
+        }, estricto=True)
+        return _base(res["ventas"], res["totales"])
+    ids = tuple(sorted(int(i) for i in ids))
+    res = datos.en_paralelo({
+        "ventas": lambda: datos.consultar(supabase, "ventas", datos.SELECT_VENTAS, filtros=[("in_", "id", ids)]),
+        "totales": lambda: datos.consultar(supabase, "vista_totales_pagos", "venta_id, total_pagado",
+                                           filtros=[("in_", "venta_id", ids)]),
+    }, estricto=True)
+    return _base(normalizacion.aplanar_ventas(res["ventas"]), res["totales"])
+
+
+def usar_precalculado(activo=True):
+    # Arranca desde la tabla cartera_antiguedad que llena worker.py
+    global _precalculado
+    _precalculado = activo
+
+
+def _desde_precalculado(supabase, base, hoy):
+    # Toma del cálculo nocturno las filas del día que siguen vigentes y
+    # recalcula solo las que cambiaron (pagos o contrato) desde entonces
+    llaves = ["precio", "enganche_req", "plazo", "pagado"]
+    resultado = ["esperado", "monto_vencido", "atraso", "estatus"]
+    try:
+        filas = datos.consultar(supabase, "cartera_antiguedad", ", ".join(["venta_id", *llaves, *resultado, "fecha_corte"]))
+    except Exception:
+        return calcular(base, hoy)
+    pre = pd.DataFrame(filas, columns=["venta_id", *llaves, *resultado, "fecha_corte"]).set_index("venta_id")
+    pre = pre[pd.to_datetime(pre["fecha_corte"], errors="coerce") == hoy].reindex(base["id"])
+
+    vigente = pd.Series(pre["fecha_corte"].notna().to_numpy(), index=base.index)
+    for col in llaves:
+        actual = pd.to_numeric(base[col], errors="coerce").astype(float).fillna(0.0).to_numpy()
+        previo = pd.to_numeric(pre[col], errors="coerce").astype(float).fillna(0.0).to_numpy()
+        vigente &= np.abs(actual - previo) < 0.005
+
+    df = base.copy()
+    for col in resultado:
+        df[col] = pre[col].to_numpy()
+    for col in ("esperado", "monto_vencido", "atraso"):
+        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0)
+    if not vigente.all():
+        df.loc[~vigente, resultado] = calcular(base[~vigente], hoy)[resultado]
+    df["atraso"] = df["atraso"].astype(np.int64)
+    return df[_BASE + resultado]
+
+
+def reiniciar():
+    # Fuerza una lectura completa en la siguiente consulta (botón Sincronizar)
+    _pendientes.reiniciar()
+
+
+def cartera(supabase, hoy=None):
+    """Devuelve la antigüedad de toda la cartera, una fila por venta."""
+    global _snapshot, _dia
+    hoy = pd.Timestamp(hoy or datetime.now()).normalize()
+
+    with _lock_calculo:
+        completo, pendientes = _pendientes.tomar()
+        try:
+            if completo or _snapshot is None:
+                base = leer(supabase)
+                _snapshot = _desde_precalculado(supabase, base, hoy) if _precalculado else calcular(base, hoy)
+            else:
+                if pendientes:
+                    nuevas = calcular(leer(supabase, pendientes), hoy)
+                    _snapshot = pd.concat([_snapshot[~_snapshot["id"].isin(pendientes)], nuevas],
+                                          ignore_index=True)
+                if _dia != hoy:
+                    # Avance diario: solo cambian las columnas que dependen de la fecha
+                    _snapshot = calcular(_snapshot[_BASE], hoy)
+        except Exception:
+            _pendientes.reiniciar()
+            raise
+        _dia = hoy
+        return _snapshot.copy()
@@ -0,0 +1,157 @@
+import bisect
+import difflib
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+import pandas as pd
+
+# --- ÍNDICE DE BÚSQUEDA EN MEMORIA ---
+# Índice invertido por palabra sobre texto normalizado (minúsculas y sin
+# acentos). Cada palabra de la consulta debe coincidir por prefijo con alguna
+# palabra del registro; las que llevan dígitos (referencias de lote como
+# "M01") coinciden también por subcadena, como el filtro anterior, para que
+# "01" encuentre "M01". Si no hay coincidencias se intenta una búsqueda
+# aproximada para tolerar errores de captura.
+
+CORTE_APROXIMADO = 0.75
+MAX_INDICES = 32
+
+_RE_PALABRA = re.compile(r"[a-z0-9]+")
+_RE_DIGITO = re.compile(r"[0-9]")
+_indices = OrderedDict()   # (nombre, llaves del frame) -> IndiceBusqueda
+_lock = threading.Lock()
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def _palabras(texto):
+    # "M01-L02 | José Pérez" -> {"m01", "l02", "jose", "perez"}
+    return set(_RE_PALABRA.findall(normalizar(texto)))
+
+
+class IndiceBusqueda:
+    def __init__(self):
+        self._textos = {}          # id -> texto indexado
+        self._postings = {}        # palabra -> {ids}
+        self._vocabulario = []     # palabras ordenadas para buscar por prefijo
+        self._con_digitos = set()  # palabras con dígitos, para buscar por subcadena
+        self.huella = None
+
+    def agregar(self, id_registro, texto):
+        self.quitar(id_registro)
+        self._textos[id_registro] = texto
+        for palabra in _palabras(texto):
+            if palabra not in self._postings:
+                self._postings[palabra] = set()
+                bisect.insort(self._vocabulario, palabra)
+                if _RE_DIGITO.search(palabra):
+                    self._con_digitos.add(palabra)
+            self._postings[palabra].add(id_registro)
+
+    def quitar(self, id_registro):
+        texto = self._textos.pop(id_registro, None)
+        if texto is None:
+            return
+        for palabra in _palabras(texto):
+            ids = self._postings.get(palabra)
+            if ids is None:
+                continue
+            ids.discard(id_registro)
+            if not ids:
+                del self._postings[palabra]
+                self._vocabulario.pop(bisect.bisect_left(self._vocabulario, palabra))
+                self._con_digitos.discard(palabra)
+
+    def sincronizar(self, registros):
+        if not self._textos:
+            # Carga inicial: se ordena el vocabulario una sola vez
+            for id_registro, texto in registros.items():
+                self._textos[id_registro] = texto
+                for palabra in _palabras(texto):
+                    self._postings.setdefault(palabra, set()).add(id_registro)
+            self._vocabulario = sorted(self._postings)
+            self._con_digitos = {p for p in self._postings if _RE_DIGITO.search(p)}
+            return
+        # Aplica solo las diferencias contra lo ya indexado
+        for id_registro in self._textos.keys() - registros.keys():
+            self.quitar(id_registro)
+        for id_registro, texto in registros.items():
+            if self._textos.get(id_registro) != texto:
+                self.agregar(id_registro, texto)
+
+    def _por_prefijo(self, palabra):
+        ids = set()
+        i = bisect.bisect_left(self._vocabulario, palabra)
+        while i < len(self._vocabulario) and self._vocabulario[i].startswith(palabra):
+            ids |= self._postings[self._vocabulario[i]]
+            i += 1
+        return ids
+
+    def _por_subcadena(self, palabra):
+        ids = set()
+        for candidata in self._con_digitos:
+            if palabra in candidata:
+                ids |= self._postings[candidata]
+        return ids
+
+    def _por_inicial(self, palabra):
+        # Candidatos para la búsqueda aproximada: los errores de captura casi
+        # nunca están en la primera letra y así no se recorre todo el vocabulario
+        inicio = bisect.bisect_left(self._vocabulario, palabra[0])
+        fin = bisect.bisect_left(self._vocabulario, chr(ord(palabra[0]) + 1))
+        return self._vocabulario[inicio:fin]
+
+    def buscar(self, consulta):
+        resultado = None
+        for palabra in _palabras(consulta):
+            ids = self._por_subcadena(palabra) if _RE_DIGITO.search(palabra) else self._por_prefijo(palabra)
+            if not ids:
+                for cercana in difflib.get_close_matches(palabra, self._por_inicial(palabra), n=5, cutoff=CORTE_APROXIMADO):
+                    ids |= self._postings[cercana]
+            resultado = ids if resultado is None else resultado & ids
+            if not resultado:
+                return set()
+        return resultado if resultado is not None else set(self._textos)
+
+
+def buscar(nombre, registros, consulta, huella=None):
+    """Ids que coinciden con `consulta` en el índice `nombre`, al día con
+    `registros` (dict id -> texto, o función que lo construye). Si la huella
+    no cambió los registros no se construyen ni se recorren. El índice se
+    comparte entre sesiones: se actualiza y se consulta con el candado. Se
+    conservan los MAX_INDICES usados más recientemente."""
+    with _lock:
+        idx = _indices.get(nombre)
+        if idx is None:
+            idx = _indices[nombre] = IndiceBusqueda()
+            if len(_indices) > MAX_INDICES:
+                _indices.popitem(last=False)
+        _indices.move_to_end(nombre)
+        if huella is None or huella != idx.huella:
+            idx.sincronizar(registros() if callable(registros) else registros)
+            idx.huella = huella
+        return idx.buscar(consulta)
+
+
+def filtrar(df, consulta, columnas, nombre, clave="id"):
+    # Filtra `df` con el índice construido sobre `columnas`, conservando el
+    # orden. Cada frame (sus llaves) tiene su propio índice, así dos sesiones
+    # que filtran subconjuntos distintos con el mismo `nombre` no se lo
+    # reconstruyen una a la otra. La huella es el contenido de las columnas
+    # buscadas: los textos solo se arman cuando cambia.
+    if not consulta or df.empty:
+        return df
+
+    def registros():
+        textos = df[columnas[0]].astype(str)
+        for columna in columnas[1:]:
+            textos = textos + " " + df[columna].astype(str)
+        return dict(zip(df[clave], textos))
+    llaves = pd.util.hash_pandas_object(df[clave], index=False).to_numpy()
+    huella = int(pd.util.hash_pandas_object(df[[clave, *columnas]], index=False).to_numpy().sum())
+    indice = (nombre, int(llaves.sum()), len(llaves))
+    return df[df[clave].isin(buscar(indice, registros, consulta, huella))]
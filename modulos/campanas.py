@@ -0,0 +1,76 @@
+import threading
+import urllib.parse
+
+import pandas as pd
+
+from modulos import antiguedad, finanzas
+
+# --- CAMPAÑAS DE COBRANZA POR WHATSAPP ---
+# Arma mensaje y enlace wa.me por contrato con una plantilla por grupo de
+# atraso. Los enlaces se guardan por venta junto con una huella de los datos
+# que los forman (teléfono, saldo, días, plantilla) y solo se recalculan
+# cuando esa huella cambia.
+
+PLANTILLAS = {
+    antiguedad.AL_DIA: "Hola {cliente}, te contactamos de Valle Mart por tu lote {lote}. Saldo: ${saldo}.",
+    antiguedad.MORA: ("Hola {cliente}, te recordamos que tu lote {lote} en Valle Mart tiene un saldo "
+                      "vencido de ${saldo} ({dias} días). ¿Te ayudamos a ponerte al corriente?"),
+    antiguedad.CRITICO: ("Hola {cliente}, tu lote {lote} en Valle Mart tiene {dias} días de atraso y un "
+                         "saldo vencido de ${saldo}. Comunícate con nosotros para acordar tu pago."),
+}
+
+_enlaces = {}
+_lock = threading.Lock()
+
+
+def normalizar_telefonos(telefonos):
+    # Solo dígitos y lada 52 al frente, para toda la columna
+    tel = telefonos.astype("string").str.replace(r"\D", "", regex=True).fillna("")
+    return tel.where(tel.str.startswith("52"), "52" + tel)
+
+
+def enlaces(df, plantillas=None):
+    """Devuelve telefono, mensaje y enlace por fila de `df`.
+
+    `df` trae id, cliente_nombre, cliente_telefono, lote_ref, monto_vencido,
+    atraso y estatus (ver antiguedad.cartera). Una plantilla con campos
+    desconocidos levanta KeyError."""
+    plantillas = {**PLANTILLAS, **(plantillas or {})}
+    telefono = normalizar_telefonos(df["cliente_telefono"])
+    filas = zip(df["id"].tolist(), telefono.tolist(), df["cliente_nombre"].fillna("N/A").astype(str).tolist(),
+                df["lote_ref"].astype(str).tolist(), df["monto_vencido"].round(2).tolist(),
+                df["atraso"].astype(int).tolist(), df["estatus"].tolist())
+
+    mensajes, urls = [], []
+    with _lock:
+        for venta, tel, cliente, lote, saldo, dias, estatus in filas:
+            plantilla = plantillas.get(estatus, plantillas[antiguedad.AL_DIA])
+            huella = (tel, cliente, lote, saldo, dias, plantilla)
+            guardado = _enlaces.get(venta)
+            if guardado is None or guardado[0] != huella:
+                mensaje = plantilla.format(cliente=cliente, lote=lote, saldo=f"{saldo:,.2f}", dias=dias)
+                guardado = (huella, mensaje, f"https://wa.me/{tel}?text={urllib.parse.quote(mensaje)}")
+                _enlaces[venta] = guardado
+            mensajes.append(guardado[1])
+            urls.append(guardado[2])
+
+    return pd.DataFrame({"telefono": telefono, "mensaje": mensajes, "enlace": urls}, index=df.index)
+
+
+def cola_envio(df, plantillas=None):
+    # Contratos en Mora o Crítico con saldo vencido, del más atrasado al menos
+    deudores = df[df["estatus"].isin([antiguedad.MORA, antiguedad.CRITICO])
+                  & (df["monto_vencido"] > finanzas.TOLERANCIA_MORA)]
+    deudores = deudores.sort_values("atraso", ascending=False)
+    mensajes = enlaces(deudores, plantillas)
+    return pd.DataFrame({
+        "contrato": deudores["id"],
+        "cliente": deudores["cliente_nombre"],
+        "lote": deudores["lote_ref"],
+        "estatus": deudores["estatus"],
+        "dias_atraso": deudores["atraso"],
+        "saldo_vencido": deudores["monto_vencido"].round(2),
+        "telefono": mensajes["telefono"],
+        "mensaje": mensajes["mensaje"],
+        "enlace": mensajes["enlace"],
+    })
@@ -0,0 +1,383 @@
+import copy
+import re
+import threading
+from datetime import datetime, timezone
+
+# --- CLIENTE LOCAL (SUSTITUTO DE SUPABASE) ---
+# Imita la parte del cliente de supabase que usa la app:
+# table().select().eq().order().limit().execute(), insert/update/delete y
+# filtros or_ con la sintaxis de PostgREST y rpc() de las funciones en
+# FUNCIONES. Sirve para probar la sincronización y la copia local sin red.
+
+_RE_EMBEBIDO = re.compile(r"^(?:(\w+):)?(\w+)(?:!(\w+))?\((.*)\)$", re.S)
+
+
+class Respuesta:
+    def __init__(self, data):
+        self.data = data
+        self.count = len(data)
+
+
+def _ahora():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _separar(texto):
+    # Divide por comas de primer nivel (fuera de paréntesis y comillas)
+    partes, nivel, actual, comillas = [], 0, "", False
+    for c in texto:
+        if c == '"':
+            comillas = not comillas
+        elif not comillas and c == "(":
+            nivel += 1
+        elif not comillas and c == ")":
+            nivel -= 1
+        if c == "," and nivel == 0 and not comillas:
+            partes.append(actual.strip())
+            actual = ""
+        else:
+            actual += c
+    if actual.strip():
+        partes.append(actual.strip())
+    return partes
+
+
+def _convertir(valor_fila, objetivo):
+    # Los valores dentro de or_ llegan como texto; se comparan con el tipo de la fila
+    if not isinstance(objetivo, str):
+        return objetivo
+    objetivo = objetivo.strip('"')
+    if isinstance(valor_fila, bool):
+        return objetivo.lower() == "true"
+    if isinstance(valor_fila, (int, float)):
+        try:
+            return float(objetivo)
+        except ValueError:
+            return objetivo
+    return objetivo
+
+
+def _patron(texto, mayusculas):
+    texto = texto.strip('"')
+    regex = "".join(".*" if c in "*%" else re.escape(c) for c in texto)
+    return re.compile(f"^{regex}$", 0 if mayusculas else re.I | re.S)
+
+
+def _comparar(operador, valor, objetivo):
+    if operador == "in":
+        if isinstance(objetivo, str):
+            objetivo = [o.strip().strip('"') for o in objetivo.strip("()").split(",") if o.strip()]
+        return any(valor == _convertir(valor, o) for o in objetivo)
+    if operador == "is":
+        return valor is None if str(objetivo).lower() == "null" else valor == (str(objetivo).lower() == "true")
+    if operador in ("like", "ilike"):
+        return valor is not None and bool(_patron(str(objetivo), operador == "like").match(str(valor)))
+    objetivo = _convertir(valor, objetivo)
+    if operador == "eq":
+        return valor == objetivo
+    if operador == "neq":
+        return valor != objetivo
+    if valor is None:
+        return False
+    return {
+        "gt": valor > objetivo, "gte": valor >= objetivo,
+        "lt": valor < objetivo, "lte": valor <= objetivo,
+    }[operador]
+
+
+def _condicion(texto):
+    # Convierte una expresión de PostgREST ("a.eq.1,and(b.gt.2,c.lt.3)") en predicado
+    texto = texto.strip()
+    for logico, combinar in (("and", all), ("or", any)):
+        if texto.startswith(logico + "("):
+            hijos = [_condicion(t) for t in _separar(texto[len(logico) + 1:-1])]
+            return lambda fila, h=hijos, c=combinar: c(p(fila) for p in h)
+    columna, operador, valor = texto.split(".", 2)
+    negar = operador == "not"
+    if negar:
+        operador, valor = valor.split(".", 1)
+    return lambda fila: negar != _comparar(operador, fila.get(columna), valor)
+
+
+class _Llamada:
+    def __init__(self, cliente, funcion, parametros):
+        self._cliente, self._funcion, self._parametros = cliente, funcion, parametros
+
+    def execute(self):
+        with self._cliente._lock:
+            return Respuesta(FUNCIONES[self._funcion](self._cliente.tablas, **self._parametros))
+
+
+class _Consulta:
+    def __init__(self, cliente, tabla):
+        self._cliente = cliente
+        self._tabla = tabla
+        self._operacion = "select"
+        self._columnas = "*"
+        self._valores = None
+        self._filtros = []
+        self._orden = []
+        self._limite = None
+        self._desde = 0
+
+    # --- operaciones ---
+    def select(self, columnas="*", count=None):
+        self._operacion, self._columnas = "select", " ".join(columnas.split())
+        return self
+
+    def insert(self, valores):
+        self._operacion, self._valores = "insert", valores
+        return self
+
+    def update(self, valores):
+        self._operacion, self._valores = "update", valores
+        return self
+
+    def upsert(self, valores, on_conflict="", **_):
+        self._operacion, self._valores = "upsert", valores
+        self._conflicto = [c.strip() for c in on_conflict.split(",") if c.strip()] or ["id"]
+        return self
+
+    def delete(self):
+        self._operacion = "delete"
+        return self
+
+    # --- filtros ---
+    def _filtro(self, operador, columna, valor):
+        self._filtros.append(lambda fila: _comparar(operador, fila.get(columna), valor))
+        return self
+
+    def eq(self, columna, valor): return self._filtro("eq", columna, valor)
+    def neq(self, columna, valor): return self._filtro("neq", columna, valor)
+    def gt(self, columna, valor): return self._filtro("gt", columna, valor)
+    def gte(self, columna, valor): return self._filtro("gte", columna, valor)
+    def lt(self, columna, valor): return self._filtro("lt", columna, valor)
+    def lte(self, columna, valor): return self._filtro("lte", columna, valor)
+    def like(self, columna, valor): return self._filtro("like", columna, valor)
+    def ilike(self, columna, valor): return self._filtro("ilike", columna, valor)
+    def is_(self, columna, valor): return self._filtro("is", columna, valor)
+    def in_(self, columna, valores):
+        valores = list(valores)
+        if any(isinstance(v, str) for v in valores):
+            return self._filtro("in", columna, valores)
+        # Listas de ids: búsqueda en un set en lugar de comparar uno por uno
+        conjunto = set(valores)
+        self._filtros.append(lambda fila: fila.get(columna) in conjunto)
+        return self
+
+    def or_(self, expresion):
+        self._filtros.append(_condicion(f"or({expresion})"))
+        return self
+
+    def order(self, columna, desc=False):
+        self._orden.append((columna, desc))
+        return self
+
+    def limit(self, n):
+        self._limite = n
+        return self
+
+    def range(self, desde, hasta):
+        self._desde, self._limite = desde, hasta - desde + 1
+        return self
+
+    # --- ejecución ---
+    def _proyectar(self, fila, columnas):
+        if columnas == "*":
+            return dict(fila)
+        salida = {}
+        for col in _separar(columnas):
+            m = _RE_EMBEBIDO.match(col)
+            if col == "*":
+                salida.update(fila)
+            elif m:
+                alias, tabla, fk, sub = m.groups()
+                alias = alias or tabla
+                relacionada = self._cliente._buscar(tabla, fila.get(fk or f"{alias}_id"))
+                salida[alias] = self._proyectar(relacionada, sub) if relacionada else None
+            else:
+                salida[col] = fila.get(col)
+        return salida
+
+    def execute(self):
+        with self._cliente._lock:
+            if self._operacion != "select":
+                self._cliente._indices.clear()
+            return Respuesta(copy.deepcopy(getattr(self, f"_ejecutar_{self._operacion}")()))
+
+    def _coincide(self, fila):
+        return all(f(fila) for f in self._filtros)
+
+    def _ejecutar_select(self):
+        filas = [f for f in self._cliente._leer(self._tabla) if self._coincide(f)]
+        for columna, desc in reversed(self._orden):
+            filas.sort(key=lambda f: (f.get(columna) is None, f.get(columna)), reverse=desc)
+        fin = None if self._limite is None else self._desde + self._limite
+        return [self._proyectar(f, self._columnas) for f in filas[self._desde:fin]]
+
+    def _ejecutar_insert(self):
+        tabla = self._cliente.tablas.setdefault(self._tabla, [])
+        nuevas = self._valores if isinstance(self._valores, list) else [self._valores]
+        creadas = []
+        for valores in nuevas:
+            fila = dict(valores)
+            secuencias = self._cliente._secuencias
+            if self._tabla not in secuencias:
+                secuencias[self._tabla] = max((f["id"] for f in tabla), default=0)
+            if fila.get("id") is None:
+                secuencias[self._tabla] += 1
+                fila["id"] = secuencias[self._tabla]
+            secuencias[self._tabla] = max(secuencias[self._tabla], fila["id"])
+            fila["updated_at"] = _ahora()
+            tabla.append(fila)
+            creadas.append(fila)
+        return creadas
+
+    def _ejecutar_upsert(self):
+        tabla = self._cliente.tablas.setdefault(self._tabla, [])
+        existentes = {tuple(f.get(c) for c in self._conflicto): f for f in tabla}
+        actualizadas, nuevas = [], []
+        for valores in (self._valores if isinstance(self._valores, list) else [self._valores]):
+            fila = existentes.get(tuple(valores.get(c) for c in self._conflicto))
+            if fila is None:
+                nuevas.append(valores)
+            else:
+                fila.update(valores)
+                fila["updated_at"] = _ahora()
+                actualizadas.append(fila)
+        self._valores = nuevas
+        return actualizadas + self._ejecutar_insert()
+
+    def _ejecutar_update(self):
+        cambiadas = []
+        for fila in self._cliente.tablas.get(self._tabla, []):
+            if self._coincide(fila):
+                fila.update(self._valores)
+                fila["updated_at"] = _ahora()
+                cambiadas.append(fila)
+        return cambiadas
+
+    def _ejecutar_delete(self):
+        tabla = self._cliente.tablas.get(self._tabla, [])
+        borradas = [f for f in tabla if self._coincide(f)]
+        self._cliente.tablas[self._tabla] = [f for f in tabla if not self._coincide(f)]
+        return borradas
+
+
+# --- VISTAS DE LA BASE EMULADAS EN MEMORIA ---
+def _suma_por(filas, llave, campo):
+    totales = {}
+    for f in filas:
+        totales[f[llave]] = totales.get(f[llave], 0.0) + float(f.get(campo) or 0)
+    return totales
+
+
+def vista_totales_pagos(tablas):
+    resumen = {}
+    for p in tablas.get("pagos", []):
+        r = resumen.setdefault(p["venta_id"], {"venta_id": p["venta_id"], "total_pagado": 0.0,
+                                               "num_pagos": 0, "ultimo_pago": None})
+        r["total_pagado"] += float(p.get("monto") or 0)
+        r["num_pagos"] += 1
+        r["ultimo_pago"] = max(filter(None, [r["ultimo_pago"], p.get("fecha")]), default=None)
+    return list(resumen.values())
+
+
+def vista_estatus_lotes(tablas):
+    venta_por_lote = {v["ubicacion_id"]: v["id"] for v in tablas.get("ventas", [])}
+    pagado = _suma_por(tablas.get("pagos", []), "venta_id", "monto")
+    return [{
+        "ubicacion_id": u["id"], "etapa": u["etapa"], "manzana": u["manzana"], "lote": u["lote"],
+        "precio_lista": u["precio"], "enganche_req": u["enganche_req"],
+        "estatus_actual": "VENDIDO" if u["id"] in venta_por_lote else "DISPONIBLE",
+        "total_pagado": pagado.get(venta_por_lote.get(u["id"]), 0.0),
+    } for u in tablas.get("ubicaciones", [])]
+
+
+def vista_saldos_comisiones(tablas):
+    nombres = {d["id"]: d["nombre"] for d in tablas.get("directorio", [])}
+    generado = _suma_por([v for v in tablas.get("ventas", []) if v.get("vendedor_id")], "vendedor_id", "comision_monto")
+    pagado = _suma_por(tablas.get("comisiones_pagadas", []), "vendedor_id", "monto_pagado")
+    return [{
+        "vendedor_id": v, "vendedor_nombre": nombres.get(v),
+        "comision_total": generado.get(v, 0.0), "comision_pagada": pagado.get(v, 0.0),
+        "saldo_pendiente": generado.get(v, 0.0) - pagado.get(v, 0.0),
+    } for v in sorted(generado.keys() | pagado.keys())]
+
+
+def gastos_mensuales(tablas):
+    # En la base es una tabla que mantiene un trigger; aquí se calcula al leer
+    resumen = {}
+    for g in tablas.get("gastos", []):
+        llave = (str(g["fecha"])[:7] + "-01", g.get("categoria") or "Otros")
+        r = resumen.setdefault(llave, {"mes": llave[0], "categoria": llave[1], "total": 0.0, "num_gastos": 0})
+        r["total"] += float(g.get("monto") or 0)
+        r["num_gastos"] += 1
+    return [resumen[k] for k in sorted(resumen)]
+
+
+VISTAS = {
+    "vista_totales_pagos": vista_totales_pagos,
+    "vista_estatus_lotes": vista_estatus_lotes,
+    "vista_saldos_comisiones": vista_saldos_comisiones,
+    "gastos_mensuales": gastos_mensuales,
+}
+
+
+# --- FUNCIONES (equivalentes a las de sql/) ---
+def resumen_inventario(tablas, p_estatus=None, p_manzana_min=None, p_manzana_max=None,
+                       p_precio_min=None, p_precio_max=None):
+    etapas = {}
+    for f in vista_estatus_lotes(tablas):
+        if ((p_estatus is not None and f["estatus_actual"] != p_estatus)
+                or (p_manzana_min is not None and f["manzana"] < p_manzana_min)
+                or (p_manzana_max is not None and f["manzana"] > p_manzana_max)
+                or (p_precio_min is not None and f["precio_lista"] < p_precio_min)
+                or (p_precio_max is not None and f["precio_lista"] > p_precio_max)):
+            continue
+        r = etapas.setdefault(f["etapa"], {"etapa": f["etapa"], "total_lotes": 0, "disponibles": 0,
+                                           "valor_total": 0.0, "valor_disponible": 0.0})
+        disponible = f["estatus_actual"] == "DISPONIBLE"
+        r["total_lotes"] += 1
+        r["disponibles"] += disponible
+        r["valor_total"] += f["precio_lista"] or 0.0
+        r["valor_disponible"] += (f["precio_lista"] or 0.0) if disponible else 0.0
+    return [etapas[e] for e in sorted(etapas)]
+
+
+FUNCIONES = {
+    "resumen_inventario": resumen_inventario,
+}
+
+
+class ClienteLocal:
+    """Cliente en memoria con la interfaz de supabase. `tablas` es un dict
+    tabla -> lista de filas; `vistas` un dict vista -> función que recibe
+    las tablas y devuelve las filas de la vista (por defecto VISTAS)."""
+
+    def __init__(self, tablas=None, vistas=None):
+        self.tablas = {t: [dict(f) for f in filas] for t, filas in (tablas or {}).items()}
+        self.vistas = dict(VISTAS if vistas is None else vistas)
+        self._secuencias = {}
+        self._indices = {}
+        self._lock = threading.RLock()
+
+    def table(self, nombre):
+        return _Consulta(self, nombre)
+
+    def rpc(self, funcion, parametros=None):
+        return _Llamada(self, funcion, parametros or {})
+
+    def _leer(self, nombre):
+        if nombre in self.vistas:
+            return self.vistas[nombre](self.tablas)
+        return self.tablas.get(nombre, [])
+
+    def _buscar(self, tabla, id_fila):
+        if id_fila is None:
+            return None
+        if tabla in self.vistas:
+            return next((f for f in self._leer(tabla) if f.get("id") == id_fila), None)
+        if tabla not in self._indices:
+            self._indices[tabla] = {f["id"]: f for f in self.tablas.get(tabla, [])}
+        return self._indices[tabla].get(id_fila)
@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import time
+from modulos import datos, finanzas, importacion, buscador, instrumentacion, escrituras
 
 def render_cobranza(supabase):
     st.title("💰 Gestión de Cobranza")
@@ -9,24 +9,20 @@ def render_cobranza(supabase):
     # --- 1. CARGA DE DATOS ---
     try:
         # Cargamos ventas con datos de cliente y ubicación
-        res_v = supabase.table("ventas").select("""
-            id, ubicacion_id, cliente_id, plazo,
-            cliente:directorio!cliente_id(nombre),
-            ubicacion:ubicaciones(id, etapa, manzana, lote, precio, enganche_req)
-        """).execute()
-        df_v = pd.DataFrame(res_v.data)
-        
-        # Cargamos pagos
-        res_p = supabase.table("pagos").select("*").order("fecha", desc=True).execute()
-        df_p = pd.DataFrame(res_p.data)
-        if not df_p.empty:
-            df_p = df_p.rename(columns={'id': 'pago_id'})
+        with instrumentacion.fase("carga_datos"):
+            res = datos.en_paralelo({
+                "ventas": lambda: datos.cargar_ventas(supabase),
+                "lotes": lambda: datos.cargar_lotes(supabase),
+            }, estricto=True)
+        df_v = res["ventas"]
+        # Total pagado por lote para consultar cada selección sin ir a la base
+        pagado_por_lote = res["lotes"].set_index("ubicacion_id")["total_pagado"].fillna(0.0).to_dict() if not res["lotes"].empty else {}
 
         if not df_v.empty:
             # Preparar datos para la tabla de selección
-            df_v['Lote'] = df_v['ubicacion'].apply(lambda x: f"M{int(x['manzana']):02d}-L{int(x['lote']):02d}")
-            df_v['Cliente'] = df_v['cliente'].apply(lambda x: x['nombre'])
-            df_v['Precio'] = df_v['ubicacion'].apply(lambda x: float(x['precio'] or 0))
+            df_v['Lote'] = df_v['lote_ref']
+            df_v['Cliente'] = df_v['cliente_nombre']
+            df_v['Precio'] = df_v['precio'].fillna(0.0)
             # Para el selector interno
             df_v['display_vta'] = df_v['Lote'] + " | " + df_v['Cliente']
         
@@ -34,7 +30,8 @@ def render_cobranza(supabase):
         st.error(f"⚠️ Error cargando datos: {e}")
         return
 
-    tab_pago, tab_historial = st.tabs(["💵 Registrar Pago", "📋 Historial y Edición"])
+    tab_pago, tab_lote, tab_historial, tab_importar = st.tabs(
+        ["💵 Registrar Pago", "🧾 Captura por Lote", "📋 Historial y Edición", "📥 Importar Pagos"])
 
     # --- PESTAÑA 1: REGISTRAR PAGO (Estrategia de Selección) ---
     with tab_pago:
@@ -46,12 +43,7 @@ def render_cobranza(supabase):
             # FILTRO DE BÚSQUEDA
             search_name = st.text_input("🔍 Filtrar por nombre de cliente o lote:", placeholder="Ej: Juan Perez o M01")
             
-            df_filtrado = df_v.copy()
-            if search_name:
-                df_filtrado = df_filtrado[
-                    df_filtrado['Cliente'].str.contains(search_name, case=False) | 
-                    df_filtrado['Lote'].str.contains(search_name, case=False)
-                ]
+            df_filtrado = buscador.filtrar(df_v, search_name, ['Cliente', 'Lote'], "cobranza_ventas").copy()
 
             # TABLA DE SELECCIÓN
             event = st.dataframe(
@@ -73,21 +65,18 @@ def render_cobranza(supabase):
                 venta_id_real = int(v['id'])
                 ubicacion_id_real = int(v['ubicacion_id'])
                 
-                # Consultar estatus financiero actual del lote seleccionado
-                res_status = supabase.table("vista_estatus_lotes").select("*").eq("ubicacion_id", ubicacion_id_real).execute()
-                
-                if res_status.data:
-                    status = res_status.data[0]
+                # Estatus financiero del lote seleccionado (precargado con la página)
+                if ubicacion_id_real in pagado_por_lote:
                     precio_total = float(v['Precio'])
-                    eng_req = float(v['ubicacion']['enganche_req'] or 0)
-                    total_pagado = float(status.get('total_pagado') or 0)
-                    plazo_real = int(v.get('plazo') or 48)
+                    eng_req = float(v['enganche_req']) if pd.notna(v['enganche_req']) else 0.0
+                    total_pagado = float(pagado_por_lote[ubicacion_id_real])
+                    plazo_real = int(v['plazo']) if pd.notna(v['plazo']) and v['plazo'] else 48
                     
-                    faltante_eng = max(0.0, eng_req - total_pagado)
-                    saldo_total = max(0.0, precio_total - total_pagado)
-                    monto_a_financiar = precio_total - eng_req
-                    mensualidad = monto_a_financiar / plazo_real if plazo_real > 0 else 0
-                    pago_sugerido = faltante_eng if faltante_eng > 0 else mensualidad
+                    cobro = finanzas.resumen_cobro(precio_total, eng_req, total_pagado, plazo_real)
+                    faltante_eng = float(cobro["faltante_enganche"])
+                    saldo_total = float(cobro["saldo"])
+                    mensualidad = float(cobro["mensualidad"])
+                    pago_sugerido = float(cobro["pago_sugerido"])
 
                     st.markdown("---")
                     st.subheader(f"2. Detalles de Cobro: {v['Lote']}")
@@ -129,37 +118,122 @@ def render_cobranza(supabase):
                                 st.error("El monto debe ser mayor a 0.")
                             else:
                                 try:
-                                    supabase.table("pagos").insert({
+                                    escrituras.escribir(supabase, "pagos", "insert", {
                                         "venta_id": venta_id_real, 
                                         "monto": f_mon,
                                         "fecha": str(datetime.now().date()), 
                                         "folio": f_fol, 
                                         "comentarios": f_com
-                                    }).execute()
-                                    st.balloons()
-                                    st.success("💰 Pago registrado exitosamente")
-                                    time.sleep(1.5)
+                                    }, aviso=f"💰 Pago de ${f_mon:,.2f} registrado ({v['Lote']})")
                                     st.rerun()
                                 except Exception as e:
                                     st.error(f"Error: {e}")
             else:
                 st.info("👆 Seleccione un cliente de la tabla para ver su estado de cuenta y registrar pagos.")
 
-    # --- PESTAÑA 2: HISTORIAL Y EDICIÓN (Se mantiene funcional) ---
+    # --- PESTAÑA 2: CAPTURA POR LOTE (depósito del día) ---
+    with tab_lote:
+        st.subheader("🧾 Captura de recibos por lote")
+        if "captura_lote_aviso" in st.session_state:
+            st.success(st.session_state.pop("captura_lote_aviso"))
+
+        if df_v.empty:
+            st.warning("No hay ventas registradas.")
+        else:
+            # Saldos con lo que ya trajo la página: validar no cuesta consultas por fila
+            pagado_v = df_v['ubicacion_id'].map(pagado_por_lote).astype(float).fillna(0.0)
+            saldos = dict(zip(df_v['id'].astype(int), finanzas.saldo(df_v['Precio'], pagado_v)))
+            ventas_lote = dict(zip(df_v['display_vta'], df_v['id'].astype(int)))
+
+            version = st.session_state.setdefault("captura_lote_version", 0)
+            captura = st.data_editor(
+                pd.DataFrame({
+                    "venta": pd.Series(dtype="string"),
+                    "monto": pd.Series(dtype="float"),
+                    "folio": pd.Series(dtype="string"),
+                    "fecha": pd.Series(dtype="datetime64[ns]"),
+                    "comentarios": pd.Series(dtype="string"),
+                }),
+                column_config={
+                    "venta": st.column_config.SelectboxColumn("Venta (Lote | Cliente)", options=sorted(ventas_lote), required=True),
+                    "monto": st.column_config.NumberColumn("Monto ($)", min_value=0.0, format="%.2f"),
+                    "folio": "Folio",
+                    "fecha": st.column_config.DateColumn("Fecha", default=datetime.now().date(), format="DD/MM/YYYY"),
+                    "comentarios": "Comentarios",
+                },
+                num_rows="dynamic",
+                use_container_width=True,
+                hide_index=True,
+                key=f"captura_lote_{version}"
+            )
+
+            if captura.dropna(how="all").empty:
+                st.info("👆 Agregue una fila por recibo; la validación se hace al capturar.")
+            else:
+                # Solo se consultan en la base los folios de la captura
+                folios = tuple(sorted(set(captura['folio'].dropna().astype(str).str.strip()) - {""}))
+                try:
+                    existentes = {f["folio"] for f in datos.consultar(supabase, "pagos", "folio", filtros=[("in_", "folio", folios)])} if folios else set()
+                except Exception as e:
+                    st.error(f"⚠️ No se pudieron revisar los folios: {e}")
+                    existentes = set()
+                registros, errores = importacion.validar_captura_pagos(captura, ventas_lote, saldos, existentes)
+
+                c1, c2, c3 = st.columns(3)
+                c1.metric("Recibos válidos", len(registros))
+                c2.metric("Filas con error", len(errores))
+                c3.metric("Total a depositar", f"$ {sum(r['monto'] for r in registros):,.2f}")
+
+                if not errores.empty:
+                    st.dataframe(errores, column_config={"fila": "Fila", "error": "Error"},
+                                 use_container_width=True, hide_index=True)
+                    st.caption("Corrija las filas con error para registrar el lote.")
+
+                if st.button(f"✅ REGISTRAR {len(registros)} PAGOS", type="primary", use_container_width=True,
+                             disabled=not registros or not errores.empty):
+                    try:
+                        # Un solo insert en bloque y una sola invalidación al final
+                        datos.insertar_lote(supabase, "pagos", registros)
+                        st.session_state["captura_lote_version"] += 1
+                        st.session_state["captura_lote_aviso"] = (
+                            f"💰 {len(registros)} pagos registrados por $ {sum(r['monto'] for r in registros):,.2f}")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Error al registrar el lote: {e}")
+
+    # --- PESTAÑA 3: HISTORIAL Y EDICIÓN (Se mantiene funcional) ---
     with tab_historial:
-        if df_p.empty:
+        st.subheader("📋 Registro Global de Movimientos")
+        h1, h2 = st.columns([3, 1])
+        search_hist = h1.text_input("🔍 Buscar en historial (Folio o Cliente):")
+        tam_pagina = h2.selectbox("Filas por página", [25, 50, 100, 250], index=1)
+
+        # Reiniciar la paginación si cambia la búsqueda o el tamaño de página
+        clave_hist = (search_hist, tam_pagina)
+        if st.session_state.get("hist_clave") != clave_hist:
+            st.session_state["hist_clave"] = clave_hist
+            st.session_state["hist_cursores"] = [None]
+        cursores = st.session_state["hist_cursores"]
+
+        # Los clientes/lotes se resuelven a venta_id y el filtro viaja al servidor
+        venta_ids = None
+        if search_hist and not df_v.empty:
+            venta_ids = buscador.filtrar(df_v, search_hist, ['Cliente', 'Lote'], "cobranza_ventas")['id'].tolist()
+
+        try:
+            filas, siguiente = datos.pagina_pagos(supabase, tam_pagina, cursores[-1], folio=search_hist or None, venta_ids=venta_ids)
+        except Exception as e:
+            st.error(f"⚠️ Error cargando historial: {e}")
+            filas, siguiente = [], None
+
+        if not filas:
             st.info("No hay historial de pagos.")
         else:
-            df_historial = df_p.merge(df_v[['id', 'display_vta']], left_on='venta_id', right_on='id', how='left')
-            
-            st.subheader("📋 Registro Global de Movimientos")
-            search_hist = st.text_input("🔍 Buscar en historial (Folio o Cliente):")
-            
-            if search_hist:
-                df_historial = df_historial[
-                    df_historial['display_vta'].str.contains(search_hist, case=False) | 
-                    df_historial['folio'].str.contains(search_hist, case=False)
-                ]
+            df_historial = pd.DataFrame(filas).rename(columns={'id': 'pago_id'})
+            if not df_v.empty:
+                df_historial = df_historial.merge(df_v[['id', 'display_vta']], left_on='venta_id', right_on='id', how='left')
+            else:
+                df_historial['display_vta'] = "N/A"
 
             st.dataframe(
                 df_historial[['fecha', 'display_vta', 'monto', 'folio', 'comentarios']],
@@ -167,18 +241,31 @@ def render_cobranza(supabase):
                 use_container_width=True, hide_index=True
             )
 
+            n1, n2, n3 = st.columns([1, 2, 1])
+            if n1.button("◀ Anterior", disabled=len(cursores) == 1, use_container_width=True):
+                cursores.pop()
+                st.rerun()
+            n2.caption(f"Página {len(cursores)}")
+            if n3.button("Siguiente ▶", disabled=siguiente is None, use_container_width=True):
+                cursores.append(siguiente)
+                st.rerun()
+
             st.markdown("---")
-            # Selector de edición simplificado
-            df_historial['select_label'] = df_historial.apply(
-                lambda x: f"Folio: {x['folio']} | {x['display_vta']} | ${x['monto']:,.2f}", axis=1
-            )
+            # Selector de edición limitado a la página actual
+            etiquetas = dict(zip(
+                df_historial['pago_id'],
+                "Folio: " + df_historial['folio'].astype(str) + " | " + df_historial['display_vta'].astype(str)
+                + " | $" + df_historial['monto'].map("{:,.2f}".format)
+            ))
             
-            pago_a_editar = st.selectbox("✏️ Seleccione un pago para modificar/eliminar:", ["--"] + df_historial['select_label'].tolist())
+            pago_a_editar = st.selectbox("✏️ Seleccione un pago para modificar/eliminar:", ["--"] + list(etiquetas),
+                                         format_func=lambda x: etiquetas.get(x, x))
 
             if pago_a_editar != "--":
-                pago_data = df_historial[df_historial['select_label'] == pago_a_editar].iloc[0]
+                pago_data = df_historial[df_historial['pago_id'] == pago_a_editar].iloc[0]
                 p_id = pago_data['pago_id']
-
+                anterior = {"venta_id": int(pago_data['venta_id']), "monto": float(pago_data['monto']),
+                            "fecha": pago_data['fecha'], "folio": pago_data['folio']}
                 col1, col2 = st.columns([2, 1])
                 with col1:
                     with st.expander("Modificar Datos", expanded=True):
@@ -186,10 +273,17 @@ def render_cobranza(supabase):
                             new_fol = st.text_input("Folio", value=pago_data['folio'])
                             new_mon = st.number_input("Monto", value=float(pago_data['monto']))
                             if st.form_submit_button("Actualizar"):
-                                supabase.table("pagos").update({"folio": new_fol, "monto": new_mon}).eq("id", p_id).execute()
+                                escrituras.escribir(supabase, "pagos", "update", {"folio": new_fol, "monto": new_mon}, int(p_id),
+                                                    anterior=anterior, aviso="Pago actualizado")
                                 st.rerun()
                 with col2:
                     with st.expander("Eliminar"):
                         if st.button("BORRAR PAGO", type="primary"):
-                            supabase.table("pagos").delete().eq("id", p_id).execute()
+                            escrituras.escribir(supabase, "pagos", "delete", id_registro=int(p_id),
+                                                anterior=anterior, aviso="Pago eliminado")
                             st.rerun()
+
+    # --- PESTAÑA 4: IMPORTACIÓN MASIVA DE PAGOS ---
+    with tab_importar:
+        st.subheader("Importar pagos desde archivo")
+        importacion.render_importacion(supabase, "pagos")
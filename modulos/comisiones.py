@@ -1,24 +1,28 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from modulos import datos, devengo
 
 def render_comisiones(supabase):
     st.title("🎖️ Control de Comisiones")
 
     # --- 1. CARGA DE DATOS ---
-    try:
-        res_saldos = supabase.table("vista_saldos_comisiones").select("*").execute()
-        df_saldos = pd.DataFrame(res_saldos.data)
-
-        res_pagos = supabase.table("comisiones_pagadas").select("""
+    res = datos.en_paralelo({
+        "saldos": lambda: devengo.resumen(supabase),
+        "historial": lambda: datos.consultar(supabase, "comisiones_pagadas", """
             *,
             vendedor:directorio!vendedor_id(nombre)
-        """).order("fecha_pago", desc=True).execute()
-        df_historial = pd.DataFrame(res_pagos.data)
-        
-    except Exception as e:
-        st.error(f"Error: {e}")
+        """, orden=[("fecha_pago", True)]),
+    })
+    if isinstance(res["saldos"], Exception):
+        st.error(f"Error: {res['saldos']}")
         return
+    # Comisión devengada según lo cobrado de cada venta (ver modulos/devengo.py)
+    df_saldos, df_periodos = res["saldos"]["vendedores"], res["saldos"]["periodos"]
+
+    # Si solo falla el historial, los saldos y el registro de pagos siguen disponibles
+    error_historial = res["historial"] if isinstance(res["historial"], Exception) else None
+    df_historial = pd.DataFrame() if error_historial else pd.DataFrame(res["historial"])
 
     # --- 2. TABS ---
     tab_saldos, tab_pagar, tab_historial = st.tabs(["📊 Saldos", "💸 Registrar Pago", "📜 Historial"])
@@ -41,15 +45,39 @@ def render_comisiones(supabase):
                 column_config={
                     "vendedor_nombre": "Vendedor",
                     "comision_total": st.column_config.NumberColumn("Total Generado", format="dollar"),
+                    "comision_devengada": st.column_config.NumberColumn("Devengado", format="dollar"),
                     "comision_pagada": st.column_config.NumberColumn("Total Pagado", format="dollar"),
                     "saldo_pendiente": st.column_config.NumberColumn("Saldo Pendiente", format="dollar"),
+                    "por_devengar": st.column_config.NumberColumn("Por Devengar", format="dollar"),
                 },
                 use_container_width=True, 
-                hide_index=True
+                hide_index=True,
+                column_order=("vendedor_nombre", "comision_total", "comision_devengada", "comision_pagada",
+                              "saldo_pendiente", "por_devengar")
             )
         else:
             st.info("No hay registros que coincidan con el filtro seleccionado.")
 
+        with st.expander("📅 Devengo por periodo"):
+            if df_periodos.empty:
+                st.info("Aún no hay comisiones devengadas.")
+            else:
+                v_periodo = st.selectbox("Vendedor", sorted(df_periodos["vendedor_nombre"].unique()), key="vendedor_periodo")
+                df_v = df_periodos[df_periodos["vendedor_nombre"] == v_periodo].copy()
+                df_v["periodo"] = df_v["periodo"].astype(str)
+                st.dataframe(
+                    df_v,
+                    column_config={
+                        "periodo": "Mes",
+                        "devengado": st.column_config.NumberColumn("Devengado", format="dollar"),
+                        "pagado": st.column_config.NumberColumn("Pagado", format="dollar"),
+                        "saldo": st.column_config.NumberColumn("Saldo al Cierre", format="dollar"),
+                    },
+                    use_container_width=True,
+                    hide_index=True,
+                    column_order=("periodo", "devengado", "pagado", "saldo")
+                )
+
     with tab_pagar:
         st.subheader("Registrar Salida de Efectivo")
         # Aquí siempre filtramos por saldo > 0
@@ -83,14 +111,16 @@ def render_comisiones(supabase):
                         "fecha_pago": str(datetime.now().date())
                     }
                     try:
-                        supabase.table("comisiones_pagadas").insert(pago_data).execute()
+                        datos.insertar(supabase, "comisiones_pagadas", pago_data)
                         st.success(f"¡Pago registrado exitosamente!")
                         st.rerun()
                     except Exception as e:
                         st.error(f"Error al registrar: {e}")
 
     with tab_historial:
-        if not df_historial.empty:
+        if error_historial:
+            st.error(f"No se pudo cargar el historial: {error_historial}")
+        elif not df_historial.empty:
             df_historial['Vendedor'] = df_historial['vendedor'].apply(lambda x: x['nombre'] if x else "N/A")
             st.dataframe(
                 df_historial,
@@ -1,7 +1,24 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
+from modulos import datos, finanzas, buscador, instrumentacion, exportacion, antiguedad
+
+def _plan_guardado(supabase, contrato):
+    # Plan del contrato calculado por worker.py; None si no existe la tabla o
+    # si ya no corresponde al contrato (pagos o condiciones posteriores)
+    try:
+        filas = datos.consultar(supabase, "plan_pagos", "venta_id, num_cuota, vencimiento, cuota, abonado, saldo, estatus",
+                                filtros=[("eq", "venta_id", int(contrato['id']))], orden=[("num_cuota", False)])
+    except Exception:
+        return None
+    plan = pd.DataFrame(filas, columns=["venta_id", "num_cuota", "vencimiento", "cuota", "abonado", "saldo", "estatus"])
+    if not finanzas.plan_vigente(plan, contrato):
+        return None
+    plan['vencimiento'] = pd.to_datetime(plan['vencimiento'])
+    for col in ("cuota", "abonado", "saldo"):
+        plan[col] = pd.to_numeric(plan[col]).astype(float)
+    return plan
+
 
 def render_detalle_credito(supabase):
     # Estilo CSS para mejorar el Dark Mode
@@ -31,35 +48,38 @@ def render_detalle_credito(supabase):
     st.title("📊 Detalle de Crédito")
 
     # --- 1. CARGA DE DATOS ---
-    try:
-        res_v = supabase.table("ventas").select("""
-            *,
-            cliente:directorio!cliente_id(nombre),
-            ubicacion:ubicaciones(id, manzana, lote, etapa, precio, enganche_req)
-        """).execute()
-        df_v = pd.DataFrame(res_v.data)
-        
-        res_status = supabase.table("vista_estatus_lotes").select("*").execute()
-        df_status = pd.DataFrame(res_status.data)
-    except Exception as e:
-        st.error(f"Error cargando datos: {e}")
+    with instrumentacion.fase("carga_datos"):
+        res = datos.en_paralelo({
+            "ventas": lambda: datos.cargar_ventas(supabase),
+            "lotes": lambda: datos.cargar_lotes(supabase),
+        })
+    errores = datos.fallidas(res)
+    if errores:
+        for nombre, e in errores.items():
+            st.error(f"Error cargando {nombre}: {e}")
         return
+    df_v, df_status = res["ventas"], res["lotes"]
 
     if df_v.empty:
         st.warning("No hay ventas registradas.")
         return
 
     # --- 2. SELECTOR VISUAL ---
-    df_v['Lote_Ref'] = df_v['ubicacion'].apply(lambda x: f"M{int(x['manzana']):02d}-L{int(x['lote']):02d} (Etapa {x['etapa']})")
-    df_v['Cliente_Nom'] = df_v['cliente'].apply(lambda x: x['nombre'])
+    df_v['Lote_Ref'] = df_v['lote_ref'] + " (Etapa " + df_v['etapa'].astype("string") + ")"
+    df_v['Cliente_Nom'] = df_v['cliente_nombre']
     
     col_search, col_spacer = st.columns([2, 1])
     search_cred = col_search.text_input("🔍 Buscar cliente o lote:", placeholder="Nombre o Manzana...")
     
-    df_sel = df_v.copy()
-    if search_cred:
-        df_sel = df_sel[df_sel['Cliente_Nom'].str.contains(search_cred, case=False) | 
-                        df_sel['Lote_Ref'].str.contains(search_cred, case=False)]
+    df_sel = buscador.filtrar(df_v, search_cred, ['Cliente_Nom', 'Lote_Ref'], "credito_ventas")
+
+    # Recibos de los contratos de la tabla, una sola vez (por bloques de ids y
+    # en caché): recorrer los contratos ya no vuelve a la base
+    try:
+        with instrumentacion.fase("recibos"):
+            recibos = datos.pagos_por_venta(supabase, df_sel['id'].astype(int).tolist())
+    except Exception as e:
+        recibos = e
 
     event = st.dataframe(
         df_sel[['Lote_Ref', 'Cliente_Nom']],
@@ -77,13 +97,11 @@ def render_detalle_credito(supabase):
         v_selected = df_sel.iloc[idx]
         u_id = v_selected['ubicacion_id']
 
-        precio_vta = float(v_selected['ubicacion']['precio'])
-        e_requerido = float(v_selected['ubicacion']['enganche_req'])
-        plazo_meses = int(v_selected.get('plazo') or 12)
+        precio_vta = float(v_selected['precio'])
         
         v_status = df_status[df_status['ubicacion_id'] == u_id]
         total_pagado_hoy = float(v_status['total_pagado'].iloc[0] if not v_status.empty else 0)
-        saldo_restante = max(0.0, precio_vta - total_pagado_hoy)
+        saldo_restante = float(finanzas.saldo(precio_vta, total_pagado_hoy))
 
         st.markdown(f"""
             <div class="status-card">
@@ -101,41 +119,19 @@ def render_detalle_credito(supabase):
         # --- 4. TABLA DE AMORTIZACIÓN ---
         st.markdown("### 📅 Plan de Pagos")
         
-        mensualidad_base = (precio_vta - e_requerido) / plazo_meses if plazo_meses > 0 else 0
-        bolsa_para_mensualidades = max(0.0, total_pagado_hoy - e_requerido)
-        
-        datos_amort = []
-        saldo_insoluto = precio_vta - e_requerido
-        fecha_inicio = pd.to_datetime(v_selected['fecha_venta'])
-
-        for i in range(1, plazo_meses + 1):
-            fecha_pago = fecha_inicio + relativedelta(months=i)
-            
-            if bolsa_para_mensualidades >= (mensualidad_base - 0.05):
-                status_pago = "✅ Cubierto"
-                abono = mensualidad_base
-                bolsa_para_mensualidades -= mensualidad_base
-            elif bolsa_para_mensualidades > 0:
-                status_pago = "⚠️ Parcial"
-                abono = bolsa_para_mensualidades
-                bolsa_para_mensualidades = 0
-            else:
-                status_pago = "⏳ Pendiente"
-                abono = 0.0
-                
-            saldo_insoluto = max(0.0, saldo_insoluto - abono)
-            
-            datos_amort.append({
-                "Mes": f"Mes {i:02d}",
-                "Vencimiento": fecha_pago.strftime('%d/%m/%Y'),
-                "Cuota": mensualidad_base,
-                "Abonado": abono,
-                "Saldo": saldo_insoluto,
-                "Estatus": status_pago
-            })
+        # El plan guardado por worker.py si sigue vigente; si no, el de toda la
+        # cartera (en caché, cambiar de contrato no lo recalcula) filtrado al
+        # contrato seleccionado
+        with instrumentacion.fase("amortizacion"):
+            plan = _plan_guardado(supabase, {**v_selected, 'pagado': total_pagado_hoy}) if st.secrets.get("antiguedad_precalculada", False) else None
+            if plan is None:
+                plan = datos.plan_cartera(df_v, df_status)
+                plan = plan[plan['venta_id'] == v_selected['id']]
+
+        datos_amort = exportacion.formato_plan(plan)
 
         st.dataframe(
-            pd.DataFrame(datos_amort),
+            datos_amort,
             column_config={
                 "Cuota": st.column_config.NumberColumn(format="dollar"),
                 "Abonado": st.column_config.NumberColumn(format="dollar"),
@@ -147,11 +143,35 @@ def render_detalle_credito(supabase):
         )
 
         with st.expander("🧾 Historial de Pagos (Folios)"):
-            res_p = supabase.table("pagos").select("*").eq("venta_id", v_selected['id']).order("fecha").execute()
-            df_recibos = pd.DataFrame(res_p.data)
-            if not df_recibos.empty:
-                st.dataframe(df_recibos[['fecha', 'folio', 'monto']], use_container_width=True, hide_index=True)
+            if isinstance(recibos, Exception):
+                st.error(f"Error cargando recibos: {recibos}")
             else:
-                st.info("No hay recibos registrados.")
+                df_recibos = pd.DataFrame(recibos[int(v_selected['id'])])
+                if not df_recibos.empty:
+                    st.dataframe(df_recibos[['fecha', 'folio', 'monto']], use_container_width=True, hide_index=True)
+                else:
+                    st.info("No hay recibos registrados.")
     else:
         st.info("💡 Selecciona un contrato de la lista superior para visualizar el estado de cuenta detallado.")
+
+    # --- 5. EXPORTACIÓN MASIVA ---
+    with st.expander("📦 Exportar estados de cuenta y reporte de cartera"):
+        c1, c2 = st.columns([2, 1])
+        formatos = c1.multiselect("Formatos de estado de cuenta", exportacion.FORMATOS, default=["csv"])
+        con_estados = c2.checkbox("Incluir estados de cuenta", value=True)
+        if st.button("⚙️ Generar ZIP", use_container_width=True):
+            barra = st.progress(0.0, text="Generando...")
+            # El zip se arma en disco; solo se lee completo al entregarlo al botón
+            try:
+                with exportacion.zip_temporal(
+                    supabase, formatos, con_estados,
+                    avance=lambda hechos, total: barra.progress(hechos / total, text=f"{hechos} de {total} contratos"),
+                    cartera=antiguedad.cartera(supabase),
+                ) as (total, archivo):
+                    st.download_button(f"⬇️ Descargar ({total} contratos)", archivo,
+                                       file_name=f"valle_mart_{datetime.now():%Y%m%d}.zip",
+                                       mime="application/zip", use_container_width=True)
+            except ImportError:
+                st.error("Para XLSX instale openpyxl y para PDF instale fpdf2.")
+            except Exception as e:
+                st.error(f"No se pudo generar la exportación: {e}")
@@ -0,0 +1,872 @@
+import contextlib
+import itertools
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from modulos import finanzas, normalizacion, instrumentacion
+
+# --- CAPA DE ACCESO A DATOS ---
+# Todas las lecturas a Supabase pasan por aquí. Cada consulta se guarda en
+# memoria (compartida entre sesiones) con una llave que describe su forma:
+# tabla, columnas, filtros, orden y límite. Las escrituras invalidan solo las
+# entradas que dependen de la tabla modificada.
+
+TTL_SEGUNDOS = 300
+TIMEOUT_SEGUNDOS = 15
+# Tope de entradas en memoria: las llaves incluyen cursores y listas de ids,
+# así que sin tope la caché crece mientras viva el servidor
+MAX_ENTRADAS = 2000
+
+# Tablas base de las que se alimenta cada vista de la base de datos
+VISTAS = {
+    "vista_estatus_lotes": {"ubicaciones", "ventas", "pagos"},
+    "vista_saldos_comisiones": {"ventas", "comisiones_pagadas", "directorio"},
+    "vista_totales_pagos": {"pagos"},
+    "gastos_mensuales": {"gastos"},
+}
+
+_cache = {}
+_lock = threading.Lock()
+_generacion = 0
+# tabla -> (versión, escrituras en curso). Una lectura que se cruzó con una
+# escritura de sus tablas no se guarda: no se sabe si la incluye
+_escrituras = {}
+# Lecturas de las páginas y confirmaciones de escrituras optimistas van en
+# pools separados: una escritura lenta no le quita hilos a las lecturas
+_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="datos")
+_pool_escrituras = ThreadPoolExecutor(max_workers=4, thread_name_prefix="escrituras")
+
+# Fuente local opcional (ej. snapshot sincronizado) con su función para
+# reflejar escrituras optimistas, y funciones que se notifican en cada
+# escritura confirmada con (tabla, operacion, filas)
+_fuente_local = None
+_ajuste_local = None
+_suscriptores = []
+
+# Filtros que se pueden evaluar en memoria (copia local y escritura optimista)
+OPERADORES = {
+    "eq": lambda a, b: a == b,
+    "neq": lambda a, b: a != b,
+    "gt": lambda a, b: a is not None and a > b,
+    "gte": lambda a, b: a is not None and a >= b,
+    "lt": lambda a, b: a is not None and a < b,
+    "lte": lambda a, b: a is not None and a <= b,
+    "in_": lambda a, b: a in b,
+}
+
+# Recursos embebidos en un select, ej: "cliente:directorio!cliente_id(nombre)"
+_RE_EMBEBIDO = re.compile(r"(?:\w+:)?(\w+)(?:!\w+)?\s*\(")
+
+
+def configurar(ttl=None, timeout=None, max_entradas=None):
+    global TTL_SEGUNDOS, TIMEOUT_SEGUNDOS, MAX_ENTRADAS
+    if ttl is not None:
+        TTL_SEGUNDOS = int(ttl)
+    if timeout is not None:
+        TIMEOUT_SEGUNDOS = float(timeout)
+    if max_entradas is not None:
+        MAX_ENTRADAS = int(max_entradas)
+
+
+def registrar_fuente_local(fuente, ajuste=None):
+    # `fuente(tabla, columnas, filtros, orden, limite)` devuelve las filas o
+    # None si no puede responder esa consulta. `ajuste(tabla, operacion,
+    # nueva, anterior)` aplica a la fuente una escritura optimista y devuelve
+    # la función que la cierra: con las filas de la base si se confirmó o con
+    # None si falló (se deshace)
+    global _fuente_local, _ajuste_local
+    _fuente_local, _ajuste_local = fuente, ajuste
+
+
+def suscribir(funcion):
+    if funcion not in _suscriptores:
+        _suscriptores.append(funcion)
+
+
+def _notificar(tabla, operacion, filas):
+    for funcion in _suscriptores:
+        funcion(tabla, operacion, filas or [])
+
+
+def _normalizar_columnas(columnas):
+    return " ".join(columnas.split())
+
+
+def _dependencias(tabla, columnas):
+    deps = {tabla} | VISTAS.get(tabla, set())
+    for embebida in _RE_EMBEBIDO.findall(columnas):
+        deps.add(embebida)
+        deps |= VISTAS.get(embebida, set())
+    return frozenset(deps)
+
+
+def _ejecutar(supabase, tabla, columnas, filtros, orden, limite):
+    q = supabase.table(tabla).select(columnas)
+    for metodo, *args in filtros:
+        q = getattr(q, metodo)(*args)
+    for columna, desc in orden:
+        q = q.order(columna, desc=desc)
+    if limite:
+        q = q.limit(limite)
+    return q.execute().data
+
+
+def consultar(supabase, tabla, columnas="*", filtros=(), orden=(), limite=None, cache=True):
+    """Lee `tabla` usando la caché. `filtros` es una tupla de
+    (metodo, *args) del cliente, ej: ("eq", "id", 5); `orden` una tupla de
+    (columna, desc). Con cache=False no se guarda el resultado (lecturas
+    por bloques de exportaciones o procesos largos)."""
+    columnas = _normalizar_columnas(columnas)
+    filtros = tuple(tuple(f) for f in filtros)
+    orden = tuple((c, bool(d)) for c, d in orden)
+    llave = (tabla, columnas, filtros, orden, limite)
+
+    if _fuente_local is not None:
+        locales = _fuente_local(tabla, columnas, filtros, orden, limite)
+        if locales is not None:
+            instrumentacion.evento("snapshot", tabla, filas=len(locales))
+            return locales
+
+    if not cache:
+        return _ejecutar(supabase, tabla, columnas, filtros, orden, limite)
+
+    deps = _dependencias(tabla, columnas)
+    ahora = time.monotonic()
+    with _lock:
+        entrada = _cache.get(llave)
+        if entrada and ahora - entrada[0] < TTL_SEGUNDOS:
+            instrumentacion.evento("cache", tabla, filas=len(entrada[2]))
+            return entrada[2]
+        firma = _firma(deps)
+
+    datos = _ejecutar(supabase, tabla, columnas, filtros, orden, limite)
+    with _lock:
+        _guardar(llave, ahora, deps, datos, firma)
+    return datos
+
+
+def generacion():
+    # Cambia cada vez que la caché recibe datos nuevos o descarta entradas:
+    # mientras no cambie, lo leído de la caché es lo mismo (ver buscador)
+    return _generacion
+
+
+def _cambio():
+    # Llamar con _lock tomado
+    global _generacion
+    _generacion += 1
+
+
+def _firma(deps):
+    # Llamar con _lock tomado. Versiones de escritura de `deps`, o None si
+    # alguna tiene una escritura en curso
+    estado = [_escrituras.get(t, (0, 0)) for t in sorted(deps)]
+    if any(en_curso for _, en_curso in estado):
+        return None
+    return tuple(version for version, _ in estado)
+
+
+def _marcar_escritura(tabla, delta):
+    # delta=1 al empezar una escritura sobre `tabla` y -1 al terminar; ambas
+    # cambian la versión
+    with _lock:
+        version, en_curso = _escrituras.get(tabla, (0, 0))
+        _escrituras[tabla] = (version + 1, en_curso + delta)
+
+
+@contextlib.contextmanager
+def _escribiendo(tabla):
+    # Marca una escritura en curso sobre `tabla` mientras dura el bloque
+    _marcar_escritura(tabla, 1)
+    try:
+        yield
+    finally:
+        _marcar_escritura(tabla, -1)
+
+
+def _guardar(llave, ahora, deps, valor, firma):
+    # Llamar con _lock tomado. `firma` es la de `deps` al empezar la lectura:
+    # si cambió, la lectura se cruzó con una escritura y no se guarda. Al
+    # llenarse la caché primero se tiran las entradas vencidas y, si no
+    # alcanza, las más antiguas (el dict conserva el orden de inserción)
+    if firma is None or firma != _firma(deps):
+        return
+    _cambio()
+    _cache.pop(llave, None)
+    if len(_cache) >= MAX_ENTRADAS:
+        for vieja in [k for k, (momento, _, _) in _cache.items() if ahora - momento >= TTL_SEGUNDOS]:
+            del _cache[vieja]
+        while len(_cache) >= MAX_ENTRADAS:
+            del _cache[next(iter(_cache))]
+    _cache[llave] = (ahora, deps, valor)
+
+
+def invalidar(*tablas):
+    tablas = set(tablas)
+    with _lock:
+        _cambio()
+        for llave in [k for k, (_, deps, _) in _cache.items() if deps & tablas]:
+            del _cache[llave]
+
+
+def limpiar_cache():
+    with _lock:
+        _cambio()
+        _cache.clear()
+
+
+def _derivado(nombre, deps, construir):
+    # Guarda un valor calculado (ej. un DataFrame ya normalizado) con la misma
+    # expiración e invalidación que las consultas de las que depende
+    llave, deps = ("derivado", nombre), frozenset(deps)
+    ahora = time.monotonic()
+    with _lock:
+        entrada = _cache.get(llave)
+        if entrada and ahora - entrada[0] < TTL_SEGUNDOS:
+            return entrada[2]
+        firma = _firma(deps)
+    valor = construir()
+    with _lock:
+        _guardar(llave, ahora, deps, valor, firma)
+    return valor
+
+
+# --- CARGAS NORMALIZADAS (compartidas por todos los módulos) ---
+SELECT_VENTAS = """
+    *,
+    cliente:directorio!cliente_id(nombre, telefono, correo),
+    vendedor:directorio!vendedor_id(nombre),
+    ubicacion:ubicaciones(etapa, manzana, lote, precio, enganche_req)
+"""
+
+
+def cargar_ventas(supabase):
+    # Ventas con cliente, vendedor y ubicación en columnas planas y tipadas
+    columnas = _normalizar_columnas(SELECT_VENTAS)
+    df = _derivado("ventas", _dependencias("ventas", columnas),
+                   lambda: normalizacion.aplanar_ventas(consultar(supabase, "ventas", columnas)))
+    return df.copy()
+
+
+def cargar_lotes(supabase):
+    # Inventario de vista_estatus_lotes con referencias precalculadas
+    orden = [("etapa", False), ("manzana", False), ("lote", False)]
+    df = _derivado("lotes", _dependencias("vista_estatus_lotes", "*"),
+                   lambda: normalizacion.aplanar_lotes(consultar(supabase, "vista_estatus_lotes", orden=orden)))
+    return df.copy()
+
+
+def _filtros_lotes(etapas=None, manzanas=None, estatus=None, precios=None):
+    # `manzanas` y `precios` son rangos (min, max); None deja abierto ese extremo
+    filtros = []
+    if etapas:
+        filtros.append(("in_", "etapa", tuple(sorted(int(e) for e in etapas))))
+    if estatus:
+        filtros.append(("eq", "estatus_actual", estatus))
+    for columna, rango in (("manzana", manzanas), ("precio_lista", precios)):
+        minimo, maximo = rango or (None, None)
+        if minimo is not None:
+            filtros.append(("gte", columna, minimo))
+        if maximo is not None:
+            filtros.append(("lte", columna, maximo))
+    return filtros
+
+
+def consultar_lotes(supabase, etapas=None, manzanas=None, estatus=None, precios=None):
+    """Lotes de vista_estatus_lotes filtrados en la base, con las mismas
+    columnas que cargar_lotes. Sin filtros equivale a cargar_lotes."""
+    filtros = _filtros_lotes(etapas, manzanas, estatus, precios)
+    if not filtros:
+        return cargar_lotes(supabase)
+    orden = [("etapa", False), ("manzana", False), ("lote", False)]
+    df = _derivado(("lotes", tuple(filtros)), _dependencias("vista_estatus_lotes", "*"),
+                   lambda: normalizacion.aplanar_lotes(
+                       consultar(supabase, "vista_estatus_lotes", filtros=filtros, orden=orden)))
+    return df.copy()
+
+
+
+def plan_cartera(ventas, lotes):
+    """Plan de pagos de toda la cartera a partir de cargar_ventas y
+    cargar_lotes, guardado con la misma expiración e invalidación que ellas."""
+    def construir():
+        df = ventas[["id", "ubicacion_id", "fecha_venta", "plazo", "precio", "enganche_req"]].copy()
+        pagado = lotes.set_index("ubicacion_id")["total_pagado"] if not lotes.empty else {}
+        df["pagado"] = df["ubicacion_id"].map(pagado).fillna(0.0)
+        return finanzas.plan_de_pagos(df)
+    deps = _dependencias("ventas", SELECT_VENTAS) | _dependencias("vista_estatus_lotes", "*")
+    return _derivado("plan_cartera", deps, construir)
+
+
+# --- CONSULTAS AGREGADAS ---
+def rpc(supabase, funcion, parametros=None, fuentes=()):
+    # Función de la base (supabase.rpc) con la misma caché que las consultas;
+    # `fuentes` son las tablas o vistas cuyo cambio invalida el resultado
+    parametros = dict(parametros or {})
+    llave = ("rpc", funcion, tuple(sorted(parametros.items())))
+    deps = frozenset({funcion}).union(*(_dependencias(f, "*") for f in fuentes))
+    ahora = time.monotonic()
+    with _lock:
+        entrada = _cache.get(llave)
+        if entrada and ahora - entrada[0] < TTL_SEGUNDOS:
+            instrumentacion.evento("cache", funcion, filas=len(entrada[2]))
+            return entrada[2]
+        firma = _firma(deps)
+
+    datos = supabase.rpc(funcion, parametros).execute().data or []
+    with _lock:
+        _guardar(llave, ahora, deps, datos, firma)
+    return datos
+
+
+def resumen_lotes(supabase, manzanas=None, estatus=None, precios=None):
+    # Conteos y sumas del inventario por etapa (ver sql/inventario.sql)
+    (manzana_min, manzana_max), (precio_min, precio_max) = manzanas or (None, None), precios or (None, None)
+    return rpc(supabase, "resumen_inventario", {
+        "p_estatus": estatus or None,
+        "p_manzana_min": manzana_min, "p_manzana_max": manzana_max,
+        "p_precio_min": precio_min, "p_precio_max": precio_max,
+    }, fuentes=["vista_estatus_lotes"])
+
+
+def totales_por_venta(supabase):
+    # Suma de pagos por venta calculada en la base (ver sql/vista_totales_pagos.sql)
+    return consultar(supabase, "vista_totales_pagos", "venta_id, total_pagado, num_pagos, ultimo_pago")
+
+
+def _bloques(valores, tamano):
+    valores = list(valores)
+    return [tuple(valores[i:i + tamano]) for i in range(0, len(valores), tamano)]
+
+
+# Ids por filtro in_: la lista viaja en la URL del GET y los proxies cortan
+# las URL largas
+IDS_POR_CONSULTA = 200
+
+
+def pagos_por_venta(supabase, venta_ids):
+    # Pagos de las ventas indicadas agrupados por venta_id. Se piden por
+    # bloques de ids, a la vez, y cada bloque queda en caché; nunca se baja
+    # toda la tabla
+    grupos = {int(v): [] for v in venta_ids}
+    res = en_paralelo({
+        i: lambda bloque=bloque: consultar(supabase, "pagos", "id, venta_id, fecha, folio, monto",
+                                           filtros=[("in_", "venta_id", bloque)],
+                                           orden=[("fecha", False), ("id", False)])
+        for i, bloque in enumerate(_bloques(sorted(grupos), IDS_POR_CONSULTA))
+    }, estricto=True)
+    for filas in res.values():
+        for fila in filas:
+            grupos[fila["venta_id"]].append(fila)
+    return grupos
+
+
+def pagina_pagos(supabase, tamano, cursor=None, folio=None, venta_ids=None):
+    # Paginación por llave (fecha, id) descendente: cada página cuesta lo mismo
+    # sin importar el tamaño del historial. `cursor` es la (fecha, id) del
+    # último pago de la página anterior. Con búsqueda (folio o venta_ids) se
+    # pide la página a cada bloque de ids y se mezclan: basta con los
+    # primeros tamano + 1 de cada bloque.
+    base = []
+    if cursor:
+        fecha, id_pago = cursor
+        base.append(("or_", f"fecha.lt.{fecha},and(fecha.eq.{fecha},id.lt.{int(id_pago)})"))
+    orden = [("fecha", True), ("id", True)]
+
+    busquedas = []
+    folio = re.sub(r"[,()*%]", "", folio or "").strip()
+    if folio:
+        busquedas.append(("ilike", "folio", f"%{folio}%"))
+    for bloque in _bloques(sorted({int(v) for v in venta_ids or ()}), IDS_POR_CONSULTA):
+        busquedas.append(("in_", "venta_id", bloque))
+
+    if not busquedas:
+        filas = consultar(supabase, "pagos", filtros=base, orden=orden, limite=tamano + 1)
+    else:
+        res = en_paralelo({i: (lambda f=f: consultar(supabase, "pagos", filtros=[f, *base], orden=orden,
+                                                     limite=tamano + 1))
+                           for i, f in enumerate(busquedas)}, estricto=True)
+        unicas = {f["id"]: f for parte in res.values() for f in parte}
+        filas = sorted(unicas.values(), key=lambda f: (f["fecha"], f["id"]), reverse=True)[:tamano + 1]
+
+    siguiente = None
+    if len(filas) > tamano:
+        filas = filas[:tamano]
+        siguiente = (filas[-1]["fecha"], filas[-1]["id"])
+    return filas, siguiente
+
+
+def gastos_mensuales(supabase):
+    # Total y número de gastos por mes y categoría; la tabla la mantiene un
+    # trigger en la base (ver sql/gastos_mensuales.sql)
+    return consultar(supabase, "gastos_mensuales", "mes, categoria, total, num_gastos",
+                     filtros=[("gt", "num_gastos", 0)], orden=[("mes", False), ("categoria", False)])
+
+
+def pagina_gastos(supabase, tamano, cursor=None, categoria=None, desde=None, hasta=None):
+    # Misma paginación por llave (fecha, id) que pagina_pagos; `desde` y
+    # `hasta` (exclusiva) son fechas ISO
+    filtros = []
+    if categoria:
+        filtros.append(("eq", "categoria", categoria))
+    if desde:
+        filtros.append(("gte", "fecha", desde))
+    if hasta:
+        filtros.append(("lt", "fecha", hasta))
+    if cursor:
+        fecha, id_gasto = cursor
+        filtros.append(("or_", f"fecha.lt.{fecha},and(fecha.eq.{fecha},id.lt.{int(id_gasto)})"))
+
+    filas = consultar(supabase, "gastos", "id, fecha, categoria, monto, concepto, notas", filtros=filtros,
+                      orden=[("fecha", True), ("id", True)], limite=tamano + 1)
+    siguiente = None
+    if len(filas) > tamano:
+        filas = filas[:tamano]
+        siguiente = (filas[-1]["fecha"], filas[-1]["id"])
+    return filas, siguiente
+
+
+# --- RECÁLCULO INCREMENTAL POR CONTRATO ---
+class Pendientes:
+    """Contratos por recalcular de un resultado materializado por venta
+    (antigüedad, devengo de comisiones).
+
+    Se suscribe a las escrituras: pagos y ventas marcan su contrato;
+    ubicaciones y directorio cambian muchos contratos a la vez y piden
+    reconstruir todo. También pide reconstruir cuando la última lectura
+    completa tiene más de TTL_SEGUNDOS, para ver lo que escribieron otras
+    sesiones, el worker o la base misma."""
+
+    def __init__(self):
+        self._ids = set()
+        self._completo = True
+        self._momento = None
+        self._lock = threading.Lock()
+
+    def escritura(self, tabla, operacion, filas):
+        with self._lock:
+            if tabla == "pagos":
+                ids = {f.get("venta_id") for f in filas}
+            elif tabla == "ventas":
+                ids = {f.get("id") for f in filas}
+            elif tabla in ("ubicaciones", "directorio"):
+                ids = {None}
+            else:
+                return
+            if None in ids:
+                self._completo = True
+            self._ids.update(i for i in ids if i is not None)
+
+    def reiniciar(self):
+        # Fuerza una lectura completa en la siguiente consulta (botón Sincronizar)
+        with self._lock:
+            self._completo = True
+
+    def tomar(self):
+        """Devuelve (completo, ids) y limpia las marcas. Si lo que sigue
+        falla hay que llamar a reiniciar()."""
+        ahora = time.monotonic()
+        with self._lock:
+            completo = self._completo or self._momento is None or ahora - self._momento >= TTL_SEGUNDOS
+            ids = set(self._ids)
+            self._ids.clear()
+            self._completo = False
+            if completo:
+                self._momento = ahora
+        if completo:
+            suscribir(self.escritura)
+        return completo, ids
+
+
+# --- CARGA CONCURRENTE ---
+def en_paralelo(tareas, timeout=None, estricto=False):
+    """Ejecuta a la vez las lecturas independientes de una página.
+
+    `tareas` es un dict nombre -> función sin argumentos. Devuelve un dict
+    nombre -> resultado; si una tarea falla o tarda más de `timeout`
+    segundos su valor es la excepción y las demás no se ven afectadas.
+    El límite es por tarea y corre desde que la tarea empieza (o desde que
+    se pidió, si sigue esperando hilo libre). Con estricto=True se levanta
+    la primera excepción."""
+    timeout = TIMEOUT_SEGUNDOS if timeout is None else timeout
+    resultados = {}
+    if threading.current_thread().name.startswith("datos"):
+        # Ya dentro del pool: se corre en serie para no esperar a hilos propios
+        for nombre, funcion in tareas.items():
+            try:
+                resultados[nombre] = funcion()
+            except Exception as e:
+                if estricto:
+                    raise
+                resultados[nombre] = e
+        return resultados
+
+    traza = instrumentacion.traza_actual()
+    inicios = {}
+
+    def correr(nombre, funcion):
+        inicios[nombre] = time.monotonic()
+        instrumentacion.activar(traza)
+        try:
+            return funcion()
+        finally:
+            instrumentacion.desactivar()
+
+    pedido = time.monotonic()
+    futuros = {_pool.submit(correr, nombre, funcion): nombre for nombre, funcion in tareas.items()}
+    pendientes = set(futuros)
+    while pendientes:
+        ahora = time.monotonic()
+        limites = {f: inicios.get(futuros[f], pedido) + timeout for f in pendientes}
+        for futuro in [f for f in pendientes if limites[f] <= ahora]:
+            # Si no había empezado ya no ocupará un hilo; si ya corría, el
+            # límite del cliente HTTP (ver app.py) la termina
+            futuro.cancel()
+            pendientes.discard(futuro)
+            resultados[futuros[futuro]] = TimeoutError(f"{futuros[futuro]}: sin respuesta en {timeout:g} s")
+        if pendientes:
+            listos, _ = wait(pendientes, timeout=min(limites[f] for f in pendientes) - ahora,
+                             return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                pendientes.discard(futuro)
+                try:
+                    resultados[futuros[futuro]] = futuro.result()
+                except Exception as e:
+                    resultados[futuros[futuro]] = e
+        errores = [resultados[n] for n in tareas if isinstance(resultados.get(n), Exception)]
+        if estricto and errores:
+            for futuro in pendientes:
+                futuro.cancel()
+            raise errores[0]
+    return {nombre: resultados[nombre] for nombre in tareas}
+
+
+def fallidas(resultados):
+    return {nombre: r for nombre, r in resultados.items() if isinstance(r, Exception)}
+
+
+# --- ESCRITURAS (invalidan la caché de la tabla afectada) ---
+# Mientras viajan quedan marcadas en curso (ver _escribiendo): lo que se lea
+# de la tabla en ese lapso no se guarda en la caché.
+def insertar(supabase, tabla, datos):
+    try:
+        with _escribiendo(tabla):
+            res = supabase.table(tabla).insert(datos).execute()
+    finally:
+        invalidar(tabla)
+    _notificar(tabla, "insert", res.data)
+    return res.data
+
+
+def insertar_lote(supabase, tabla, filas, tamano=500):
+    # Inserta en bloques grandes e invalida la caché una sola vez al final
+    creadas = []
+    try:
+        with _escribiendo(tabla):
+            for i in range(0, len(filas), tamano):
+                res = supabase.table(tabla).insert(filas[i:i + tamano]).execute()
+                _notificar(tabla, "insert", res.data)
+                creadas.extend(res.data)
+    finally:
+        invalidar(tabla)
+    return creadas
+
+
+def guardar_lote(supabase, tabla, filas, conflicto="id", tamano=500):
+    # Upsert por bloques sobre la llave `conflicto` (ej. "venta_id, num_cuota")
+    guardadas = []
+    try:
+        with _escribiendo(tabla):
+            for i in range(0, len(filas), tamano):
+                res = supabase.table(tabla).upsert(filas[i:i + tamano], on_conflict=conflicto).execute()
+                _notificar(tabla, "upsert", res.data)
+                guardadas.extend(res.data)
+    finally:
+        invalidar(tabla)
+    return guardadas
+
+
+def actualizar(supabase, tabla, datos, id_registro):
+    try:
+        with _escribiendo(tabla):
+            res = supabase.table(tabla).update(datos).eq("id", id_registro).execute()
+    finally:
+        invalidar(tabla)
+    _notificar(tabla, "update", res.data)
+    return res.data
+
+
+def eliminar(supabase, tabla, id_registro):
+    try:
+        with _escribiendo(tabla):
+            res = supabase.table(tabla).delete().eq("id", id_registro).execute()
+    finally:
+        invalidar(tabla)
+    _notificar(tabla, "delete", res.data)
+    return res.data
+
+
+# --- ESCRITURA OPTIMISTA ---
+# La fila se aplica de inmediato a las consultas en caché y la escritura se
+# confirma en segundo plano. Las lecturas simples de la tabla y las vistas
+# con parche conocido se ajustan en el lugar; lo demás que depende de la
+# tabla se descarta y se rearma (los derivados, desde la caché ya ajustada).
+# Si la escritura falla se descarta todo lo que depende de la tabla, así la
+# siguiente lectura trae lo que de verdad quedó en la base.
+
+_provisional = itertools.count(-1, -1)
+
+
+def _ejecutar_escritura(supabase, tabla, operacion, valores, id_registro):
+    q = supabase.table(tabla)
+    if operacion == "insert":
+        q = q.insert(valores)
+    elif operacion == "update":
+        q = q.update(valores).eq("id", id_registro)
+    else:
+        q = q.delete().eq("id", id_registro)
+    return q.execute().data
+
+
+def _coincide(fila, filtros):
+    return all(OPERADORES[metodo](fila.get(columna), valor) for metodo, columna, valor in filtros)
+
+
+def _ordenar(filas, orden):
+    for columna, desc in reversed(orden):
+        filas.sort(key=lambda f: (f.get(columna) is None, f.get(columna)), reverse=desc)
+    return filas
+
+
+def _simple(llave):
+    # Consulta sin embebidos, sin límite y con filtros evaluables en memoria
+    if len(llave) != 5:
+        return False
+    _, columnas, filtros, _, limite = llave
+    return "(" not in columnas and not limite and all(f[0] in OPERADORES and len(f) == 3 for f in filtros)
+
+
+def _parche_tabla(llave, filas, tabla, operacion, nueva, anterior):
+    _, columnas, filtros, orden, _ = llave
+    campos = None if columnas == "*" else [c.strip() for c in columnas.split(",")]
+    if operacion != "insert" and campos is not None and "id" not in campos:
+        return None
+    id_fila = (nueva or anterior)["id"]
+    previa = next((f for f in filas if f.get("id") == id_fila), None)
+    resultado = [f for f in filas if f.get("id") != id_fila] if operacion != "insert" else list(filas)
+    if operacion == "delete":
+        return resultado, []
+    if operacion == "update":
+        if previa is None and anterior is None:
+            return None
+        nueva = {**(anterior or {}), **(previa or {}), **nueva}
+    fila = dict(nueva) if campos is None else {c: nueva.get(c) for c in campos}
+    if not _coincide(nueva, filtros):
+        return resultado, []
+    resultado.append(fila)
+    return _ordenar(resultado, orden), [(fila, campos and {c: c for c in campos})] if operacion == "insert" else []
+
+
+def _ajustar_fila(llave, filas, llave_col, valor, cambiar, nueva=None):
+    # Reemplaza (o agrega con `nueva`) la fila de una vista con llave_col == valor
+    _, columnas, filtros, orden, _ = llave
+    if any(c not in (nueva or next(iter(filas), {})) for _, c, _ in filtros):
+        return None
+    resultado, encontrada = [], False
+    for fila in filas:
+        if fila.get(llave_col) == valor:
+            fila, encontrada = cambiar(dict(fila)), True
+        if fila is not None:
+            resultado.append(fila)
+    if not encontrada:
+        if nueva is None:
+            return None
+        campos = None if columnas == "*" else [c.strip() for c in columnas.split(",")]
+        resultado.append(dict(nueva) if campos is None else {c: nueva.get(c) for c in campos})
+    resultado = [f for f in resultado if _coincide(f, filtros)]
+    return _ordenar(resultado, orden), []
+
+
+def _sumar(fila, **cambios):
+    for columna, delta in cambios.items():
+        if columna in fila:
+            fila[columna] = float(fila[columna] or 0) + delta
+    return fila
+
+
+def _ubicacion_de_venta(venta_id):
+    # Busca la ubicación de una venta en lo que ya está en caché
+    for llave, (_, _, valor) in _cache.items():
+        if llave == ("derivado", "ventas") and not valor.empty:
+            encontrada = valor.loc[valor["id"] == venta_id, "ubicacion_id"]
+            if len(encontrada):
+                return int(encontrada.iloc[0])
+        elif llave[0] == "ventas" and isinstance(valor, list):
+            fila = next((f for f in valor if f.get("id") == venta_id and "ubicacion_id" in f), None)
+            if fila:
+                return fila["ubicacion_id"]
+    return None
+
+
+def _parche_totales_pagos(llave, filas, tabla, operacion, nueva, anterior):
+    if tabla != "pagos" or operacion == "delete":
+        return None
+    if operacion == "update":
+        if anterior is None or nueva.get("venta_id", anterior["venta_id"]) != anterior["venta_id"]:
+            return None
+        delta = float(nueva.get("monto", anterior["monto"]) or 0) - float(anterior["monto"] or 0)
+        return _ajustar_fila(llave, filas, "venta_id", anterior["venta_id"],
+                             lambda f: _sumar(f, total_pagado=delta))
+
+    def cambiar(f):
+        _sumar(f, total_pagado=float(nueva["monto"] or 0))
+        if "num_pagos" in f:
+            f["num_pagos"] = int(f["num_pagos"] or 0) + 1
+        if "ultimo_pago" in f:
+            f["ultimo_pago"] = max(f["ultimo_pago"] or "", nueva["fecha"])
+        return f
+    return _ajustar_fila(llave, filas, "venta_id", nueva["venta_id"], cambiar, {
+        "venta_id": nueva["venta_id"], "total_pagado": float(nueva["monto"] or 0),
+        "num_pagos": 1, "ultimo_pago": nueva["fecha"]})
+
+
+def _parche_estatus_lotes(llave, filas, tabla, operacion, nueva, anterior):
+    if tabla == "pagos":
+        if operacion == "delete" or (operacion == "update" and anterior is None):
+            return None
+        base = anterior if operacion == "update" else nueva
+        if operacion == "update" and nueva.get("venta_id", base["venta_id"]) != base["venta_id"]:
+            return None
+        ubicacion = _ubicacion_de_venta(base["venta_id"])
+        if ubicacion is None:
+            return None
+        delta = float(nueva.get("monto") or 0) - (float(anterior["monto"] or 0) if operacion == "update" else 0.0)
+        return _ajustar_fila(llave, filas, "ubicacion_id", ubicacion, lambda f: _sumar(f, total_pagado=delta))
+    if tabla == "ventas" and operacion == "insert" and nueva.get("ubicacion_id"):
+        return _ajustar_fila(llave, filas, "ubicacion_id", nueva["ubicacion_id"],
+                             lambda f: {**f, "estatus_actual": "VENDIDO"})
+    if tabla == "ubicaciones":
+        if operacion == "delete":
+            return _ajustar_fila(llave, filas, "ubicacion_id", anterior["id"], lambda f: None)
+        nueva = {**(anterior or {}), **nueva}
+        if operacion == "update":
+            return _ajustar_fila(llave, filas, "ubicacion_id", nueva["id"], lambda f: {
+                **f, "precio_lista": nueva.get("precio", f.get("precio_lista")),
+                "enganche_req": nueva.get("enganche_req", f.get("enganche_req"))})
+        ajuste = _ajustar_fila(llave, filas, "ubicacion_id", nueva["id"], lambda f: f, {
+            "ubicacion_id": nueva["id"], "etapa": nueva.get("etapa"), "manzana": nueva.get("manzana"),
+            "lote": nueva.get("lote"), "precio_lista": nueva.get("precio"),
+            "enganche_req": nueva.get("enganche_req"), "estatus_actual": "DISPONIBLE", "total_pagado": 0.0})
+        if ajuste is None:
+            return None
+        # El lote nuevo toma su ubicacion_id real al confirmar
+        agregada = [(f, {"ubicacion_id": "id"}) for f in ajuste[0] if f.get("ubicacion_id") == nueva["id"]]
+        return ajuste[0], agregada
+    return None
+
+
+def _parche_gastos_mensuales(llave, filas, tabla, operacion, nueva, anterior):
+    _, columnas, filtros, orden, _ = llave
+    campos = ["mes", "categoria", "total", "num_gastos"] if columnas == "*" else [c.strip() for c in columnas.split(",")]
+    if tabla != "gastos" or (operacion != "insert" and anterior is None):
+        return None
+    if not {"mes", "categoria"} <= set(campos) or any(c not in campos for _, c, _ in filtros):
+        return None
+
+    movimientos = []
+    if operacion != "insert":
+        movimientos.append((anterior, -1))
+    if operacion != "delete":
+        movimientos.append(({**(anterior or {}), **nueva}, 1))
+    por_mes = {(f.get("mes"), f.get("categoria")): dict(f) for f in filas}
+    for gasto, signo in movimientos:
+        clave = (str(gasto["fecha"])[:7] + "-01", gasto.get("categoria") or "Otros")
+        if clave not in por_mes:
+            if signo < 0:
+                return None
+            por_mes[clave] = {c: v for c, v in zip(["mes", "categoria", "total", "num_gastos"], [*clave, 0.0, 0])
+                              if c in campos}
+        fila = _sumar(por_mes[clave], total=signo * float(gasto.get("monto") or 0))
+        if "num_gastos" in fila:
+            fila["num_gastos"] = int(fila["num_gastos"] or 0) + signo
+    return _ordenar([f for f in por_mes.values() if _coincide(f, filtros)], orden), []
+
+
+_PARCHES_VISTAS = {
+    "vista_totales_pagos": _parche_totales_pagos,
+    "vista_estatus_lotes": _parche_estatus_lotes,
+    "gastos_mensuales": _parche_gastos_mensuales,
+}
+
+
+def _aplicar(tabla, operacion, nueva, anterior):
+    # Ajusta o descarta cada entrada de la caché que depende de `tabla`;
+    # devuelve (llave, fila, mapeo) de las filas agregadas para completarlas
+    # al confirmar
+    agregadas = []
+    with _lock:
+        _cambio()
+        for llave, (momento, deps, filas) in list(_cache.items()):
+            if tabla not in deps:
+                continue
+            parche = None
+            if _simple(llave):
+                parche = _parche_tabla if llave[0] == tabla else _PARCHES_VISTAS.get(llave[0])
+            ajuste = parche(llave, filas, tabla, operacion, nueva, anterior) if parche else None
+            if ajuste is None:
+                del _cache[llave]
+            else:
+                _cache[llave] = (momento, deps, ajuste[0])
+                agregadas.extend((llave, fila, mapeo) for fila, mapeo in ajuste[1])
+    return agregadas
+
+
+def escribir(supabase, tabla, operacion, valores=None, id_registro=None, anterior=None):
+    """Escritura optimista: insert, update o delete sobre `tabla`.
+
+    El cambio se ve en la siguiente lectura sin volver a la base y se confirma
+    en el pool de escrituras. `anterior` es la fila antes del cambio (update y
+    delete); sin ella las vistas que dependen de la tabla se vuelven a leer.
+    Devuelve el Future de la escritura: su resultado son las filas que
+    devolvió la base o, si falló, la excepción (el cambio local ya se deshizo)."""
+    if operacion == "insert":
+        nueva = {**valores, "id": next(_provisional)}
+    elif operacion == "update":
+        nueva = {**valores, "id": id_registro}
+    else:
+        nueva, anterior = None, {**(anterior or {}), "id": id_registro}
+    # La marca de escritura en curso se pone antes de ajustar la caché: una
+    # lectura que empezó antes y termina después ya no se guarda sin el cambio
+    _marcar_escritura(tabla, 1)
+    agregadas = _aplicar(tabla, operacion, nueva, anterior)
+    # Con fuente local las lecturas no pasan por la caché: el cambio también
+    # se aplica a la fuente hasta que se confirme
+    cerrar = _ajuste_local(tabla, operacion, nueva, anterior) if _ajuste_local else None
+
+    def confirmar():
+        try:
+            filas = _ejecutar_escritura(supabase, tabla, operacion, valores, id_registro)
+        except Exception:
+            if cerrar:
+                cerrar(None)
+            _marcar_escritura(tabla, -1)
+            invalidar(tabla)
+            raise
+        if cerrar:
+            cerrar(filas)
+        if operacion == "insert" and filas:
+            # Las filas provisionales toman el id y los valores que puso la base;
+            # `mapeo` es columna local -> columna de la base (None: todas). Con
+            # el id real la consulta se vuelve a ordenar
+            with _lock:
+                for llave, fila, mapeo in agregadas:
+                    fila.update(filas[0] if mapeo is None else
+                                {local: filas[0][col] for local, col in mapeo.items() if col in filas[0]})
+                    entrada = _cache.get(llave)
+                    if entrada is not None:
+                        _cache[llave] = (entrada[0], entrada[1], _ordenar(list(entrada[2]), llave[3]))
+        _marcar_escritura(tabla, -1)
+        _notificar(tabla, operacion, filas)
+        return filas
+    return _pool_escrituras.submit(confirmar)
@@ -0,0 +1,139 @@
+import threading
+
+import pandas as pd
+
+from modulos import datos, finanzas, normalizacion
+
+# --- DEVENGO DE COMISIONES (MATERIALIZADO) ---
+# La comisión devengada por pago se calcula para todo el historial una sola
+# vez. Después cada pago o venta nueva solo marca su contrato y en la
+# siguiente lectura se recalculan las filas de esos contratos; pasado el TTL
+# de la caché se vuelve a leer completo (ver datos.Pendientes). Los pagos a
+# vendedores (tabla chica) se leen de la caché en cada consulta. Con
+# usar_precalculado la lectura completa parte de la tabla comisiones_devengo
+# de worker.py y solo lee los pagos de los contratos que cambiaron.
+
+_VENTAS = ["id", "vendedor_id", "vendedor_nombre", "fecha_venta", "precio", "comision_monto"]
+_LLAVES = ["vendedor_id", "precio", "comision_monto", "pagado", "num_pagos"]
+
+_ventas = None
+_devengos = None
+_precalculado = False
+_pendientes = datos.Pendientes()
+_lock_calculo = threading.Lock()
+
+
+def _pagos(filas):
+    return pd.DataFrame(filas, columns=["venta_id", "fecha", "monto"])
+
+
+def usar_precalculado(activo=True):
+    # Arranca desde la tabla comisiones_devengo que llena worker.py
+    global _precalculado
+    _precalculado = activo
+
+
+def _desde_precalculado(supabase, ventas):
+    # Toma del cálculo nocturno el devengo de los contratos que no cambiaron
+    # (vendedor, precio, comisión ni pagos) y recalcula solo los demás
+    try:
+        filas = datos.consultar(supabase, "comisiones_devengo",
+                                ", ".join(["venta_id", "periodo", *_LLAVES, "cobrado", "devengado"]))
+    except Exception:
+        return None
+    pre = pd.DataFrame(filas, columns=["venta_id", "periodo", *_LLAVES, "cobrado", "devengado"])
+    totales = pd.DataFrame(datos.totales_por_venta(supabase), columns=["venta_id", "total_pagado", "num_pagos"])
+    totales = totales.set_index("venta_id")
+
+    actual = ventas.set_index("id")[_LLAVES[:3]].assign(pagado=totales["total_pagado"], num_pagos=totales["num_pagos"])
+    previo = pre.drop_duplicates("venta_id").set_index("venta_id")[_LLAVES].reindex(actual.index)
+    vigente = pd.Series(actual.index.isin(pre["venta_id"]), index=actual.index)
+    for col in _LLAVES:
+        a = pd.to_numeric(actual[col], errors="coerce").astype(float).fillna(0.0)
+        b = pd.to_numeric(previo[col], errors="coerce").astype(float).fillna(0.0)
+        vigente &= (a - b).abs() < 0.005
+    # Sin pagos no hay devengo que recalcular
+    vigente |= pd.to_numeric(actual["num_pagos"], errors="coerce").fillna(0) == 0
+
+    pre = pre[pre["venta_id"].isin(actual.index[vigente])]
+    fecha = pd.to_datetime(pre["periodo"], errors="coerce")
+    guardado = pd.DataFrame({
+        "venta_id": pre["venta_id"], "vendedor_id": pre["venta_id"].map(actual["vendedor_id"]), "fecha": fecha,
+        "periodo": fecha.dt.to_period("M"), "cobrado": pd.to_numeric(pre["cobrado"]).astype(float),
+        "devengado": pd.to_numeric(pre["devengado"]).astype(float),
+    }, columns=finanzas.COLUMNAS_DEVENGO)
+
+    ids = tuple(sorted(int(i) for i in actual.index[~vigente]))
+    if not ids:
+        return guardado
+    if len(ids) > datos.IDS_POR_CONSULTA:
+        pagos = datos.consultar(supabase, "pagos", "venta_id, fecha, monto")
+    else:
+        pagos = datos.consultar(supabase, "pagos", "venta_id, fecha, monto", filtros=[("in_", "venta_id", ids)])
+    nuevos = finanzas.devengar(ventas[ventas["id"].isin(ids)], _pagos(pagos))
+    return pd.concat([guardado, nuevos], ignore_index=True)
+
+
+def reiniciar():
+    # Fuerza una lectura completa en la siguiente consulta (botón Sincronizar)
+    _pendientes.reiniciar()
+
+
+def _actualizar(supabase):
+    completo, pendientes = _pendientes.tomar()
+    try:
+        _recalcular(supabase, completo or _ventas is None, pendientes)
+    except Exception:
+        _pendientes.reiniciar()
+        raise
+
+
+def _recalcular(supabase, completo, pendientes):
+    global _ventas, _devengos
+    if completo:
+        devengos = None
+        if _precalculado:
+            _ventas = datos.cargar_ventas(supabase).reindex(columns=_VENTAS)
+            devengos = _desde_precalculado(supabase, _ventas)
+        if devengos is None:
+            res = datos.en_paralelo({
+                "ventas": lambda: datos.cargar_ventas(supabase),
+                "pagos": lambda: datos.consultar(supabase, "pagos", "venta_id, fecha, monto"),
+            }, estricto=True)
+            _ventas = res["ventas"].reindex(columns=_VENTAS)
+            devengos = finanzas.devengar(_ventas, _pagos(res["pagos"]))
+        _devengos = devengos
+    elif pendientes:
+        ids = tuple(sorted(int(i) for i in pendientes))
+        res = datos.en_paralelo({
+            "ventas": lambda: datos.consultar(supabase, "ventas", datos.SELECT_VENTAS, filtros=[("in_", "id", ids)]),
+            "pagos": lambda: datos.consultar(supabase, "pagos", "venta_id, fecha, monto",
+                                             filtros=[("in_", "venta_id", ids)]),
+        }, estricto=True)
+        nuevas = normalizacion.aplanar_ventas(res["ventas"]).reindex(columns=_VENTAS)
+        _ventas = pd.concat([_ventas[~_ventas["id"].isin(ids)], nuevas], ignore_index=True)
+        _devengos = pd.concat([_devengos[~_devengos["venta_id"].isin(ids)],
+                               finanzas.devengar(nuevas, _pagos(res["pagos"]))], ignore_index=True)
+
+
+def resumen(supabase):
+    """Comisiones por venta, por vendedor y por vendedor y mes.
+
+    Devuelve un dict con "ventas" (total, devengada, pagada y pendiente por
+    venta), "vendedores" (lo mismo más por_devengar, con vendedor_nombre) y
+    "periodos" (devengado, pagado y saldo acumulado por mes)."""
+    pagadas = pd.DataFrame(datos.consultar(supabase, "comisiones_pagadas", "vendedor_id, monto_pagado, fecha_pago"),
+                           columns=["vendedor_id", "monto_pagado", "fecha_pago"])
+    pagadas["monto_pagado"] = pd.to_numeric(pagadas["monto_pagado"], errors="coerce").fillna(0.0)
+
+    with _lock_calculo:
+        _actualizar(supabase)
+        ventas, devengos = _ventas.copy(), _devengos.copy()
+
+    nombres = ventas.dropna(subset=["vendedor_id"]).drop_duplicates("vendedor_id").set_index("vendedor_id")["vendedor_nombre"]
+    por_venta = finanzas.comisiones_por_venta(ventas, devengos, pagadas)
+    vendedores = finanzas.comisiones_por_vendedor(por_venta, pagadas)
+    vendedores.insert(1, "vendedor_nombre", vendedores["vendedor_id"].map(nombres).fillna("N/A"))
+    periodos = finanzas.comisiones_por_periodo(devengos, pagadas)
+    periodos.insert(1, "vendedor_nombre", periodos["vendedor_id"].map(nombres).fillna("N/A"))
+    return {"ventas": por_venta, "vendedores": vendedores, "periodos": periodos}
@@ -1,19 +1,20 @@
 import streamlit as st
 import pandas as pd
+from modulos import datos, importacion, buscador, escrituras
 
 def render_directorio(supabase):
     st.header("👤 Directorio General")
 
     # --- 1. OBTENER DATOS ---
     try:
-        response = supabase.table("directorio").select("*").order("nombre").execute()
-        df = pd.DataFrame(response.data)
+        response = datos.consultar(supabase, "directorio", orden=[("nombre", False)])
+        df = pd.DataFrame(response)
     except Exception as e:
         st.error(f"Error al conectar con el directorio: {e}")
         return
 
     # --- 2. PESTAÑAS PRINCIPALES ---
-    tab_nuevo, tab_ver = st.tabs(["➕ Nuevo Registro", "📋 Ver Directorio"])
+    tab_nuevo, tab_ver, tab_importar = st.tabs(["➕ Nuevo Registro", "📋 Ver Directorio", "📥 Importar"])
 
     with tab_nuevo:
         with st.form("form_nuevo_registro", clear_on_submit=True):
@@ -47,12 +48,11 @@ def render_directorio(supabase):
                             return
 
                     try:
-                        supabase.table("directorio").insert({
+                        escrituras.escribir(supabase, "directorio", "insert", {
                             "nombre": nombre_limpio, "tipo": tipo,
                             "telefono": tel_clean if tel_clean else None,
                             "correo": correo.strip().lower() if correo.strip() else None
-                        }).execute()
-                        st.success(f"✅ {nombre_limpio} guardado.")
+                        }, aviso=f"✅ {nombre_limpio} guardado.")
                         st.rerun()
                     except Exception as e: st.error(f"Error: {e}")
 
@@ -68,9 +68,7 @@ def render_directorio(supabase):
             busqueda = st.text_input("🔍 Buscar por nombre en la lista seleccionada...", key="search_dir")
 
             def mostrar_tabla(tipo_filtro):
-                df_filtro = df[df['tipo'] == tipo_filtro].copy()
-                if busqueda:
-                    df_filtro = df_filtro[df_filtro['nombre'].str.contains(busqueda, case=False, na=False)]
+                df_filtro = buscador.filtrar(df[df['tipo'] == tipo_filtro], busqueda, ['nombre'], f"directorio_{tipo_filtro}").copy()
                 
                 if df_filtro.empty:
                     st.warning(f"No se encontraron {tipo_filtro.lower()}s.")
@@ -115,12 +113,12 @@ def render_directorio(supabase):
                         if st.form_submit_button("💾 GUARDAR CAMBIOS"):
                             etel_clean = "".join(filter(str.isdigit, etel_input))
                             try:
-                                supabase.table("directorio").update({
+                                escrituras.escribir(supabase, "directorio", "update", {
                                     "nombre": enombre.strip(), "tipo": etipo,
                                     "telefono": etel_clean if etel_clean else None,
                                     "correo": email.strip().lower() if email.strip() else None
-                                }).eq("id", d['id']).execute()
-                                st.success("¡Actualizado!"); st.rerun()
+                                }, int(d['id']), aviso="¡Actualizado!")
+                                st.rerun()
                             except Exception as e: st.error(f"Error: {e}")
 
                     st.markdown("---")
@@ -129,8 +127,11 @@ def render_directorio(supabase):
                     
                     if confirmar_check:
                         if st.button(f"ELIMINAR REGISTRO", type="primary", use_container_width=True):
-                            try:
-                                supabase.table("directorio").delete().eq("id", d['id']).execute()
-                                st.warning("Registro eliminado."); st.rerun()
-                            except Exception as e:
-                                st.error("❌ No se puede eliminar: El contacto tiene ventas o pagos asociados.")
+                            # Si tiene ventas o pagos asociados la base lo rechaza y el cambio se deshace
+                            escrituras.escribir(supabase, "directorio", "delete", id_registro=int(d['id']),
+                                                aviso=f"Registro de {d['nombre']} eliminado")
+                            st.rerun()
+
+    with tab_importar:
+        st.subheader("Importar contactos desde archivo")
+        importacion.render_importacion(supabase, "directorio")
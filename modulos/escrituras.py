@@ -0,0 +1,45 @@
+from concurrent.futures import wait
+
+import streamlit as st
+from modulos import datos
+
+# --- ESCRITURAS DESDE FORMULARIOS ---
+# Las páginas guardan con datos.escribir (optimista) y vuelven a dibujarse
+# desde la caché ya ajustada. Cada escritura queda en la sesión y app.py
+# llama a revisar() al inicio de cada corrida, para avisar de lo que se
+# confirmó o se rechazó desde la anterior, y al final con `esperar`, para
+# dar tiempo a las que siguen en curso. El aviso de éxito sale solo cuando
+# la base confirmó; si la rechazó, el cambio se deshizo y se avisa el error.
+# Los borrados esperan la respuesta: la base los rechaza si el registro
+# tiene otros asociados (ventas, pagos) y el aviso debe salir en su lugar.
+
+ESPERA_SEGUNDOS = 3
+
+
+def escribir(supabase, tabla, operacion, valores=None, id_registro=None, anterior=None, aviso="Cambio guardado"):
+    futuro = datos.escribir(supabase, tabla, operacion, valores, id_registro, anterior)
+    if operacion == "delete":
+        wait([futuro])
+    st.session_state.setdefault("escrituras", []).append({"aviso": aviso, "futuro": futuro})
+    return futuro
+
+
+def revisar(esperar=0):
+    escrituras = st.session_state.get("escrituras", [])
+    if esperar and escrituras:
+        wait([e["futuro"] for e in escrituras], timeout=esperar)
+        if any(e["futuro"].done() and e["futuro"].exception() is not None for e in escrituras):
+            # La página se dibujó con un cambio que ya se deshizo: se vuelve a
+            # dibujar y el error sale al inicio de la siguiente corrida
+            st.rerun()
+
+    pendientes = []
+    for escritura in escrituras:
+        futuro = escritura["futuro"]
+        if not futuro.done():
+            pendientes.append(escritura)
+        elif futuro.exception() is not None:
+            st.error(f"🚨 No se pudo guardar ({escritura['aviso']}); se deshizo el cambio: {futuro.exception()}")
+        else:
+            st.toast(escritura["aviso"], icon="✅")
+    st.session_state["escrituras"] = pendientes
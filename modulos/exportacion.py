@@ -0,0 +1,198 @@
+import contextlib
+import csv
+import io
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+
+import pandas as pd
+
+from modulos import antiguedad, datos, finanzas
+
+# --- EXPORTACIÓN MASIVA ---
+# Genera un zip con el reporte de cartera, el plan de pagos consolidado y un
+# estado de cuenta por contrato (CSV, XLSX o PDF). Se procesa por bloques de
+# contratos: en memoria solo vive el plan y los pagos del bloque actual.
+# XLSX usa openpyxl y PDF usa fpdf2 (ambos en requirements.txt).
+
+TAM_BLOQUE = 500
+FORMATOS = ("csv", "xlsx", "pdf")
+
+COLUMNAS_CARTERA = {
+    "id": "Contrato", "cliente_nombre": "Cliente", "lote_ref": "Lote", "fecha_venta": "Fecha venta",
+    "plazo": "Plazo", "precio": "Precio", "enganche_req": "Enganche", "pagado": "Pagado",
+    "esperado": "Esperado", "monto_vencido": "Vencido", "atraso": "Días atraso", "estatus": "Estatus",
+}
+
+
+def formato_plan(plan):
+    # Tabla de amortización tal como se muestra en Detalle de Crédito
+    return pd.DataFrame({
+        "Mes": "Mes " + plan['num_cuota'].astype(str).str.zfill(2),
+        "Vencimiento": plan['vencimiento'].dt.strftime('%d/%m/%Y'),
+        "Cuota": plan['cuota'].round(2),
+        "Abonado": plan['abonado'].round(2),
+        "Saldo": plan['saldo'].round(2),
+        "Estatus": plan['estatus'],
+    })
+
+
+def _resumen(venta):
+    fecha = pd.Timestamp(venta['fecha_venta'])
+    return [
+        ("Cliente", venta['cliente_nombre'] if pd.notna(venta['cliente_nombre']) else "N/A"),
+        ("Lote", venta['lote_ref']),
+        ("Contrato", int(venta['id'])),
+        ("Fecha de venta", fecha.strftime('%d/%m/%Y') if pd.notna(fecha) else ""),
+        ("Plazo (meses)", venta['plazo']),
+        ("Precio", round(float(venta['precio'] or 0), 2)),
+        ("Enganche", round(float(venta['enganche_req'] or 0), 2)),
+        ("Total pagado", round(float(venta['pagado']), 2)),
+        ("Saldo restante", round(float(finanzas.saldo(venta['precio'] or 0, venta['pagado'])), 2)),
+        ("Monto vencido", round(float(venta['monto_vencido']), 2)),
+        ("Días de atraso", int(venta['atraso'])),
+        ("Estatus", venta['estatus']),
+    ]
+
+
+def _nombre_archivo(venta):
+    nombre = f"{venta['lote_ref']}_{venta['cliente_nombre']}_{int(venta['id'])}"
+    return re.sub(r"[^\w\-]+", "_", nombre).strip("_")
+
+
+# --- ESTADOS DE CUENTA POR FORMATO ---
+def _estado_csv(venta, plan, pagos):
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(["Estado de cuenta"])
+    escritor.writerows(_resumen(venta))
+    escritor.writerow([])
+    escritor.writerow(plan.columns)
+    escritor.writerows(plan.itertuples(index=False, name=None))
+    escritor.writerow([])
+    escritor.writerow(["Pagos"])
+    escritor.writerow(pagos.columns)
+    escritor.writerows(pagos.itertuples(index=False, name=None))
+    return salida.getvalue().encode("utf-8-sig")
+
+
+def _estado_xlsx(venta, plan, pagos):
+    salida = io.BytesIO()
+    with pd.ExcelWriter(salida, engine="openpyxl") as libro:
+        pd.DataFrame(_resumen(venta), columns=["Campo", "Valor"]).to_excel(libro, sheet_name="Resumen", index=False)
+        plan.to_excel(libro, sheet_name="Plan de pagos", index=False)
+        pagos.to_excel(libro, sheet_name="Pagos", index=False)
+    return salida.getvalue()
+
+
+def _texto_pdf(valor):
+    # Las fuentes base del PDF son latin-1: se descartan emojis de estatus
+    return str(valor).encode("latin-1", "ignore").decode("latin-1").strip()
+
+
+def _estado_pdf(venta, plan, pagos):
+    from fpdf import FPDF
+
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", "B", 14)
+    pdf.cell(0, 10, "Valle Mart - Estado de cuenta")
+    pdf.ln()
+    pdf.set_font("Helvetica", size=10)
+    for campo, valor in _resumen(venta):
+        pdf.cell(50, 6, _texto_pdf(campo))
+        pdf.cell(0, 6, _texto_pdf(valor))
+        pdf.ln()
+
+    for titulo, tabla in (("Plan de pagos", plan), ("Pagos", pagos)):
+        pdf.ln(4)
+        pdf.set_font("Helvetica", "B", 11)
+        pdf.cell(0, 8, titulo)
+        pdf.ln()
+        ancho = 190 / max(1, len(tabla.columns))
+        pdf.set_font("Helvetica", "B", 9)
+        for col in tabla.columns:
+            pdf.cell(ancho, 6, _texto_pdf(col), border=1)
+        pdf.ln()
+        pdf.set_font("Helvetica", size=9)
+        for fila in tabla.itertuples(index=False, name=None):
+            for valor in fila:
+                pdf.cell(ancho, 6, _texto_pdf(f"{valor:,.2f}" if isinstance(valor, float) else valor), border=1)
+            pdf.ln()
+    return bytes(pdf.output())
+
+
+_ESTADOS = {"csv": _estado_csv, "xlsx": _estado_xlsx, "pdf": _estado_pdf}
+
+
+# --- PROCESO POR BLOQUES ---
+def _pagos_bloque(supabase, ids):
+    filas = datos.consultar(supabase, "pagos", "venta_id, fecha, folio, monto",
+                            filtros=[("in_", "venta_id", tuple(int(i) for i in ids))],
+                            orden=[("fecha", False)], cache=False)
+    df = pd.DataFrame(filas, columns=["venta_id", "fecha", "folio", "monto"])
+    return {v: g.drop(columns="venta_id") for v, g in df.groupby("venta_id")}
+
+
+def exportar(supabase, destino, formatos=("csv",), estados=True, tamano=TAM_BLOQUE, avance=None, cartera=None):
+    """Escribe el zip de exportación en `destino` (ruta o archivo binario).
+
+    `cartera` es la antigüedad de la cartera de `supabase` (ej. la de
+    antiguedad.cartera en la app); sin ella se calcula aquí con ese mismo
+    cliente. `avance(hechos, total)` se llama al terminar cada bloque de
+    contratos."""
+    if cartera is None:
+        cartera = antiguedad.calcular(antiguedad.leer(supabase), pd.Timestamp.now().normalize())
+    total = len(cartera)
+    vacio_pagos = pd.DataFrame(columns=["fecha", "folio", "monto"])
+
+    with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as zf, \
+            tempfile.TemporaryFile("w+", encoding="utf-8", newline="") as plan_total:
+        reporte = cartera[list(COLUMNAS_CARTERA)].round(
+            {"precio": 2, "enganche_req": 2, "pagado": 2, "esperado": 2, "monto_vencido": 2}
+        ).rename(columns=COLUMNAS_CARTERA)
+        with zf.open("cartera.csv", "w") as binario, \
+                io.TextIOWrapper(binario, encoding="utf-8-sig", newline="") as texto:
+            for i in range(0, total, tamano):
+                reporte.iloc[i:i + tamano].to_csv(texto, header=(i == 0), index=False)
+
+        for i in range(0, total, tamano):
+            bloque = cartera.iloc[i:i + tamano]
+            plan = finanzas.plan_de_pagos(bloque)
+            plan.round({"cuota": 2, "abonado": 2, "saldo": 2}).to_csv(plan_total, header=(i == 0), index=False)
+
+            if estados:
+                pagos = _pagos_bloque(supabase, bloque['id'])
+                # Se da formato al plan del bloque completo y luego se reparte por contrato
+                plan_fmt = formato_plan(plan)
+                planes = dict(tuple(plan_fmt.groupby(plan["venta_id"].to_numpy())))
+                vacio_plan = plan_fmt.iloc[0:0]
+                for venta in bloque.to_dict("records"):
+                    plan_v = planes.get(venta['id'], vacio_plan)
+                    pagos_v = pagos.get(venta['id'], vacio_pagos)
+                    nombre = _nombre_archivo(venta)
+                    for formato in formatos:
+                        zf.writestr(f"estados_de_cuenta/{formato}/{nombre}.{formato}",
+                                    _ESTADOS[formato](venta, plan_v, pagos_v))
+            if avance:
+                avance(min(i + tamano, total), total)
+
+        plan_total.seek(0)
+        with zf.open("plan_de_pagos.csv", "w") as binario, \
+                io.TextIOWrapper(binario, encoding="utf-8-sig", newline="") as texto:
+            shutil.copyfileobj(plan_total, texto)
+    return total
+
+
+@contextlib.contextmanager
+def zip_temporal(supabase, formatos=("csv",), estados=True, avance=None, cartera=None):
+    """Genera el zip en un archivo temporal en disco y entrega (total, archivo)
+    con el archivo ya reabierto en "rb" (io.BufferedReader, lo que acepta
+    st.download_button). El archivo se borra al salir del bloque."""
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta = os.path.join(carpeta, "exportacion.zip")
+        total = exportar(supabase, ruta, formatos, estados, avance=avance, cartera=cartera)
+        with open(ruta, "rb") as archivo:
+            yield total, archivo
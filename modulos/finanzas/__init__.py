@@ -0,0 +1,13 @@
+# --- NÚCLEO FINANCIERO ---
+# Cálculos de cartera sin dependencia de Streamlit ni de la base: reciben
+# DataFrames planos (o escalares) y devuelven resultados para toda la cartera
+# de una sola vez. Lo usan las páginas, worker.py y los benchmarks.
+
+from modulos.finanzas.mora import PLAZO_DEFAULT, TOLERANCIA_MORA, calcular_mora
+from modulos.finanzas.amortizacion import (CUBIERTO, PARCIAL, PENDIENTE, TOLERANCIA_CUOTA, plan_de_pagos,
+                                           plan_vigente)
+from modulos.finanzas.saldos import resumen_cobro, saldo
+from modulos.finanzas.flujo import ESCENARIOS, gasto_mensual, proyectar_flujo, puntualidad
+from modulos.finanzas.comisiones import (COLUMNAS_DEVENGO, comisiones_por_periodo, comisiones_por_vendedor,
+                                         comisiones_por_venta, devengar, devengo_mensual)
+from modulos.finanzas.gastos import presupuesto_contra_real, tendencia_gastos
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from modulos.finanzas.mora import PLAZO_DEFAULT, _sumar_meses
+
+# --- PLAN DE PAGOS (AMORTIZACIÓN) ---
+CUBIERTO = "✅ Cubierto"
+PARCIAL = "⚠️ Parcial"
+PENDIENTE = "⏳ Pendiente"
+TOLERANCIA_CUOTA = 0.05
+
+
+def plan_de_pagos(df):
+    """Genera el plan de pagos de todos los contratos en formato largo.
+
+    `df` debe traer id, precio, enganche_req, plazo, fecha_venta y pagado.
+    Lo pagado después del enganche cubre las cuotas en orden; una cuota se
+    da por cubierta si falta menos de 5 centavos. Devuelve venta_id,
+    num_cuota, vencimiento, cuota, abonado, saldo y estatus."""
+    precio = pd.to_numeric(df["precio"], errors="coerce").to_numpy(dtype=float)
+    enganche = pd.to_numeric(df["enganche_req"], errors="coerce").to_numpy(dtype=float)
+    plazo = pd.to_numeric(df["plazo"], errors="coerce").fillna(0).astype(np.int64).to_numpy()
+    plazo = np.where(plazo != 0, plazo, PLAZO_DEFAULT)
+    pagado = pd.to_numeric(df["pagado"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    f_vta = pd.to_datetime(df["fecha_venta"], errors="coerce")
+    valido = ~np.isnan(precio) & ~np.isnan(enganche) & f_vta.notna().to_numpy()
+
+    mensualidad = np.where(plazo > 0, (precio - enganche) / np.where(plazo > 0, plazo, 1), 0.0)
+    bolsa = np.maximum(0.0, pagado - enganche)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cubiertas = np.where(mensualidad > 0, np.floor((bolsa + TOLERANCIA_CUOTA) / mensualidad), plazo)
+    cubiertas = np.clip(np.nan_to_num(cubiertas), 0, np.maximum(plazo, 0)).astype(np.int64)
+    residuo = bolsa - cubiertas * mensualidad
+
+    n = np.where(valido, np.maximum(plazo, 0), 0)
+    fila = np.repeat(np.arange(len(df)), n)
+    inicio = np.concatenate([[0], np.cumsum(n)[:-1]]) if len(n) else np.array([], dtype=np.int64)
+    num = np.arange(len(fila)) - np.repeat(inicio, n) + 1
+
+    cuota = mensualidad[fila]
+    cubierto = num <= cubiertas[fila]
+    # Restos de menos de medio centavo son ruido de punto flotante, no un abono parcial
+    parcial = ~cubierto & (num == cubiertas[fila] + 1) & (residuo[fila] > 0.005)
+    abonado = np.where(cubierto, cuota, np.where(parcial, residuo[fila], 0.0))
+
+    acumulado = np.cumsum(abonado)
+    previo = np.concatenate([[0.0], acumulado])[np.repeat(inicio, n)]
+    saldo = np.maximum(0.0, (precio - enganche)[fila] - (acumulado - previo))
+
+    return pd.DataFrame({
+        "venta_id": df["id"].to_numpy()[fila],
+        "num_cuota": num,
+        "vencimiento": _sumar_meses(f_vta.iloc[fila], num),
+        "cuota": cuota,
+        "abonado": abonado,
+        "saldo": saldo,
+        "estatus": np.select([cubierto, parcial], [CUBIERTO, PARCIAL], PENDIENTE),
+    })
+
+
+def plan_vigente(plan, contrato):
+    """Indica si `plan` (las cuotas guardadas de un contrato, ej. la tabla
+    plan_pagos de worker.py) sigue correspondiendo a `contrato`.
+
+    `contrato` trae precio, enganche_req, plazo, fecha_venta y pagado. Se
+    comparan el número de cuotas, la cuota, el total abonado y el primer
+    vencimiento; los montos guardados vienen redondeados a centavos."""
+    precio = float(contrato["precio"] or 0)
+    enganche = float(contrato["enganche_req"] or 0)
+    plazo = int(contrato["plazo"] or 0) or PLAZO_DEFAULT
+    if len(plan) != plazo or pd.isna(contrato["fecha_venta"]):
+        return False
+    mensualidad = (precio - enganche) / plazo
+    bolsa = min(max(0.0, float(contrato["pagado"] or 0) - enganche), precio - enganche)
+    cuota = pd.to_numeric(plan["cuota"], errors="coerce").to_numpy(dtype=float)
+    abonado = pd.to_numeric(plan["abonado"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    primero = pd.to_datetime(plan["vencimiento"], errors="coerce").min()
+    esperado = _sumar_meses(pd.Series([pd.Timestamp(contrato["fecha_venta"])]), np.array([1]))[0]
+    return bool(
+        (np.abs(cuota - mensualidad) <= 0.01).all()
+        and abs(abonado.sum() - bolsa) <= TOLERANCIA_CUOTA + 0.01 * plazo
+        and primero == pd.Timestamp(esperado).normalize()
+    )
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+
+# --- DEVENGO DE COMISIONES ---
+# La comisión de una venta se gana conforme se cobra: cada pago devenga
+# comision_monto * monto / precio, hasta que lo cobrado cubre el precio.
+# Lo pagado a cada vendedor se reparte entre sus ventas de la más antigua
+# a la más reciente; lo pagado de más queda como anticipo del vendedor.
+
+COLUMNAS_DEVENGO = ["venta_id", "vendedor_id", "fecha", "periodo", "cobrado", "devengado"]
+
+
+def devengar(ventas, pagos):
+    """Comisión devengada por cada pago.
+
+    `ventas` trae id, vendedor_id, precio y comision_monto; `pagos` trae
+    venta_id, fecha y monto. Devuelve una fila por pago con venta_id,
+    vendedor_id, fecha, periodo (mes del pago), cobrado y devengado."""
+    base = ventas[["id", "vendedor_id", "precio", "comision_monto"]].rename(columns={"id": "venta_id"})
+    df = pagos[["venta_id", "fecha", "monto"]].merge(base, on="venta_id", how="inner")
+    if df.empty:
+        return pd.DataFrame(columns=COLUMNAS_DEVENGO)
+    df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce")
+    df = df.sort_values(["venta_id", "fecha"], kind="stable").reset_index(drop=True)
+
+    monto = pd.to_numeric(df["monto"], errors="coerce").fillna(0.0).to_numpy(float)
+    precio = df["precio"].astype(float).fillna(0.0).to_numpy()
+    comision = df["comision_monto"].astype(float).fillna(0.0).to_numpy()
+    acumulado = pd.Series(monto).groupby(df["venta_id"].to_numpy()).cumsum().to_numpy()
+
+    # Solo cuenta lo cobrado hasta cubrir el precio
+    cobrado = np.minimum(acumulado, precio) - np.minimum(acumulado - monto, precio)
+    tasa = np.divide(comision, precio, out=np.zeros_like(precio), where=precio > 0)
+
+    df["cobrado"] = cobrado
+    df["devengado"] = cobrado * tasa
+    df["periodo"] = df["fecha"].dt.to_period("M")
+    return df[COLUMNAS_DEVENGO]
+
+
+def devengo_mensual(devengos):
+    # Cobrado y devengado sumados por venta y mes (los guarda worker.py en la
+    # tabla comisiones_devengo)
+    return devengos.groupby(["venta_id", "periodo"], as_index=False, sort=True)[["cobrado", "devengado"]].sum()
+
+
+def comisiones_por_venta(ventas, devengos, pagadas):
+    """Comisión total, devengada, pagada y pendiente por venta.
+
+    `pagadas` trae vendedor_id y monto_pagado (comisiones_pagadas)."""
+    df = ventas[["id", "vendedor_id", "fecha_venta", "comision_monto"]].rename(columns={"id": "venta_id"})
+    df = df[df["vendedor_id"].notna()].sort_values(["vendedor_id", "fecha_venta", "venta_id"], kind="stable")
+    devengada = devengos.groupby("venta_id")["devengado"].sum()
+    df["comision_total"] = df["comision_monto"].astype(float).fillna(0.0)
+    df["devengada"] = df["venta_id"].map(devengada).astype(float).fillna(0.0)
+
+    # Reparto FIFO: cada venta recibe lo que queda del pago del vendedor
+    # después de cubrir las ventas anteriores
+    pagado = pagadas.groupby("vendedor_id")["monto_pagado"].sum()
+    disponible = df["vendedor_id"].map(pagado).astype(float).fillna(0.0)
+    antes = df.groupby("vendedor_id")["devengada"].cumsum() - df["devengada"]
+    df["pagada"] = np.clip(disponible - antes, 0.0, df["devengada"])
+    df["pendiente"] = df["devengada"] - df["pagada"]
+    return df.drop(columns="comision_monto").reset_index(drop=True)
+
+
+def comisiones_por_vendedor(ventas_comision, pagadas):
+    # Totales por vendedor; comision_pagada incluye anticipos sobre lo no devengado
+    df = ventas_comision.groupby("vendedor_id").agg(
+        comision_total=("comision_total", "sum"), comision_devengada=("devengada", "sum"))
+    pagado = pagadas.groupby("vendedor_id")["monto_pagado"].sum().astype(float)
+    df = df.join(pagado.rename("comision_pagada"), how="outer").fillna(0.0)
+    df["saldo_pendiente"] = df["comision_devengada"] - df["comision_pagada"]
+    df["por_devengar"] = df["comision_total"] - df["comision_devengada"]
+    return df.reset_index()
+
+
+def comisiones_por_periodo(devengos, pagadas):
+    # Devengado y pagado por vendedor y mes, con el saldo acumulado al cierre
+    devengado = devengos.groupby(["vendedor_id", "periodo"])["devengado"].sum()
+    fecha_pago = pd.to_datetime(pagadas["fecha_pago"], errors="coerce")
+    pagado = pagadas.groupby([pagadas["vendedor_id"], fecha_pago.dt.to_period("M").rename("periodo")])[
+        "monto_pagado"].sum().rename("pagado")
+    df = pd.concat([devengado, pagado.astype(float)], axis=1).fillna(0.0).sort_index()
+    df["saldo"] = (df["devengado"] - df["pagado"]).groupby(level="vendedor_id").cumsum()
+    return df.reset_index()
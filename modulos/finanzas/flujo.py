@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+from modulos.finanzas.mora import PLAZO_DEFAULT, calcular_mora
+
+# --- PROYECCIÓN DE FLUJO DE EFECTIVO ---
+ESCENARIOS = ("Contractual", "Histórico", "Conservador")
+
+
+def puntualidad(df):
+    """Fracción de lo exigible que cada cliente ha pagado (0 a 1).
+
+    Se agrupa por cliente_id sobre todos sus contratos; un cliente sin nada
+    exigible todavía cuenta como puntual. `df` trae cliente_id, pagado y
+    esperado (ver calcular_mora)."""
+    por_cliente = df.groupby("cliente_id", dropna=False)[["pagado", "esperado"]].transform("sum")
+    razon = (por_cliente["pagado"] / por_cliente["esperado"]).where(por_cliente["esperado"] > 0, 1.0)
+    return razon.fillna(1.0).clip(0.0, 1.0)
+
+
+def gasto_mensual(gastos, hoy=None, meses=12):
+    # Promedio de gasto de los últimos `meses` meses completos (los meses sin
+    # gastos cuentan como cero)
+    if gastos is None or len(gastos) == 0:
+        return 0.0
+    actual = pd.Timestamp(hoy or datetime.now()).to_period("M")
+    periodo = pd.to_datetime(gastos["fecha"], errors="coerce").dt.to_period("M")
+    monto = pd.to_numeric(gastos["monto"], errors="coerce").fillna(0.0)
+    ventana = (periodo < actual) & (periodo >= actual - meses)
+    return float(monto[ventana].sum()) / meses
+
+
+def proyectar_flujo(df, meses=24, hoy=None, gasto_recurrente=0.0, comisiones_pendientes=0.0):
+    """Proyecta cobranza y flujo neto por mes para los próximos `meses`.
+
+    `df` trae las columnas de calcular_mora más cliente_id. Escenarios:
+    Contractual (todo a tiempo y lo vencido se cobra el primer mes),
+    Histórico (cada mensualidad por la puntualidad del cliente) y
+    Conservador (puntualidad al cuadrado, castiga más a quien paga peor).
+    A ningún contrato se le proyecta más que su saldo. Las comisiones
+    pendientes se restan en el primer mes. Devuelve una fila por mes y
+    escenario con ingresos, gastos, comisiones, neto y acumulado."""
+    hoy = pd.Timestamp(hoy or datetime.now())
+    mora = calcular_mora(df, hoy)
+    base = pd.DataFrame({"cliente_id": df["cliente_id"], "pagado": pd.to_numeric(df["pagado"], errors="coerce").fillna(0.0),
+                         "esperado": mora["esperado"]})
+    p = puntualidad(base).to_numpy()
+
+    precio = pd.to_numeric(df["precio"], errors="coerce").fillna(0.0).to_numpy()
+    enganche = pd.to_numeric(df["enganche_req"], errors="coerce").fillna(0.0).to_numpy()
+    plazo = pd.to_numeric(df["plazo"], errors="coerce").fillna(0).astype(np.int64).to_numpy()
+    plazo = np.where(plazo != 0, plazo, PLAZO_DEFAULT)
+    mensualidad = np.where(plazo > 0, (precio - enganche) / np.where(plazo > 0, plazo, 1), 0.0)
+    saldo = np.maximum(0.0, precio - base["pagado"].to_numpy())
+    vencido = mora["monto_vencido"].to_numpy()
+
+    # Número de cuota que vence en cada mes futuro: meses transcurridos + t
+    t = np.arange(1, meses + 1)
+    cuota = mora["meses"].to_numpy()[:, None] + t[None, :]
+    programado = np.where((cuota >= 1) & (cuota <= plazo[:, None]), mensualidad[:, None], 0.0)
+
+    contractual = programado.copy()
+    if meses:
+        contractual[:, 0] += vencido
+    flujos = {
+        "Contractual": contractual,
+        "Histórico": programado * p[:, None],
+        "Conservador": programado * (p ** 2)[:, None],
+    }
+
+    periodos = pd.period_range(hoy.to_period("M") + 1, periods=meses, freq="M")
+    comisiones = np.zeros(meses)
+    if meses:
+        comisiones[0] = comisiones_pendientes
+    salida = []
+    for escenario in ESCENARIOS:
+        acumulado = np.minimum(np.cumsum(flujos[escenario], axis=1), saldo[:, None])
+        ingresos = np.diff(acumulado, axis=1, prepend=0.0).sum(axis=0)
+        neto = ingresos - gasto_recurrente - comisiones
+        salida.append(pd.DataFrame({
+            "mes": periodos.to_timestamp(),
+            "escenario": escenario,
+            "ingresos": ingresos,
+            "gastos": gasto_recurrente,
+            "comisiones": comisiones,
+            "neto": neto,
+            "acumulado": np.cumsum(neto),
+        }))
+    return pd.concat(salida, ignore_index=True)
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+# --- ANÁLISIS DE GASTOS ---
+# Trabaja sobre el resumen mes × categoría (gastos_mensuales), nunca sobre
+# el detalle: el costo depende de los meses mostrados, no de los gastos.
+
+
+def _por_mes(df, columna):
+    df = pd.DataFrame(df, columns=["mes", "categoria", columna])
+    df["mes"] = pd.to_datetime(df["mes"], errors="coerce").dt.to_period("M")
+    df[columna] = pd.to_numeric(df[columna], errors="coerce").fillna(0.0)
+    return df
+
+
+def tendencia_gastos(resumen, meses=12, hoy=None):
+    """Tabla mes × categoría de los últimos `meses` meses (incluido el actual).
+
+    Los meses sin gastos aparecen en cero para que las gráficas no salten."""
+    df = _por_mes(resumen, "total")
+    actual = pd.Timestamp(hoy or pd.Timestamp.now()).to_period("M")
+    periodos = pd.period_range(actual - (meses - 1), actual, freq="M")
+    tabla = df[df["mes"].isin(periodos)].pivot_table(
+        index="mes", columns="categoria", values="total", aggfunc="sum", fill_value=0.0)
+    return tabla.reindex(periodos, fill_value=0.0).rename_axis("mes")
+
+
+def presupuesto_contra_real(resumen, presupuesto, mes):
+    """Presupuesto, real, diferencia y % ejercido por categoría en `mes`.
+
+    `presupuesto` trae mes, categoria y monto (presupuesto_gastos)."""
+    mes = pd.Period(mes, "M")
+    real = _por_mes(resumen, "total")
+    plan = _por_mes(presupuesto, "monto")
+    real = real[real["mes"] == mes].groupby("categoria")["total"].sum()
+    plan = plan[plan["mes"] == mes].groupby("categoria")["monto"].sum()
+    df = pd.concat([plan.rename("presupuesto"), real.rename("real")], axis=1).fillna(0.0)
+    df["diferencia"] = df["presupuesto"] - df["real"]
+    df["ejercido"] = np.divide(df["real"], df["presupuesto"],
+                               out=np.full(len(df), np.nan), where=df["presupuesto"].to_numpy() > 0)
+    return df.rename_axis("categoria").reset_index()
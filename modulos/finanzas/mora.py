@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+# --- MORA ---
+# Esperado a la fecha, monto vencido y días de atraso de toda la cartera.
+
+PLAZO_DEFAULT = 12
+TOLERANCIA_MORA = 100
+
+
+def _sumar_meses(fechas, meses):
+    # Equivalente vectorizado de fecha + pd.DateOffset(months=n):
+    # si el día no existe en el mes destino se ajusta al último día.
+    f = fechas.to_numpy(dtype="datetime64[ns]")
+    dias = f.astype("datetime64[D]")
+    mes = dias.astype("datetime64[M]")
+    dia = (dias - mes.astype("datetime64[D]")).astype(np.int64)
+    hora = f - dias.astype("datetime64[ns]")
+
+    destino = mes + meses.astype("timedelta64[M]")
+    dias_mes = ((destino + 1).astype("datetime64[D]") - destino.astype("datetime64[D]")).astype(np.int64)
+    dia = np.minimum(dia, dias_mes - 1)
+    return destino.astype("datetime64[D]") + dia.astype("timedelta64[D]") + hora
+
+
+def calcular_mora(df, hoy=None):
+    """Calcula el atraso de toda la cartera.
+
+    `df` debe traer las columnas precio, enganche_req, plazo, fecha_venta y
+    pagado. Devuelve meses, esperado, monto_vencido y atraso (días) con el
+    mismo índice de `df`."""
+    hoy = pd.Timestamp(hoy or datetime.now())
+
+    precio = pd.to_numeric(df["precio"], errors="coerce")
+    enganche = pd.to_numeric(df["enganche_req"], errors="coerce")
+    plazo = pd.to_numeric(df["plazo"], errors="coerce").fillna(0).astype(np.int64)
+    plazo = plazo.where(plazo != 0, PLAZO_DEFAULT)
+    pagado = pd.to_numeric(df["pagado"], errors="coerce").fillna(0.0)
+    f_vta = pd.to_datetime(df["fecha_venta"], errors="coerce")
+    valido = precio.notna() & enganche.notna() & f_vta.notna()
+
+    mensualidad = ((precio - enganche) / plazo).where(plazo > 0, 0.0)
+    meses = (hoy.year - f_vta.dt.year) * 12 + (hoy.month - f_vta.dt.month)
+    esperado = enganche + meses.clip(lower=0) * mensualidad
+    saldo = (esperado - pagado).clip(lower=0.0)
+
+    # Mensualidades cubiertas con lo pagado después del enganche
+    cubiertas = ((pagado - enganche) / mensualidad).where(mensualidad > 0, 0.0)
+    cubiertas = np.floor(cubiertas.clip(lower=0).fillna(0)).astype(np.int64) + 1
+    en_mora = valido & (saldo > TOLERANCIA_MORA)
+
+    atraso = np.zeros(len(df), dtype=np.int64)
+    if en_mora.any():
+        vence = _sumar_meses(f_vta[en_mora], cubiertas[en_mora].to_numpy())
+        dias = (np.datetime64(hoy.to_datetime64(), "ns") - vence) // np.timedelta64(1, "D")
+        atraso[en_mora.to_numpy()] = np.maximum(0, dias)
+
+    return pd.DataFrame({
+        "meses": meses.where(valido, 0).fillna(0).astype(np.int64),
+        "esperado": esperado.where(valido, 0.0),
+        "monto_vencido": saldo.where(valido, 0.0),
+        "atraso": atraso,
+    }, index=df.index)
@@ -0,0 +1,26 @@
+import numpy as np
+
+# --- SALDOS Y ENGANCHE ---
+# Acepta escalares (un contrato en pantalla) o columnas completas.
+
+
+def saldo(precio, pagado):
+    return np.maximum(0.0, np.asarray(precio, dtype=float) - np.asarray(pagado, dtype=float))
+
+
+def resumen_cobro(precio, enganche, pagado, plazo):
+    """Faltante de enganche, saldo total, mensualidad base y pago sugerido
+    (lo que falte de enganche o, si ya se cubrió, una mensualidad)."""
+    precio = np.asarray(precio, dtype=float)
+    enganche = np.asarray(enganche, dtype=float)
+    pagado = np.asarray(pagado, dtype=float)
+    plazo = np.asarray(plazo, dtype=float)
+
+    faltante = np.maximum(0.0, enganche - pagado)
+    mensualidad = np.where(plazo > 0, (precio - enganche) / np.where(plazo > 0, plazo, 1), 0.0)
+    return {
+        "faltante_enganche": faltante,
+        "saldo": saldo(precio, pagado),
+        "mensualidad": mensualidad,
+        "pago_sugerido": np.where(faltante > 0, faltante, mensualidad),
+    }
@@ -1,37 +1,104 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
+from modulos import datos, finanzas, escrituras
 
 def render_gastos(supabase):
     st.title("💸 Gestión de Gastos")
     
-    # --- 1. CARGA DE DATOS ---
-    res = supabase.table("gastos").select("*").order("fecha", desc=True).execute()
-    df_g = pd.DataFrame(res.data)
+    # --- 1. CARGA DE DATOS (resumen mes × categoría, no el detalle) ---
+    res = datos.en_paralelo({
+        "resumen": lambda: datos.gastos_mensuales(supabase),
+        "presupuesto": lambda: datos.consultar(supabase, "presupuesto_gastos", "mes, categoria, monto"),
+    })
+    if isinstance(res["resumen"], Exception):
+        st.error(f"Error al cargar gastos: {res['resumen']}")
+        return
+    df_r = pd.DataFrame(res["resumen"], columns=["mes", "categoria", "total", "num_gastos"])
+
+    # Si solo falla el presupuesto, las gráficas y el historial siguen disponibles
+    error_presupuesto = res["presupuesto"] if isinstance(res["presupuesto"], Exception) else None
+    df_p = pd.DataFrame([] if error_presupuesto else res["presupuesto"], columns=["mes", "categoria", "monto"])
 
     # --- 2. VISTA GENERAL ---
-    st.write("### 🔍 Historial de Gastos")
-    if not df_g.empty:
-        total_gastos = df_g["monto"].sum()
-        st.metric("Gasto Total Acumulado", f"$ {total_gastos:,.2f}")
-
-        st.dataframe(
-            df_g[["fecha", "categoria", "monto", "concepto", "notas"]],
-            column_config={
-                "monto": st.column_config.NumberColumn("Monto", format="$ %.2f"),
-                "fecha": st.column_config.DateColumn("Fecha", format="DD/MM/YYYY")
-            },
-            use_container_width=True,
-            hide_index=True
-        )
-    else:
-        st.info("No hay gastos registrados aún.")
-
-    tab_nuevo, tab_editar = st.tabs(["✨ Registrar Gasto", "✏️ Editar / Eliminar"])
+    m1, m2, m3 = st.columns(3)
+    meses = m3.selectbox("Meses a mostrar", [6, 12, 24, 36], index=1)
+    tabla = finanzas.tendencia_gastos(df_r, meses)
+    m1.metric("Gasto Total Acumulado", f"$ {pd.to_numeric(df_r['total']).sum():,.2f}")
+    m2.metric("Gasto del Mes", f"$ {tabla.iloc[-1].sum():,.2f}")
+
+    # Meses con gastos, del más reciente al más antiguo (filtros de detalle)
+    meses_con_gasto = sorted(pd.to_datetime(df_r["mes"]).dt.to_period("M").unique(), reverse=True)
+
+    tab_tendencia, tab_presupuesto, tab_historial, tab_nuevo = st.tabs(
+        ["📈 Tendencia", "🎯 Presupuesto", "🔍 Historial / Editar", "✨ Registrar Gasto"])
 
     categorias = ["Publicidad", "Comisiones", "Mantenimiento", "Papelería", "Servicios", "Sueldos", "Otros"]
 
-    # --- PESTAÑA 1: REGISTRAR ---
+    # --- PESTAÑA 1: TENDENCIA ---
+    with tab_tendencia:
+        if tabla.empty or tabla.columns.empty:
+            st.info("No hay gastos registrados en el periodo.")
+        else:
+            grafica = tabla.copy()
+            grafica.index = grafica.index.strftime("%Y-%m")
+            st.write("### Gasto por categoría")
+            st.bar_chart(grafica)
+            st.write("### Gasto total mensual")
+            st.line_chart(grafica.sum(axis=1).rename("Total"))
+            st.dataframe(grafica.style.format("$ {:,.0f}"), use_container_width=True)
+
+    # --- PESTAÑA 2: PRESUPUESTO VS REAL ---
+    with tab_presupuesto:
+        if error_presupuesto:
+            st.error(f"No se pudo cargar el presupuesto: {error_presupuesto}")
+        else:
+            mes_sel = st.selectbox("Mes", list(tabla.index[::-1]), format_func=lambda p: p.strftime("%Y-%m"))
+            comparativo = finanzas.presupuesto_contra_real(df_r, df_p, mes_sel)
+            if comparativo.empty:
+                st.info("Sin presupuesto ni gastos en el mes seleccionado.")
+            else:
+                comparativo["ejercido"] = comparativo["ejercido"] * 100
+                st.bar_chart(comparativo.set_index("categoria")[["presupuesto", "real"]], stack=False)
+                st.dataframe(
+                    comparativo,
+                    column_config={
+                        "categoria": "Categoría",
+                        "presupuesto": st.column_config.NumberColumn("Presupuesto", format="$ %.2f"),
+                        "real": st.column_config.NumberColumn("Real", format="$ %.2f"),
+                        "diferencia": st.column_config.NumberColumn("Disponible", format="$ %.2f"),
+                        "ejercido": st.column_config.NumberColumn("% Ejercido", format="%.0f%%"),
+                    },
+                    use_container_width=True,
+                    hide_index=True
+                )
+
+            with st.form("form_presupuesto"):
+                st.caption(f"Presupuesto de {mes_sel.strftime('%Y-%m')}")
+                plan_mes = df_p[pd.to_datetime(df_p["mes"]).dt.to_period("M") == mes_sel]
+                plan_mes = dict(zip(plan_mes["categoria"], pd.to_numeric(plan_mes["monto"])))
+                editado = st.data_editor(
+                    pd.DataFrame({"categoria": categorias, "monto": [float(plan_mes.get(c, 0.0)) for c in categorias]}),
+                    column_config={
+                        "categoria": "Categoría",
+                        "monto": st.column_config.NumberColumn("Monto ($)", min_value=0.0, step=500.0, format="$ %.2f"),
+                    },
+                    disabled=["categoria"],
+                    hide_index=True,
+                    use_container_width=True
+                )
+                if st.form_submit_button("💾 GUARDAR PRESUPUESTO"):
+                    mes_iso = mes_sel.start_time.strftime("%Y-%m-%d")
+                    filas = [{"mes": mes_iso, "categoria": c, "monto": float(m or 0)}
+                             for c, m in zip(editado["categoria"], editado["monto"])]
+                    try:
+                        datos.guardar_lote(supabase, "presupuesto_gastos", filas, conflicto="mes, categoria")
+                        st.success("Presupuesto guardado.")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Error al guardar: {e}")
+
+    # --- PESTAÑA 4: REGISTRAR ---
     with tab_nuevo:
         with st.form("form_nuevo_gasto"):
             c1, c2 = st.columns(2)
@@ -52,14 +119,61 @@ def render_gastos(supabase):
                         "concepto": f_des,
                         "notas": f_not
                     }
-                    supabase.table("gastos").insert(nuevo_gasto).execute()
-                    st.success("Gasto registrado correctamente.")
+                    escrituras.escribir(supabase, "gastos", "insert", nuevo_gasto, aviso="Gasto registrado correctamente.")
                     st.rerun()
 
-    # --- PESTAÑA 2: EDITAR / ELIMINAR ---
-    with tab_editar:
-        if not df_g.empty:
-            # Selector basado en el ID real de la DB
+    # --- PESTAÑA 3: HISTORIAL PAGINADO Y EDICIÓN ---
+    with tab_historial:
+        h1, h2, h3 = st.columns(3)
+        cat_sel = h1.selectbox("Categoría", ["Todas"] + categorias)
+        mes_det = h2.selectbox("Mes", ["Todos"] + meses_con_gasto,
+                               format_func=lambda p: p if p == "Todos" else p.strftime("%Y-%m"))
+        tam_pagina = h3.selectbox("Filas por página", [25, 50, 100, 250], index=1)
+
+        # Reiniciar la paginación si cambian los filtros o el tamaño de página
+        clave_hist = (cat_sel, mes_det, tam_pagina)
+        if st.session_state.get("gastos_clave") != clave_hist:
+            st.session_state["gastos_clave"] = clave_hist
+            st.session_state["gastos_cursores"] = [None]
+        cursores = st.session_state["gastos_cursores"]
+
+        desde = hasta = None
+        if mes_det != "Todos":
+            desde = mes_det.start_time.strftime("%Y-%m-%d")
+            hasta = (mes_det + 1).start_time.strftime("%Y-%m-%d")
+        try:
+            filas, siguiente = datos.pagina_gastos(supabase, tam_pagina, cursores[-1],
+                                                   categoria=None if cat_sel == "Todas" else cat_sel,
+                                                   desde=desde, hasta=hasta)
+        except Exception as e:
+            st.error(f"⚠️ Error cargando historial: {e}")
+            filas, siguiente = [], None
+
+        df_g = pd.DataFrame(filas)
+        if df_g.empty:
+            st.info("No hay gastos registrados con esos filtros.")
+        else:
+            st.dataframe(
+                df_g[["fecha", "categoria", "monto", "concepto", "notas"]],
+                column_config={
+                    "monto": st.column_config.NumberColumn("Monto", format="$ %.2f"),
+                    "fecha": st.column_config.DateColumn("Fecha", format="DD/MM/YYYY")
+                },
+                use_container_width=True,
+                hide_index=True
+            )
+
+            n1, n2, n3 = st.columns([1, 2, 1])
+            if n1.button("◀ Anterior", disabled=len(cursores) == 1, use_container_width=True):
+                cursores.pop()
+                st.rerun()
+            n2.caption(f"Página {len(cursores)}")
+            if n3.button("Siguiente ▶", disabled=siguiente is None, use_container_width=True):
+                cursores.append(siguiente)
+                st.rerun()
+
+            st.markdown("---")
+            # Selector de edición limitado a la página actual
             gastos_opciones = {f"{r['id']} | {r['fecha']} | {r['concepto']}": r for r in df_g.to_dict('records')}
             g_sel_key = st.selectbox("Seleccione gasto a modificar:", ["--"] + list(gastos_opciones.keys()))
             
@@ -88,11 +202,11 @@ def render_gastos(supabase):
                             "concepto": e_des,
                             "notas": e_not
                         }
-                        supabase.table("gastos").update(update_data).eq("id", g_id).execute()
-                        st.success("Gasto actualizado.")
+                        escrituras.escribir(supabase, "gastos", "update", update_data, int(g_id),
+                                            anterior=gasto_data, aviso="Gasto actualizado.")
                         st.rerun()
                         
                     if b2.form_submit_button("🗑️ ELIMINAR GASTO"):
-                        supabase.table("gastos").delete().eq("id", g_id).execute()
-                        st.warning("Gasto eliminado.")
+                        escrituras.escribir(supabase, "gastos", "delete", id_registro=int(g_id),
+                                            anterior=gasto_data, aviso="Gasto eliminado.")
                         st.rerun()
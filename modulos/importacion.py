@@ -0,0 +1,248 @@
+import streamlit as st
+import pandas as pd
+from datetime import datetime
+from modulos import datos, finanzas
+
+# --- IMPORTACIÓN MASIVA (CSV / EXCEL) ---
+# El archivo se lee por bloques, cada fila se valida con las mismas reglas de
+# los formularios y las filas válidas se insertan en lotes grandes con una
+# sola invalidación de caché al final.
+
+TAM_BLOQUE = 5000
+
+COLUMNAS = {
+    "directorio": ["nombre", "tipo", "telefono", "correo"],
+    "ubicaciones": ["etapa", "manzana", "lote", "precio", "enganche_req"],
+    "pagos": ["venta_id", "monto", "fecha", "folio", "comentarios"],
+}
+
+
+def leer_archivo(archivo, nombre):
+    # Genera bloques de texto con las columnas normalizadas en minúsculas
+    if hasattr(archivo, "seek"):
+        archivo.seek(0)
+    if nombre.lower().endswith((".xlsx", ".xls")):
+        # Excel no se puede leer por partes con pandas; requiere openpyxl
+        bloques = [pd.read_excel(archivo, dtype=str)]
+    else:
+        bloques = pd.read_csv(archivo, dtype=str, chunksize=TAM_BLOQUE, keep_default_na=False)
+    for bloque in bloques:
+        bloque.columns = [str(c).strip().lower() for c in bloque.columns]
+        yield bloque.fillna("")
+
+
+def _marcar(errores, mascara, mensaje):
+    return errores.where(~mascara, errores + mensaje + " ")
+
+
+def _columna(bloque, nombre):
+    return bloque[nombre].astype(str).str.strip() if nombre in bloque else pd.Series("", index=bloque.index)
+
+
+def _separar(bloque, errores, registros):
+    # Devuelve los registros válidos y la lista de errores con número de fila del archivo
+    ok = errores == ""
+    validos = [r for r, valido in zip(registros, ok) if valido]
+    malos = pd.DataFrame({"fila": bloque.index[~ok] + 2, "error": errores[~ok].str.strip()})
+    return validos, malos
+
+
+def validar_directorio(bloque, vistos):
+    nombre = _columna(bloque, "nombre")
+    tipo = _columna(bloque, "tipo").str.capitalize()
+    tel = _columna(bloque, "telefono").str.replace(r"\D", "", regex=True)
+    correo = _columna(bloque, "correo").str.lower()
+
+    errores = pd.Series("", index=bloque.index)
+    errores = _marcar(errores, nombre == "", "El nombre es obligatorio.")
+    errores = _marcar(errores, ~tipo.isin(["Cliente", "Vendedor"]), "El tipo debe ser Cliente o Vendedor.")
+    errores = _marcar(errores, (tel != "") & (tel.str.len() != 10), "El teléfono debe tener 10 dígitos.")
+    errores = _marcar(errores, (correo != "") & ~correo.str.contains("@", regex=False), "El correo no es válido.")
+
+    registros = []
+    for i, n, t, tl, c in zip(bloque.index, nombre, tipo, tel, correo):
+        llave = (n.lower(), t)
+        if errores[i] == "" and llave in vistos:
+            errores[i] = f"El {t} '{n}' ya existe."
+        elif errores[i] == "":
+            vistos.add(llave)
+        registros.append({"nombre": n, "tipo": t, "telefono": tl or None, "correo": c or None})
+    return _separar(bloque, errores, registros)
+
+
+def validar_ubicaciones(bloque, vistos):
+    num = {c: pd.to_numeric(_columna(bloque, c), errors="coerce")
+           for c in ["etapa", "manzana", "lote"]}
+    precio = pd.to_numeric(_columna(bloque, "precio").replace("", "0"), errors="coerce")
+    enganche = pd.to_numeric(_columna(bloque, "enganche_req").replace("", "0"), errors="coerce")
+
+    errores = pd.Series("", index=bloque.index)
+    for c, serie in num.items():
+        errores = _marcar(errores, ~(serie >= 1) | (serie % 1 != 0), f"{c.capitalize()} debe ser un entero mayor a 0.")
+    errores = _marcar(errores, ~(precio >= 0), "El precio no es válido.")
+    errores = _marcar(errores, ~(enganche >= 0), "El enganche no es válido.")
+
+    registros = []
+    for i in bloque.index:
+        if errores[i] == "":
+            e, m, l = (int(num[c][i]) for c in ["etapa", "manzana", "lote"])
+            if (e, m, l) in vistos:
+                errores[i] = f"El lote E{e}-M{m}-L{l} ya existe."
+            else:
+                vistos.add((e, m, l))
+            registros.append({"etapa": e, "manzana": m, "lote": l,
+                              "precio": float(precio[i]), "enganche_req": float(enganche[i])})
+        else:
+            registros.append(None)
+    return _separar(bloque, errores, registros)
+
+
+def validar_pagos(bloque, vistos):
+    # `vistos` trae los ids de ventas y los pagos ya registrados: sus folios y
+    # sus (venta_id, fecha, monto). Un pago con folio se repite si el folio ya
+    # existe; uno sin folio, si ya hay otro de la venta con esa fecha y monto.
+    venta = pd.to_numeric(_columna(bloque, "venta_id"), errors="coerce")
+    monto = pd.to_numeric(_columna(bloque, "monto"), errors="coerce")
+    fecha_txt = _columna(bloque, "fecha")
+    fecha = pd.to_datetime(fecha_txt.replace("", str(datetime.now().date())), errors="coerce")
+
+    errores = pd.Series("", index=bloque.index)
+    errores = _marcar(errores, ~venta.isin(list(vistos["ventas"])), "La venta no existe.")
+    errores = _marcar(errores, ~(monto > 0), "El monto debe ser mayor a 0.")
+    errores = _marcar(errores, fecha.isna(), "La fecha no es válida.")
+
+    registros = []
+    for i, v, m, f, fo, co in zip(bloque.index, venta, monto, fecha, _columna(bloque, "folio"),
+                                  _columna(bloque, "comentarios")):
+        if errores[i] != "":
+            registros.append(None)
+            continue
+        llave = (int(v), str(f.date()), round(float(m), 2))
+        if fo and fo in vistos["folios"]:
+            errores[i] = f"El folio {fo} ya está registrado."
+        elif not fo and llave in vistos["pagos"]:
+            errores[i] = "El pago ya está registrado (misma venta, fecha y monto)."
+        else:
+            vistos["pagos"].add(llave)
+            if fo:
+                vistos["folios"].add(fo)
+        registros.append({"venta_id": llave[0], "monto": float(m), "fecha": llave[1], "folio": fo, "comentarios": co})
+    return _separar(bloque, errores, registros)
+
+
+def validar_captura_pagos(captura, ventas, saldos, folios_existentes):
+    """Valida la captura por lote de Cobranza (venta, monto, folio, fecha,
+    comentarios). `ventas` es etiqueta -> venta_id y `saldos` venta_id ->
+    saldo actual. Devuelve los registros válidos y los errores por fila."""
+    fila = pd.Series(range(1, len(captura) + 1), index=captura.index)
+    captura = captura[captura.notna().any(axis=1)]
+    venta = captura["venta"].map(ventas)
+    monto = pd.to_numeric(captura["monto"], errors="coerce")
+    fecha = pd.to_datetime(captura["fecha"], errors="coerce")
+    folio = captura["folio"].fillna("").astype(str).str.strip()
+    comentarios = captura["comentarios"].fillna("").astype(str).str.strip()
+
+    errores = pd.Series("", index=captura.index)
+    errores = _marcar(errores, venta.isna(), "Seleccione la venta.")
+    errores = _marcar(errores, ~(monto > 0), "El monto debe ser mayor a 0.")
+    errores = _marcar(errores, fecha.isna(), "La fecha no es válida.")
+    errores = _marcar(errores, (folio != "") & folio.duplicated(keep=False), "Folio repetido en la captura.")
+    errores = _marcar(errores, (folio != "") & folio.isin(folios_existentes), "El folio ya está registrado.")
+    # Lo capturado para una venta, acumulado en orden, no puede pasar su saldo
+    acumulado = monto.where(monto > 0, 0.0).groupby(venta).cumsum()
+    errores = _marcar(errores, acumulado > venta.map(saldos) + finanzas.TOLERANCIA_CUOTA,
+                      "El monto excede el saldo de la venta.")
+
+    ok = errores == ""
+    registros = [
+        {"venta_id": int(v), "monto": float(m), "fecha": str(f.date()), "folio": fo, "comentarios": co}
+        for v, m, f, fo, co in zip(venta[ok], monto[ok], fecha[ok], folio[ok], comentarios[ok])
+    ]
+    malos = pd.DataFrame({"fila": fila[captura.index[~ok]].to_numpy(), "error": errores[~ok].str.strip().to_numpy()})
+    return registros, malos
+
+
+def _existentes(supabase, tabla):
+    if tabla == "directorio":
+        filas = datos.consultar(supabase, "directorio", "nombre, tipo")
+        return {(f["nombre"].strip().lower(), f["tipo"]) for f in filas}
+    if tabla == "ubicaciones":
+        filas = datos.consultar(supabase, "ubicaciones", "etapa, manzana, lote")
+        return {(int(f["etapa"]), int(f["manzana"]), int(f["lote"])) for f in filas}
+    return {"ventas": {f["id"] for f in datos.consultar(supabase, "ventas", "id")}, "pagos": set(), "folios": set()}
+
+
+def _pagos_registrados(supabase, bloque, vistos):
+    # Agrega a `vistos` los pagos de la base que pueden repetir las filas del
+    # bloque: los de sus ventas y los de sus folios, por bloques de ids
+    ventas = sorted({int(v) for v in pd.to_numeric(_columna(bloque, "venta_id"), errors="coerce").dropna()})
+    folios = sorted(set(_columna(bloque, "folio")) - {""})
+    paso = datos.IDS_POR_CONSULTA
+    for columna, valores in (("venta_id", ventas), ("folio", folios)):
+        for i in range(0, len(valores), paso):
+            filas = datos.consultar(supabase, "pagos", "venta_id, fecha, monto, folio",
+                                    filtros=[("in_", columna, tuple(valores[i:i + paso]))], cache=False)
+            for f in filas:
+                vistos["pagos"].add((int(f["venta_id"]), str(f["fecha"])[:10], round(float(f["monto"] or 0), 2)))
+                if f.get("folio"):
+                    vistos["folios"].add(str(f["folio"]).strip())
+
+
+VALIDADORES = {
+    "directorio": validar_directorio,
+    "ubicaciones": validar_ubicaciones,
+    "pagos": validar_pagos,
+}
+
+
+def validar_archivo(supabase, tabla, archivo, nombre):
+    vistos = _existentes(supabase, tabla)
+    registros, errores = [], []
+    for bloque in leer_archivo(archivo, nombre):
+        if tabla == "pagos":
+            _pagos_registrados(supabase, bloque, vistos)
+        validos, malos = VALIDADORES[tabla](bloque, vistos)
+        registros.extend(validos)
+        errores.append(malos)
+    errores = pd.concat(errores, ignore_index=True) if errores else pd.DataFrame(columns=["fila", "error"])
+    return registros, errores
+
+
+def render_importacion(supabase, tabla):
+    st.caption(f"Columnas esperadas: {', '.join(COLUMNAS[tabla])}")
+    # Tras importar se cambia la llave del uploader para soltar el archivo:
+    # así no vuelve a aparecer el botón con las mismas filas
+    version = st.session_state.setdefault(f"importar_{tabla}_version", 0)
+    aviso = st.session_state.pop(f"importar_{tabla}_aviso", None)
+    if aviso:
+        st.success(aviso)
+    archivo = st.file_uploader("Archivo CSV o Excel", type=["csv", "xlsx"], key=f"importar_{tabla}_{version}")
+    if archivo is None:
+        return
+
+    try:
+        registros, errores = validar_archivo(supabase, tabla, archivo, archivo.name)
+    except ImportError:
+        st.error("Para leer Excel instale openpyxl o guarde el archivo como CSV.")
+        return
+    except Exception as e:
+        st.error(f"No se pudo leer el archivo: {e}")
+        return
+
+    c1, c2 = st.columns(2)
+    c1.metric("Filas válidas", len(registros))
+    c2.metric("Filas con error", len(errores))
+
+    if not errores.empty:
+        st.dataframe(errores, column_config={"fila": "Fila", "error": "Error"},
+                     use_container_width=True, hide_index=True)
+
+    if registros and st.button(f"📥 Importar {len(registros)} registros", type="primary",
+                               use_container_width=True, key=f"btn_importar_{tabla}"):
+        try:
+            datos.insertar_lote(supabase, tabla, registros)
+            st.session_state[f"importar_{tabla}_version"] += 1
+            st.session_state[f"importar_{tabla}_aviso"] = f"✅ {len(registros)} registros importados."
+            st.rerun()
+        except Exception as e:
+            st.error(f"Error al importar: {e}")
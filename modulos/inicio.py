@@ -1,8 +1,7 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import urllib.parse
-import re
+from modulos import antiguedad, buscador, campanas, datos, finanzas, instrumentacion
 
 def render_inicio(supabase):
     # --- CSS AVANZADO PARA DARK MODE LIMPIO ---
@@ -47,90 +46,54 @@ def render_inicio(supabase):
     st.title("🏠 Panel de Control")
 
     # --- 1. CARGA DE DATOS ---
+    # Antigüedad ya calculada por venta (ver modulos/antiguedad.py)
     try:
-        res_v = supabase.table("ventas").select("""
-            id, fecha_venta, plazo, cliente_id, ubicacion_id,
-            cliente:directorio!cliente_id(nombre, telefono, correo),
-            ubicacion:ubicaciones(id, manzana, lote, etapa, precio, enganche_req)
-        """).execute()
-        res_p = supabase.table("pagos").select("venta_id, monto").execute()
-        
-        df_v = pd.DataFrame(res_v.data)
-        df_p = pd.DataFrame(res_p.data)
+        with instrumentacion.fase("antiguedad"):
+            df_cartera = antiguedad.cartera(supabase)
     except Exception as e:
         st.error(f"🚨 Error de conexión: {e}")
         return
 
-    if df_v.empty:
+    if df_cartera.empty:
         st.info("👋 El sistema está listo. Comienza registrando una venta.")
         return
 
     # --- 2. MÉTRICAS CON ESTILO ---
-    total_recaudado = df_p["monto"].sum() if not df_p.empty else 0.0
-    df_v['valor_lote'] = df_v['ubicacion'].apply(lambda x: float(x['precio']) if x else 0.0)
-    total_cartera = df_v['valor_lote'].sum()
+    total_recaudado = df_cartera['pagado'].sum()
+    total_cartera = df_cartera['precio'].fillna(0.0).sum()
     
     m1, m2, m3, m4 = st.columns(4)
     m1.metric("💰 Recaudación", f"$ {total_recaudado:,.0f}")
-    m2.metric("👥 Clientes", df_v['cliente_id'].nunique())
+    m2.metric("👥 Clientes", df_cartera['cliente_id'].nunique())
     m3.metric("📈 Valor Cartera", f"$ {total_cartera:,.0f}")
-    m4.metric("🏗️ Lotes Vendidos", len(df_v))
+    m4.metric("🏗️ Lotes Vendidos", len(df_cartera))
 
     st.markdown("<br>", unsafe_allow_html=True)
 
-    # --- 3. ANÁLISIS DE CARTERA ---
-    pagos_agrupados = df_p.groupby('venta_id')['monto'].sum().reset_index() if not df_p.empty else pd.DataFrame(columns=['venta_id', 'monto'])
-    df_cartera = df_v.merge(pagos_agrupados, left_on='id', right_on='venta_id', how='left').fillna({'monto': 0})
-    
-    hoy = datetime.now()
-
-    def calcular_mora(row):
-        try:
-            u = row['ubicacion']
-            precio, enganche, plazo = float(u['precio']), float(u['enganche_req']), int(row['plazo'] or 12)
-            mensualidad = (precio - enganche) / plazo if plazo > 0 else 0
-            f_vta = pd.to_datetime(row['fecha_venta'])
-            meses = (hoy.year - f_vta.year) * 12 + (hoy.month - f_vta.month)
-            esperado = enganche + (max(0, meses) * mensualidad)
-            pagado = float(row['monto'])
-            saldo = max(0.0, esperado - pagado)
-            
-            dias = 0
-            if saldo > 100:
-                meses_c = (pagado - enganche) / mensualidad if mensualidad > 0 else 0
-                vence = f_vta + pd.DateOffset(months=int(max(0, meses_c)) + 1)
-                dias = (hoy - vence).days
-            return pd.Series([max(0, dias), saldo])
-        except: return pd.Series([0, 0.0])
-
-    df_cartera[['atraso', 'monto_vencido']] = df_cartera.apply(calcular_mora, axis=1)
-
-    # --- 4. INTERFAZ DE TABLA ---
+    # --- 3. INTERFAZ DE TABLA ---
     st.subheader("📋 Cobranza y Seguimiento")
     
     f1, f2 = st.columns([1, 2])
     solo_mora = f1.toggle("⚠️ Solo Deudores", value=True)
     busqueda = f2.text_input("🔍 Filtrar por nombre o lote...")
 
-    df_cartera['Lote'] = df_cartera['ubicacion'].apply(lambda x: f"M{int(x['manzana']):02d}-L{int(x['lote']):02d}")
-    df_cartera['Cliente'] = df_cartera['cliente'].apply(lambda x: x['nombre'] if x else "N/A")
+    df_cartera['Lote'] = df_cartera['lote_ref']
+    df_cartera['Cliente'] = df_cartera['cliente_nombre'].fillna("N/A")
     
-    df_viz = df_cartera.copy()
+    with instrumentacion.fase("busqueda"):
+        df_viz = buscador.filtrar(df_cartera, busqueda, ['Cliente', 'Lote'], "cartera").copy()
     if solo_mora: df_viz = df_viz[df_viz['monto_vencido'] > 100]
-    if busqueda:
-        df_viz = df_viz[df_viz['Cliente'].str.contains(busqueda, case=False) | df_viz['Lote'].str.contains(busqueda, case=False)]
 
     if not df_viz.empty:
         df_viz = df_viz.sort_values("atraso", ascending=False)
-        df_viz['Estatus'] = df_viz['atraso'].apply(lambda x: "🔴 Crítico" if x > 60 else ("🟡 Mora" if x > 0 else "🟢 Al día"))
+        df_viz['Estatus'] = df_viz['estatus']
 
-        def get_wa(row):
-            tel = re.sub(r'\D', '', str(row['cliente']['telefono']))
-            tel_f = tel if tel.startswith("52") else "52" + tel
-            msg = f"Hola {row['Cliente']}, te contactamos de Valle Mart por tu lote {row['Lote']}. Saldo: ${row['monto_vencido']:,.2f}."
-            return f"https://wa.me/{tel_f}?text={urllib.parse.quote(msg)}"
-        
-        df_viz['WhatsApp'] = df_viz.apply(get_wa, axis=1)
+        with instrumentacion.fase("enlaces_whatsapp"):
+            try:
+                df_viz['WhatsApp'] = campanas.enlaces(df_viz, _plantillas())['enlace']
+            except (KeyError, ValueError, IndexError):
+                # Plantilla mal escrita: la tabla sigue con las plantillas base
+                df_viz['WhatsApp'] = campanas.enlaces(df_viz)['enlace']
 
         st.dataframe(
             df_viz[["Estatus", "Lote", "Cliente", "atraso", "monto_vencido", "WhatsApp"]],
@@ -144,3 +107,66 @@ def render_inicio(supabase):
         )
     else:
         st.success("🎉 Sin adeudos pendientes.")
+
+    # --- 4. CAMPAÑA DE COBRANZA ---
+    with st.expander("📣 Campaña de cobranza por WhatsApp"):
+        st.caption("Campos disponibles: {cliente}, {lote}, {saldo}, {dias}")
+        c1, c2 = st.columns(2)
+        c1.text_area("Plantilla 🟡 Mora", campanas.PLANTILLAS[antiguedad.MORA], key="plantilla_mora")
+        c2.text_area("Plantilla 🔴 Crítico", campanas.PLANTILLAS[antiguedad.CRITICO], key="plantilla_critico")
+        try:
+            cola = campanas.cola_envio(df_cartera, _plantillas())
+        except (KeyError, ValueError, IndexError) as e:
+            st.error(f"Revisa las plantillas: campo inválido {e}")
+        else:
+            st.metric("Mensajes en cola", len(cola))
+            st.download_button(
+                "📤 Descargar cola de envío (CSV)",
+                cola.to_csv(index=False).encode("utf-8-sig"),
+                file_name=f"cola_whatsapp_{datetime.now():%Y%m%d}.csv",
+                mime="text/csv",
+                use_container_width=True,
+                disabled=cola.empty,
+            )
+
+
+    # --- 5. PROYECCIÓN DE FLUJO ---
+    with st.expander("📈 Proyección de flujo de efectivo"):
+        c1, c2 = st.columns([2, 1])
+        horizonte = c1.slider("Meses a proyectar", 6, 36, 24)
+        if not c2.toggle("Calcular proyección", key="calcular_flujo"):
+            return
+        res = datos.en_paralelo({
+            "gastos": lambda: datos.gastos_mensuales(supabase),
+            "comisiones": lambda: datos.consultar(supabase, "vista_saldos_comisiones", "saldo_pendiente"),
+        })
+        errores = datos.fallidas(res)
+        if errores:
+            for nombre, e in errores.items():
+                st.error(f"Error al cargar {nombre}: {e}")
+            return
+        # El resumen mensual basta: gasto_mensual solo suma por mes
+        gasto = finanzas.gasto_mensual(pd.DataFrame(res["gastos"], columns=["mes", "total"])
+                                       .rename(columns={"mes": "fecha", "total": "monto"}))
+        pendientes = float(pd.DataFrame(res["comisiones"], columns=["saldo_pendiente"])["saldo_pendiente"].clip(lower=0).sum())
+        with instrumentacion.fase("proyeccion_flujo"):
+            flujo = finanzas.proyectar_flujo(df_cartera, horizonte, gasto_recurrente=gasto,
+                                             comisiones_pendientes=pendientes)
+
+        k1, k2 = st.columns(2)
+        k1.metric("Gasto mensual recurrente", f"$ {gasto:,.0f}")
+        k2.metric("Comisiones pendientes", f"$ {pendientes:,.0f}")
+        st.line_chart(flujo, x="mes", y="acumulado", color="escenario")
+        tabla = flujo.pivot(index="mes", columns="escenario", values="neto")[list(finanzas.ESCENARIOS)]
+        tabla.index = tabla.index.strftime("%Y-%m")
+        st.dataframe(tabla.style.format("$ {:,.0f}"), use_container_width=True)
+
+
+def _plantillas():
+    # Valores de los editores de la campaña (si ya se abrieron en esta sesión)
+    plantillas = {}
+    if "plantilla_mora" in st.session_state:
+        plantillas[antiguedad.MORA] = st.session_state["plantilla_mora"]
+    if "plantilla_critico" in st.session_state:
+        plantillas[antiguedad.CRITICO] = st.session_state["plantilla_critico"]
+    return plantillas
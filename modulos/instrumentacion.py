@@ -0,0 +1,126 @@
+import contextlib
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+# --- INSTRUMENTACIÓN ---
+# Registra latencia, filas y bytes de cada consulta a Supabase y el tiempo de
+# las fases de cálculo de cada página. La traza se activa por hilo (cada
+# sesión de Streamlit corre en el suyo); sin traza activa todo es no-op.
+
+_local = threading.local()
+_NULO = contextlib.nullcontext()
+
+
+class Traza:
+    def __init__(self, maximo=5000):
+        self.eventos = deque(maxlen=maximo)
+        self.corrida = 0
+        self.pagina = None
+
+    def nueva_corrida(self, pagina):
+        self.corrida += 1
+        self.pagina = pagina
+
+    def registrar(self, tipo, nombre, duracion=0.0, **extra):
+        self.eventos.append({
+            "hora": datetime.now().isoformat(timespec="milliseconds"),
+            "corrida": self.corrida,
+            "pagina": self.pagina,
+            "tipo": tipo,
+            "nombre": nombre,
+            "ms": round(duracion * 1000, 3),
+            **extra,
+        })
+
+    def ultima_corrida(self):
+        return [e for e in self.eventos if e["corrida"] == self.corrida]
+
+    def exportar(self):
+        # Una línea JSON por evento
+        return "\n".join(json.dumps(e, default=str, ensure_ascii=False) for e in self.eventos)
+
+
+def activar(traza):
+    _local.traza = traza
+
+
+def desactivar():
+    _local.traza = None
+
+
+def traza_actual():
+    return getattr(_local, "traza", None)
+
+
+def evento(tipo, nombre, **extra):
+    traza = getattr(_local, "traza", None)
+    if traza is not None:
+        traza.registrar(tipo, nombre, **extra)
+
+
+class _Fase:
+    def __init__(self, traza, nombre):
+        self.traza, self.nombre = traza, nombre
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.traza.registrar("fase", self.nombre, time.perf_counter() - self.inicio)
+        return False
+
+
+def fase(nombre):
+    # with instrumentacion.fase("calcular_mora"): ...
+    traza = getattr(_local, "traza", None)
+    return _NULO if traza is None else _Fase(traza, nombre)
+
+
+# --- CLIENTE DE SUPABASE INSTRUMENTADO ---
+class _ConsultaInstrumentada:
+    def __init__(self, consulta, tabla, pasos):
+        self._consulta, self._tabla, self._pasos = consulta, tabla, pasos
+
+    def __getattr__(self, nombre):
+        atributo = getattr(self._consulta, nombre)
+        if not callable(atributo):
+            return atributo
+
+        def llamar(*args, **kwargs):
+            return _ConsultaInstrumentada(atributo(*args, **kwargs), self._tabla, self._pasos + [nombre])
+        return llamar
+
+    def execute(self):
+        traza = getattr(_local, "traza", None)
+        if traza is None:
+            return self._consulta.execute()
+        inicio = time.perf_counter()
+        try:
+            res = self._consulta.execute()
+        except Exception as e:
+            traza.registrar("consulta", self._tabla, time.perf_counter() - inicio,
+                            operacion=".".join(self._pasos), error=str(e))
+            raise
+        filas = res.data or []
+        traza.registrar("consulta", self._tabla, time.perf_counter() - inicio,
+                        operacion=".".join(self._pasos), filas=len(filas),
+                        bytes=len(json.dumps(filas, default=str)))
+        return res
+
+
+class ClienteInstrumentado:
+    def __init__(self, cliente):
+        self._cliente = cliente
+
+    def table(self, nombre):
+        return _ConsultaInstrumentada(self._cliente.table(nombre), nombre, [])
+
+    def rpc(self, funcion, parametros=None):
+        return _ConsultaInstrumentada(self._cliente.rpc(funcion, parametros or {}), funcion, ["rpc"])
+
+    def __getattr__(self, nombre):
+        return getattr(self._cliente, nombre)
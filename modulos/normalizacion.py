@@ -0,0 +1,67 @@
+import pandas as pd
+
+# --- NORMALIZACIÓN DE RESPUESTAS ---
+# Convierte el JSON de Supabase (con cliente/ubicación embebidos como dicts)
+# en columnas planas y tipadas una sola vez al cargar.
+
+COLUMNAS_VENTAS = {
+    "id": "Int64", "ubicacion_id": "Int64", "cliente_id": "Int64", "vendedor_id": "Int64",
+    "plazo": "Int64", "comision_monto": "float64", "fecha_venta": "datetime64[ns]",
+    "cliente_nombre": "string", "cliente_telefono": "string", "cliente_correo": "string",
+    "vendedor_nombre": "string",
+    "etapa": "Int32", "manzana": "Int32", "lote": "Int32",
+    "precio": "float64", "enganche_req": "float64",
+}
+
+COLUMNAS_LOTES = {
+    "ubicacion_id": "Int64", "etapa": "Int32", "manzana": "Int32", "lote": "Int32",
+    "precio_lista": "float64", "enganche_req": "float64", "total_pagado": "float64",
+    "estatus_actual": "string",
+}
+
+
+def lote_ref(manzana, lote):
+    # "M01-L02" para toda la columna; "N/A" si falta la ubicación
+    ref = "M" + manzana.astype("string").str.zfill(2) + "-L" + lote.astype("string").str.zfill(2)
+    return ref.fillna("N/A")
+
+
+def _tipar(df, columnas):
+    for col, tipo in columnas.items():
+        if col not in df:
+            df[col] = pd.Series(pd.NA, index=df.index)
+        if tipo == "datetime64[ns]":
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+        elif tipo == "string":
+            df[col] = df[col].astype("string")
+        else:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype(tipo)
+    return df
+
+
+def aplanar_ventas(filas):
+    df = pd.json_normalize(filas, sep="_") if filas else pd.DataFrame()
+    df = df.rename(columns={
+        "ubicacion_etapa": "etapa", "ubicacion_manzana": "manzana", "ubicacion_lote": "lote",
+        "ubicacion_precio": "precio", "ubicacion_enganche_req": "enganche_req",
+    })
+    # Los embebidos nulos dejan una columna de dicts/None que ya no se necesita
+    df = df.drop(columns=[c for c in ("cliente", "vendedor", "ubicacion") if c in df])
+    df = _tipar(df, COLUMNAS_VENTAS)
+    if df.empty:
+        return df
+    df["lote_ref"] = lote_ref(df["manzana"], df["lote"])
+    df["etapa"] = df["etapa"].astype("category")
+    return df
+
+
+def aplanar_lotes(filas):
+    df = _tipar(pd.DataFrame(filas), COLUMNAS_LOTES)
+    if df.empty:
+        return df
+    df["lote_ref"] = lote_ref(df["manzana"], df["lote"])
+    df["lote_clave"] = ("E" + df["etapa"].astype("string") + "-M" + df["manzana"].astype("string")
+                        + "-L" + df["lote"].astype("string"))
+    df["etapa"] = df["etapa"].astype("category")
+    df["estatus_actual"] = df["estatus_actual"].astype("category")
+    return df
@@ -0,0 +1,307 @@
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from modulos import datos
+from modulos.almacen import AlmacenMemoria
+from modulos.cliente_local import VISTAS as VISTAS_LOCALES
+
+# --- SINCRONIZACIÓN INCREMENTAL ---
+# Mantiene una copia local de las tablas base. Cada sincronización trae solo
+# las filas creadas o modificadas desde el último cursor (updated_at, id) y
+# las mezcla en la copia. Cada lectura empieza MARGEN_SEGUNDOS antes del
+# cursor para no perder filas de transacciones que confirmaron tarde con una
+# marca anterior; lo releído se descarta por id si no cambió. Una
+# reconciliación periódica de ids detecta borrados y filas que faltan en la
+# copia (ver sql/sincronizacion.sql). Las escrituras optimistas de la app
+# se ven en la copia desde antes de confirmarse. La copia se guarda en un
+# almacén intercambiable (ver modulos/almacen.py).
+
+TABLAS = ("ventas", "pagos", "gastos", "directorio", "ubicaciones")
+LOTE = 1000
+RECONCILIAR_CADA = 3600
+MARGEN_SEGUNDOS = 300
+
+_snapshot = {}            # tabla -> {id: fila}
+_cursores = {}            # tabla -> (updated_at, id) de la última fila vista
+_ultima_reconciliacion = {}
+_almacen = AlmacenMemoria()
+_activo = False
+_lock = threading.RLock()
+_lock_sync = threading.Lock()
+
+_OPERADORES = datos.OPERADORES
+
+# "alias:tabla!fk(columnas)" dentro de un select
+_RE_EMBEBIDO = re.compile(r"^(?:(\w+):)?(\w+)(?:!(\w+))?\((.*)\)$", re.S)
+_vistas = {}              # vista -> (versiones de sus tablas, filas)
+_versiones = {}           # tabla -> contador de cambios en la copia
+
+
+def _desde(cursor):
+    # Marca de inicio de la lectura: el cursor menos el margen
+    if not cursor:
+        return None
+    marca = datetime.fromisoformat(str(cursor[0]).replace("Z", "+00:00"))
+    return (marca - timedelta(seconds=MARGEN_SEGUNDOS)).isoformat()
+
+
+def _leer_por_lotes(supabase, tabla, columnas, desde):
+    # Recorre la tabla en lotes ordenados por (updated_at, id) desde la marca `desde`
+    filas, cursor = [], None
+    while True:
+        q = supabase.table(tabla).select(columnas)
+        if cursor:
+            marca, id_fila = cursor
+            q = q.or_(f'updated_at.gt."{marca}",and(updated_at.eq."{marca}",id.gt.{int(id_fila)})')
+        elif desde:
+            q = q.gte("updated_at", desde)
+        lote = q.order("updated_at").order("id").limit(LOTE).execute().data
+        filas.extend(lote)
+        if len(lote) < LOTE:
+            return filas
+        cursor = (lote[-1]["updated_at"], lote[-1]["id"])
+
+
+def _leer_faltantes(supabase, tabla, ids):
+    # Filas que existen en la base pero no en la copia, por bloques de ids
+    ids, filas = sorted(ids), []
+    for i in range(0, len(ids), datos.IDS_POR_CONSULTA):
+        filas.extend(supabase.table(tabla).select("*").in_("id", ids[i:i + datos.IDS_POR_CONSULTA]).execute().data)
+    return filas
+
+
+def _leer_ids(supabase, tabla):
+    ids, ultimo = set(), None
+    while True:
+        q = supabase.table(tabla).select("id")
+        if ultimo is not None:
+            q = q.gt("id", ultimo)
+        lote = q.order("id").limit(LOTE).execute().data
+        ids.update(f["id"] for f in lote)
+        if len(lote) < LOTE:
+            return ids
+        ultimo = lote[-1]["id"]
+
+
+def sincronizar(supabase, reconciliar=None):
+    """Trae los cambios desde el último cursor. Devuelve el conjunto de
+    tablas que cambiaron (y ya invalidadas en la caché de datos)."""
+    cambiadas = set()
+    ahora = time.monotonic()
+    # Las lecturas de red van fuera de _lock para no bloquear las consultas
+    # a la copia mientras se sincroniza en segundo plano
+    with _lock_sync:
+        for tabla in TABLAS:
+            cursor = _cursores.get(tabla)
+            leidas = _leer_por_lotes(supabase, tabla, "*", _desde(cursor))
+            toca = reconciliar if reconciliar is not None else (
+                ahora - _ultima_reconciliacion.setdefault(tabla, ahora) >= RECONCILIAR_CADA
+            )
+            vivos = _leer_ids(supabase, tabla) if toca else None
+            faltantes = []
+            if vivos is not None:
+                with _lock:
+                    faltan = vivos - _snapshot.get(tabla, {}).keys() - {f["id"] for f in leidas}
+                faltantes = _leer_faltantes(supabase, tabla, faltan) if faltan else []
+
+            with _lock:
+                copia = _snapshot.setdefault(tabla, {})
+                # Lo releído dentro del margen solo cuenta si cambió
+                filas = [f for f in leidas + faltantes if copia.get(f["id"]) != f]
+                for fila in filas:
+                    copia[fila["id"]] = fila
+                if leidas:
+                    ultima = max(leidas, key=lambda f: (f["updated_at"], f["id"]))
+                    if cursor is None or (ultima["updated_at"], ultima["id"]) > tuple(cursor):
+                        cursor = _cursores[tabla] = (ultima["updated_at"], ultima["id"])
+                if filas:
+                    cambiadas.add(tabla)
+
+                borrados = set()
+                if vivos is not None:
+                    borrados = copia.keys() - vivos
+                    for id_fila in borrados:
+                        del copia[id_fila]
+                    if borrados:
+                        cambiadas.add(tabla)
+                    _ultima_reconciliacion[tabla] = ahora
+                if tabla in cambiadas:
+                    _versiones[tabla] = _versiones.get(tabla, 0) + 1
+                _almacen.guardar(tabla, filas, borrados, cursor)
+
+    if cambiadas:
+        datos.invalidar(*cambiadas)
+    return cambiadas
+
+
+def _aplicar_escritura(tabla, operacion, filas):
+    # Las escrituras hechas desde la app se reflejan de inmediato en la copia;
+    # el cursor no avanza para no saltar cambios hechos por otros usuarios.
+    with _lock:
+        copia = _snapshot.get(tabla)
+        if copia is None:
+            return
+        filas = [f for f in filas if "id" in f]
+        _versiones[tabla] = _versiones.get(tabla, 0) + 1
+        if operacion == "delete":
+            for fila in filas:
+                copia.pop(fila["id"], None)
+            _almacen.guardar(tabla, borrados=[f["id"] for f in filas])
+        else:
+            for fila in filas:
+                copia[fila["id"]] = {**copia.get(fila["id"], {}), **fila}
+            _almacen.guardar(tabla, [copia[f["id"]] for f in filas])
+
+
+def _aplicar_provisional(tabla, operacion, nueva, anterior):
+    # Escritura optimista todavía sin confirmar: se aplica solo en memoria
+    # (no llega al almacén) y se cierra con las filas de la base o, si falló,
+    # devolviendo la fila a como estaba
+    with _lock:
+        copia = _snapshot.get(tabla)
+        if copia is None:
+            return lambda filas: None
+        id_fila = (nueva or anterior)["id"]
+        previa = copia.get(id_fila)
+        if operacion == "delete":
+            copia.pop(id_fila, None)
+        else:
+            copia[id_fila] = {**(previa or anterior or {}), **nueva}
+        _versiones[tabla] = _versiones.get(tabla, 0) + 1
+
+    def cerrar(filas):
+        with _lock:
+            if filas is None:
+                if previa is None:
+                    copia.pop(id_fila, None)
+                else:
+                    copia[id_fila] = previa
+            elif operacion == "insert":
+                # La fila provisional cambia por la que devolvió la base
+                copia.pop(id_fila, None)
+                for fila in filas:
+                    if "id" in fila:
+                        copia[fila["id"]] = fila
+            else:
+                return
+            _versiones[tabla] = _versiones.get(tabla, 0) + 1
+    return cerrar
+
+
+def _separar(columnas):
+    # Divide un select por comas de primer nivel (fuera de paréntesis)
+    partes, nivel, actual = [], 0, ""
+    for c in columnas:
+        nivel += (c == "(") - (c == ")")
+        if c == "," and nivel == 0:
+            partes.append(actual.strip())
+            actual = ""
+        else:
+            actual += c
+    return [p for p in partes + [actual.strip()] if p]
+
+
+def _tablas_de(columnas):
+    # Tablas embebidas en el select (incluye las anidadas)
+    tablas = set()
+    for col in _separar(columnas):
+        m = _RE_EMBEBIDO.match(col)
+        if m:
+            tablas.add(m.group(2))
+            tablas |= _tablas_de(m.group(4))
+    return tablas
+
+
+def _proyectar(fila, columnas):
+    if columnas == "*":
+        return dict(fila)
+    salida = {}
+    for col in _separar(columnas):
+        m = _RE_EMBEBIDO.match(col)
+        if col == "*":
+            salida.update(fila)
+        elif m:
+            alias, tabla, fk, sub = m.groups()
+            alias = alias or tabla
+            relacionada = _snapshot[tabla].get(fila.get(fk or f"{alias}_id"))
+            salida[alias] = _proyectar(relacionada, sub) if relacionada else None
+        else:
+            salida[col] = fila.get(col)
+    return salida
+
+
+def _filas(tabla):
+    # Filas de una tabla de la copia o de una vista calculada sobre ella; la
+    # vista se recalcula solo cuando cambia alguna de sus tablas
+    if tabla in _snapshot:
+        return list(_snapshot[tabla].values())
+    deps = sorted(datos.VISTAS[tabla])
+    version = tuple(_versiones.get(t, 0) for t in deps)
+    guardada = _vistas.get(tabla)
+    if guardada is None or guardada[0] != version:
+        guardada = _vistas[tabla] = (version, VISTAS_LOCALES[tabla]({t: _snapshot[t].values() for t in deps}))
+    return list(guardada[1])
+
+
+def _disponible(tabla):
+    if tabla in _snapshot:
+        return True
+    return tabla in VISTAS_LOCALES and tabla in datos.VISTAS and all(t in _snapshot for t in datos.VISTAS[tabla])
+
+
+def consultar_snapshot(tabla, columnas, filtros, orden, limite):
+    # Responde desde la copia local las consultas a tablas sincronizadas, a
+    # las vistas que se calculan solo con ellas y con recursos embebidos de
+    # esas mismas tablas; cualquier otra cosa vuelve a None y se resuelve en
+    # Supabase.
+    if not _disponible(tabla) or not all(t in _snapshot for t in _tablas_de(columnas)):
+        return None
+    if any(f[0] not in _OPERADORES or len(f) != 3 for f in filtros):
+        return None
+
+    with _lock:
+        filas = _filas(tabla)
+    for metodo, columna, valor in filtros:
+        comparar = _OPERADORES[metodo]
+        filas = [f for f in filas if comparar(f.get(columna), valor)]
+    for columna, desc in reversed(orden):
+        filas.sort(key=lambda f: (f.get(columna) is None, f.get(columna)), reverse=desc)
+    if limite:
+        filas = filas[:limite]
+    with _lock:
+        return [_proyectar(f, columnas) for f in filas]
+
+
+def _sincronizar_en_segundo_plano(supabase):
+    def tarea():
+        try:
+            sincronizar(supabase, reconciliar=True)
+        except Exception:
+            # Se reintenta con el siguiente "Sincronizar Datos"
+            pass
+    threading.Thread(target=tarea, name="sincronizacion", daemon=True).start()
+
+
+def activar(supabase, almacen=None):
+    """Activa la copia local. La primera llamada la carga desde `almacen`;
+    si ya traía todas las tablas se sirve de inmediato y se refresca en un
+    hilo aparte, si no se hace una carga completa. Las siguientes llamadas
+    no hacen nada."""
+    global _almacen, _activo
+    with _lock:
+        if _activo:
+            return
+        if almacen is not None:
+            _almacen = almacen
+        guardado, cursores = _almacen.cargar()
+        _snapshot.update(guardado)
+        _cursores.update(cursores)
+        completo = all(t in guardado for t in TABLAS)
+        if not completo:
+            sincronizar(supabase, reconciliar=False)
+        datos.suscribir(_aplicar_escritura)
+        datos.registrar_fuente_local(consultar_snapshot, _aplicar_provisional)
+        _activo = True
+    if completo:
+        _sincronizar_en_segundo_plano(supabase)
@@ -1,26 +1,48 @@
 import streamlit as st
 import pandas as pd
+from modulos import datos, importacion, buscador, escrituras
 
 def render_ubicaciones(supabase):
     st.title("📍 Control de Inventario de Lotes")
 
-    # --- 1. OBTENER DATOS DE LA VISTA ---
+    # --- 1. FILTROS (se aplican en la base, no sobre el inventario completo) ---
+    with st.expander("🔎 Filtros de inventario"):
+        f1, f2, f3 = st.columns(3)
+        estatus = f1.selectbox("Estatus", ["Todos", "DISPONIBLE", "VENDIDO"])
+        mz_desde = f2.number_input("Manzana desde", min_value=0, step=1, help="0 = sin límite")
+        mz_hasta = f3.number_input("Manzana hasta", min_value=0, step=1, help="0 = sin límite")
+        f4, f5, f6 = st.columns(3)
+        precio_min = f4.number_input("Precio mínimo", min_value=0.0, step=10000.0, help="0 = sin límite")
+        precio_max = f5.number_input("Precio máximo", min_value=0.0, step=10000.0, help="0 = sin límite")
+        etapa_sel = f6.container()
+
+    filtros = {
+        "estatus": None if estatus == "Todos" else estatus,
+        "manzanas": (int(mz_desde) or None, int(mz_hasta) or None),
+        "precios": (precio_min or None, precio_max or None),
+    }
+
+    # --- 2. OBTENER DATOS: resumen por etapa y solo los lotes filtrados ---
     try:
-        res_vista = supabase.table("vista_estatus_lotes").select("*").order("etapa").order("manzana").order("lote").execute()
-        df = pd.DataFrame(res_vista.data)
-        
+        resumen = pd.DataFrame(datos.resumen_lotes(supabase, **filtros),
+                               columns=["etapa", "total_lotes", "disponibles", "valor_total", "valor_disponible"])
+        etapas = etapa_sel.multiselect("Etapa", resumen["etapa"].tolist(), placeholder="Todas")
+        df = datos.consultar_lotes(supabase, etapas=etapas, **filtros)
+
         if not df.empty:
-            df['Referencia'] = df.apply(lambda x: f"M{int(x['manzana']):02d}-L{int(x['lote']):02d}", axis=1)
-            df['display_selector'] = df.apply(lambda x: f"E{x['etapa']}-M{x['manzana']}-L{x['lote']}", axis=1)
+            df['Referencia'] = df['lote_ref']
+            df['display_selector'] = df['lote_clave']
     except Exception as e:
         st.error(f"Error al cargar datos: {e}")
         return
 
-    # --- 2. MÉTRICAS PERSONALIZADAS (Símbolo de peso escapado) ---
-    if not df.empty:
-        total_lotes = len(df)
-        disponibles = len(df[df['estatus_actual'] == 'DISPONIBLE'])
-        valor_total = df['precio_lista'].sum()
+    # --- 3. MÉTRICAS PERSONALIZADAS (calculadas en la base, símbolo de peso escapado) ---
+    if etapas:
+        resumen = resumen[resumen['etapa'].isin(etapas)]
+    if not resumen.empty:
+        total_lotes = int(resumen['total_lotes'].sum())
+        disponibles = int(resumen['disponibles'].sum())
+        valor_total = float(resumen['valor_total'].astype(float).sum())
 
         # Formateamos el valor fuera del HTML para evitar conflictos de sintaxis
         valor_f = f"${valor_total:,.2f}"
@@ -47,13 +69,13 @@ def render_ubicaciones(supabase):
         </div>
         """, unsafe_allow_html=True)
 
-    # --- 3. PESTAÑAS ---
-    tab1, tab2, tab3 = st.tabs(["📋 Ver Inventario", "➕ Registrar Nuevo", "✏️ Editar / Borrar"])
+    # --- 4. PESTAÑAS ---
+    tab1, tab2, tab3, tab4 = st.tabs(["📋 Ver Inventario", "➕ Registrar Nuevo", "✏️ Editar / Borrar", "📥 Importar"])
 
     with tab1:
         if not df.empty:
             busqueda = st.text_input("🔍 Buscar por Referencia (ej: M01)", placeholder="Escriba para filtrar...")
-            df_view = df[df['Referencia'].str.contains(busqueda, case=False, na=False)] if busqueda else df
+            df_view = buscador.filtrar(df, busqueda, ['Referencia', 'display_selector'], "inventario", clave='ubicacion_id')
 
             st.dataframe(
                 df_view[["Referencia", "manzana", "lote", "etapa", "precio_lista", "enganche_req", "estatus_actual"]],
@@ -70,7 +92,7 @@ def render_ubicaciones(supabase):
                 hide_index=True
             )
         else:
-            st.info("No hay lotes en el inventario.")
+            st.info("No hay lotes que coincidan con los filtros.")
 
     with tab2:
         with st.form("form_nueva_ubicacion", clear_on_submit=True):
@@ -86,14 +108,13 @@ def render_ubicaciones(supabase):
 
             if st.form_submit_button("✅ Guardar Lote", type="primary", use_container_width=True):
                 try:
-                    supabase.table("ubicaciones").insert({
+                    escrituras.escribir(supabase, "ubicaciones", "insert", {
                         "manzana": int(manzana), 
                         "lote": int(lote), 
                         "etapa": int(etapa),
                         "precio": precio,
                         "enganche_req": enganche
-                    }).execute()
-                    st.success("✅ ¡Lote registrado con éxito!")
+                    }, aviso="✅ ¡Lote registrado con éxito!")
                     st.rerun()
                 except Exception as e:
                     st.error(f"Error al guardar: {e}")
@@ -105,6 +126,9 @@ def render_ubicaciones(supabase):
             
             if lote_sel_ref != "--":
                 datos_lote = df[df['display_selector'] == lote_sel_ref].iloc[0]
+                anterior = {"etapa": int(datos_lote['etapa']), "manzana": int(datos_lote['manzana']),
+                            "lote": int(datos_lote['lote']), "precio": float(datos_lote['precio_lista']),
+                            "enganche_req": float(datos_lote['enganche_req'])}
 
                 with st.form("form_edicion"):
                     st.warning(f"Editando: **{datos_lote['Referencia']}**")
@@ -114,16 +138,18 @@ def render_ubicaciones(supabase):
                     
                     c_btn1, c_btn2 = st.columns(2)
                     if c_btn1.form_submit_button("💾 Guardar Cambios", use_container_width=True):
-                        supabase.table("ubicaciones").update({
+                        escrituras.escribir(supabase, "ubicaciones", "update", {
                             "precio": nuevo_precio, 
                             "enganche_req": nuevo_enganche
-                        }).eq("id", int(datos_lote['ubicacion_id'])).execute()
-                        st.success("¡Actualizado!")
+                        }, int(datos_lote['ubicacion_id']), anterior=anterior, aviso="¡Actualizado!")
                         st.rerun()
                     
                     if c_btn2.form_submit_button("🗑️ Eliminar Lote", use_container_width=True):
-                        try:
-                            supabase.table("ubicaciones").delete().eq("id", int(datos_lote['ubicacion_id'])).execute()
-                            st.rerun()
-                        except:
-                            st.error("No se puede eliminar un lote con historial de ventas.")
+                        # Un lote con historial de ventas lo rechaza la base y el cambio se deshace
+                        escrituras.escribir(supabase, "ubicaciones", "delete", id_registro=int(datos_lote['ubicacion_id']),
+                                            anterior=anterior, aviso=f"Lote {datos_lote['Referencia']} eliminado")
+                        st.rerun()
+
+    with tab4:
+        st.subheader("Importar lotes desde archivo")
+        importacion.render_importacion(supabase, "ubicaciones")
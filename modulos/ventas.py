@@ -1,31 +1,29 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-import time
+from modulos import datos, escrituras
 
 def render_ventas(supabase):
     st.title("📝 Gestión de Apartados y Ventas")
 
     # --- 1. CARGA DE DATOS ---
-    try:
-        res_dir = supabase.table("directorio").select("id, nombre, tipo").order("nombre").execute()
-        res_ub = supabase.table("vista_estatus_lotes").select("*").order("etapa").order("manzana").order("lote").execute()
-        
-        res_v = supabase.table("ventas").select("""
-            *,
-            cliente:directorio!cliente_id(nombre),
-            vendedor:directorio!vendedor_id(nombre),
-            ubicacion:ubicaciones(id, etapa, manzana, lote, precio, enganche_req)
-        """).execute()
+    res = datos.en_paralelo({
+        "directorio": lambda: datos.consultar(supabase, "directorio", "id, nombre, tipo", orden=[("nombre", False)]),
+        "lotes": lambda: datos.consultar_lotes(supabase, estatus="DISPONIBLE"),
+        "ventas": lambda: datos.cargar_ventas(supabase),
+    })
+    errores = datos.fallidas(res)
+    if errores:
+        for nombre, e in errores.items():
+            st.error(f"Error al cargar {nombre}: {e}")
+        return
 
-        df_dir = pd.DataFrame(res_dir.data)
-        df_u = pd.DataFrame(res_ub.data)
-        df_v = pd.DataFrame(res_v.data)
+    try:
+        df_u, df_v = res["lotes"], res["ventas"]
+        df_dir = pd.DataFrame(res["directorio"])
         
         if not df_v.empty:
-            df_v['display_lote'] = df_v['ubicacion'].apply(
-                lambda x: f"M{int(x['manzana']):02d}-L{int(x['lote']):02d}" if x else "N/A"
-            )
+            df_v['display_lote'] = df_v['lote_ref']
 
     except Exception as e:
         st.error(f"Error al cargar datos: {e}")
@@ -36,12 +34,12 @@ def render_ventas(supabase):
     # --- PESTAÑA 1: NUEVO APARTADO ---
     with tab_nueva:
         st.subheader("1. Seleccione un Lote Disponible")
-        lotes_libres = df_u[df_u["estatus_actual"] == "DISPONIBLE"].copy()
+        lotes_libres = df_u.copy()
         
         if lotes_libres.empty:
             st.warning("No hay lotes disponibles.")
         else:
-            lotes_libres['Ref'] = lotes_libres.apply(lambda x: f"M{int(x['manzana']):02d}-L{int(x['lote']):02d}", axis=1)
+            lotes_libres['Ref'] = lotes_libres['lote_ref']
             
             event = st.dataframe(
                 lotes_libres[["Ref", "etapa", "precio_lista", "enganche_req"]],
@@ -99,11 +97,8 @@ def render_ventas(supabase):
                             }
                             
                             try:
-                                supabase.table("ventas").insert(nueva_v_data).execute()
-                                
-                                st.balloons()
-                                st.success(f"🎉 ¡Venta de {row_u['Ref']} registrada con éxito!")
-                                time.sleep(1.5)
+                                escrituras.escribir(supabase, "ventas", "insert", nueva_v_data,
+                                                    aviso=f"🎉 ¡Venta de {row_u['Ref']} registrada con éxito!")
                                 st.rerun()
                             except Exception as e: 
                                 st.error(f"Error: {e}")
@@ -113,21 +108,19 @@ def render_ventas(supabase):
     # --- PESTAÑA 2: EDITOR ---
     with tab_editar:
         if not df_v.empty:
-            df_v['edit_label'] = df_v.apply(lambda x: f"{x['display_lote']} - {x['cliente']['nombre']}", axis=1)
+            df_v['edit_label'] = df_v['display_lote'] + " - " + df_v['cliente_nombre'].fillna("N/A")
             edit_sel = st.selectbox("Seleccione Contrato para modificar", ["--"] + df_v["edit_label"].tolist())
             if edit_sel != "--":
                 datos_v = df_v[df_v["edit_label"] == edit_sel].iloc[0]
                 with st.form("form_edit_vta"):
                     ce1, ce2 = st.columns(2)
-                    e_plazo = ce1.number_input("Ajustar Plazo", value=int(datos_v.get("plazo", 48)))
-                    e_com = ce2.number_input("Ajustar Comisión ($)", value=float(datos_v.get("comision_monto", 5000.0)), format="%.2f")
+                    e_plazo = ce1.number_input("Ajustar Plazo", value=int(datos_v["plazo"]) if pd.notna(datos_v["plazo"]) else 48)
+                    e_com = ce2.number_input("Ajustar Comisión ($)", value=float(datos_v["comision_monto"]) if pd.notna(datos_v["comision_monto"]) else 5000.0, format="%.2f")
                     if st.form_submit_button("💾 GUARDAR CAMBIOS"):
-                        supabase.table("ventas").update({
+                        escrituras.escribir(supabase, "ventas", "update", {
                             "comision_monto": e_com, 
                             "plazo": e_plazo
-                        }).eq("id", datos_v['id']).execute()
-                        st.toast("¡Actualizado correctamente!", icon="✅")
-                        time.sleep(1)
+                        }, int(datos_v['id']), aviso="¡Actualizado correctamente!")
                         st.rerun()
 
     # --- PESTAÑA 3: HISTORIAL ---
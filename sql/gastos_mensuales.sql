@@ -0,0 +1,57 @@
+-- Resumen de gastos por mes y categoría.
+-- gastos_mensuales se mantiene por trigger en cada insert/update/delete de
+-- gastos: las gráficas y el presupuesto leen una fila por mes y categoría
+-- sin importar cuántos gastos haya. presupuesto_gastos guarda lo planeado.
+
+create index if not exists idx_gastos_fecha_id on gastos (fecha desc, id desc);
+create index if not exists idx_gastos_categoria_fecha on gastos (categoria, fecha desc, id desc);
+
+create table if not exists gastos_mensuales (
+    mes         date    not null,
+    categoria   text    not null,
+    total       numeric not null default 0,
+    num_gastos  int     not null default 0,
+    primary key (mes, categoria)
+);
+
+create table if not exists presupuesto_gastos (
+    mes         date    not null,
+    categoria   text    not null,
+    monto       numeric not null default 0,
+    primary key (mes, categoria)
+);
+
+create or replace function acumular_gasto(p_fecha date, p_categoria text, p_monto numeric, p_signo int)
+returns void as $$
+begin
+    insert into gastos_mensuales as g (mes, categoria, total, num_gastos)
+    values (date_trunc('month', p_fecha)::date, coalesce(p_categoria, 'Otros'),
+            p_signo * coalesce(p_monto, 0), p_signo)
+    on conflict (mes, categoria) do update
+        set total = g.total + excluded.total,
+            num_gastos = g.num_gastos + excluded.num_gastos;
+end;
+$$ language plpgsql;
+
+create or replace function actualizar_gastos_mensuales() returns trigger as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        perform acumular_gasto(old.fecha, old.categoria, old.monto, -1);
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform acumular_gasto(new.fecha, new.categoria, new.monto, 1);
+    end if;
+    return null;
+end;
+$$ language plpgsql;
+
+drop trigger if exists trg_gastos_mensuales on gastos;
+create trigger trg_gastos_mensuales after insert or update or delete on gastos
+for each row execute function actualizar_gastos_mensuales();
+
+-- Carga inicial con los gastos que ya existen
+truncate gastos_mensuales;
+insert into gastos_mensuales (mes, categoria, total, num_gastos)
+select date_trunc('month', fecha)::date, coalesce(categoria, 'Otros'), sum(monto), count(*)
+from gastos
+group by 1, 2;
@@ -0,0 +1,41 @@
+-- Inventario de lotes filtrado en la base.
+-- La app pide a vista_estatus_lotes solo las filas que muestra (etapa,
+-- rango de manzanas, estatus y banda de precio) y las tarjetas de
+-- métricas salen de resumen_inventario, sin descargar el inventario.
+
+create index if not exists idx_ubicaciones_etapa_manzana on ubicaciones (etapa, manzana, lote);
+create index if not exists idx_ubicaciones_precio on ubicaciones (precio);
+create index if not exists idx_ventas_ubicacion_id on ventas (ubicacion_id);
+
+-- Conteos y sumas por etapa con los mismos filtros que la lista (salvo la
+-- etapa: la app suma las etapas elegidas y usa las filas como opciones).
+create or replace function resumen_inventario(
+    p_estatus text default null,
+    p_manzana_min int default null,
+    p_manzana_max int default null,
+    p_precio_min numeric default null,
+    p_precio_max numeric default null
+)
+returns table (
+    etapa int,
+    total_lotes bigint,
+    disponibles bigint,
+    valor_total numeric,
+    valor_disponible numeric
+)
+language sql stable as $$
+    select
+        v.etapa::int,
+        count(*),
+        count(*) filter (where v.estatus_actual = 'DISPONIBLE'),
+        coalesce(sum(v.precio_lista), 0),
+        coalesce(sum(v.precio_lista) filter (where v.estatus_actual = 'DISPONIBLE'), 0)
+    from vista_estatus_lotes v
+    where (p_estatus is null or v.estatus_actual = p_estatus)
+      and (p_manzana_min is null or v.manzana >= p_manzana_min)
+      and (p_manzana_max is null or v.manzana <= p_manzana_max)
+      and (p_precio_min is null or v.precio_lista >= p_precio_min)
+      and (p_precio_max is null or v.precio_lista <= p_precio_max)
+    group by v.etapa
+    order by v.etapa;
+$$;
@@ -0,0 +1,50 @@
+-- Resultados precalculados por worker.py (recálculo nocturno fuera de Streamlit).
+-- fecha_corte es el día para el que se calculó la fila; la app solo la usa si
+-- coincide con hoy y si pagado, plazo, precio y enganche no cambiaron desde entonces.
+-- comisiones_devengo no depende del día: vale mientras vendedor, precio,
+-- comisión, total pagado y número de pagos de la venta sean los mismos.
+
+create table if not exists cartera_antiguedad (
+    venta_id      bigint primary key references ventas (id) on delete cascade,
+    precio        numeric,
+    enganche_req  numeric,
+    plazo         integer,
+    pagado        numeric,
+    esperado      numeric,
+    monto_vencido numeric,
+    atraso        integer,
+    estatus       text,
+    fecha_corte   date not null,
+    calculado_el  timestamptz not null default now()
+);
+
+create table if not exists plan_pagos (
+    venta_id     bigint not null references ventas (id) on delete cascade,
+    num_cuota    integer not null,
+    vencimiento  date,
+    cuota        numeric,
+    abonado      numeric,
+    saldo        numeric,
+    estatus      text,
+    fecha_corte  date not null,
+    calculado_el timestamptz not null default now(),
+    primary key (venta_id, num_cuota)
+);
+
+create index if not exists idx_plan_pagos_calculado on plan_pagos (calculado_el);
+
+create table if not exists comisiones_devengo (
+    venta_id       bigint not null references ventas (id) on delete cascade,
+    periodo        date not null,
+    vendedor_id    bigint,
+    precio         numeric,
+    comision_monto numeric,
+    pagado         numeric,
+    num_pagos      integer,
+    cobrado        numeric,
+    devengado      numeric,
+    calculado_el   timestamptz not null default now(),
+    primary key (venta_id, periodo)
+);
+
+create index if not exists idx_comisiones_devengo_calculado on comisiones_devengo (calculado_el);
@@ -0,0 +1,29 @@
+-- Columnas de control para la sincronización incremental.
+-- Cada tabla base lleva updated_at, actualizado por trigger en cada
+-- insert/update, e indexado junto con id para leer cambios por cursor.
+-- Se usa clock_timestamp() (hora real de la fila) y no now() (inicio de la
+-- transacción); aun así una transacción larga puede confirmar filas con hora
+-- anterior al cursor, por eso la app relee una ventana de margen.
+
+create or replace function marcar_updated_at() returns trigger as $$
+begin
+    new.updated_at := clock_timestamp();
+    return new;
+end;
+$$ language plpgsql;
+
+do $$
+declare
+    t text;
+begin
+    foreach t in array array['ventas', 'pagos', 'gastos', 'directorio', 'ubicaciones'] loop
+        execute format('alter table %I add column if not exists updated_at timestamptz not null default now()', t);
+        execute format('create index if not exists %I on %I (updated_at, id)', 'idx_' || t || '_updated_at', t);
+        execute format('drop trigger if exists trg_%s_updated_at on %I', t, t);
+        execute format(
+            'create trigger trg_%s_updated_at before insert or update on %I '
+            'for each row execute function marcar_updated_at()', t, t
+        );
+    end loop;
+end;
+$$;
@@ -0,0 +1,14 @@
+-- Totales de pagos agregados por venta.
+-- La app lee esta vista en lugar de descargar todo el historial de pagos,
+-- así el volumen transferido crece con el número de contratos.
+
+create index if not exists idx_pagos_venta_id on pagos (venta_id);
+
+create or replace view vista_totales_pagos as
+select
+    venta_id,
+    sum(monto)  as total_pagado,
+    count(*)    as num_pagos,
+    max(fecha)  as ultimo_pago
+from pagos
+group by venta_id;
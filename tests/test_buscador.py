@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+from modulos import buscador
+
+
+@pytest.fixture(autouse=True)
+def indices_vacios():
+    buscador._indices.clear()
+    yield
+    buscador._indices.clear()
+
+
+@pytest.fixture
+def cartera():
+    return pd.DataFrame({
+        "id": [1, 2, 3, 4],
+        "Cliente": ["José Pérez", "Ana García", "Pedro Garza", "Luisa Pérez"],
+        "Lote": ["E1-M01-L02", "E1-M02-L10", "E2-M10-L01", "E2-M11-L03"],
+    })
+
+
+def _ids(df, consulta, nombre="cartera"):
+    return buscador.filtrar(df, consulta, ["Cliente", "Lote"], nombre)["id"].tolist()
+
+
+def test_nombres_por_prefijo_y_lotes_por_subcadena(cartera):
+    assert _ids(cartera, "pere") == [1, 4]
+    assert _ids(cartera, "ez") == []
+    # Como el filtro anterior: "01" encuentra M01, M10-L01...
+    assert _ids(cartera, "01") == [1, 3]
+    assert _ids(cartera, "m1") == [3, 4]
+    assert _ids(cartera, "perez m01") == [1]
+    # Errores de captura
+    assert _ids(cartera, "garsia") == [2]
+
+
+def test_el_indice_sigue_al_contenido_del_frame(cartera):
+    assert _ids(cartera, "jose") == [1]
+    editada = cartera.copy()
+    editada.loc[0, "Cliente"] = "Josefina Pérez"
+    editada.loc[[1, 2], "Lote"] = editada.loc[[2, 1], "Lote"].to_numpy()
+    assert _ids(editada, "josefina") == [1]
+    assert _ids(editada, "m02") == [3]
+
+
+def test_frames_distintos_con_el_mismo_nombre_no_comparten_indice(cartera, monkeypatch):
+    sincronizados = []
+    original = buscador.IndiceBusqueda.sincronizar
+    monkeypatch.setattr(buscador.IndiceBusqueda, "sincronizar",
+                        lambda idx, registros: sincronizados.append(len(registros)) or original(idx, registros))
+    clientes, otros = cartera.iloc[:2], cartera.iloc[2:]
+    for _ in range(3):
+        assert _ids(clientes, "perez") == [1] and _ids(otros, "perez") == [4]
+    # Cada frame se indexa una vez; alternar entre ellos no reconstruye nada
+    assert len(buscador._indices) == 2 and sincronizados == [2, 2]
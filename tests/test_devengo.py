@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+import worker
+from benchmarks import sintetico
+from modulos import antiguedad, datos, devengo
+from modulos.cliente_local import ClienteLocal
+
+
+@pytest.fixture(autouse=True)
+def devengo_limpio():
+    def limpiar():
+        devengo.usar_precalculado(False)
+        devengo.reiniciar()
+        datos.limpiar_cache()
+    limpiar()
+    yield
+    limpiar()
+
+
+def _precalcular(cliente):
+    # Lo que guarda worker.py en comisiones_devengo
+    ventas = datos.cargar_ventas(cliente)
+    base = antiguedad.leer(cliente).merge(ventas[["id", "vendedor_id", "comision_monto"]], on="id", how="left")
+    pagos = pd.DataFrame(datos.consultar(cliente, "pagos", "venta_id, fecha, monto"))
+    salida = worker.calcular_particion(base, pagos, pd.Timestamp.now().normalize(), ["comisiones"])
+    cliente.tablas["comisiones_devengo"] = worker.filas_comisiones(salida["comisiones"], None, "2025-01-01T00:00:00")
+
+
+def _resumen(cliente, precalculado):
+    devengo.usar_precalculado(precalculado)
+    devengo.reiniciar()
+    datos.limpiar_cache()
+    return devengo.resumen(cliente)
+
+
+def _comparar(cliente):
+    esperado, resumen = _resumen(cliente, False), _resumen(cliente, True)
+    # Lo guardado viene redondeado a centavos por venta y mes
+    for llave in ("vendedores", "periodos"):
+        pd.testing.assert_frame_equal(resumen[llave], esperado[llave], check_dtype=False, rtol=1e-4, atol=0.05)
+
+
+def test_devengo_precalculado_igual_al_calculo_completo():
+    cliente = ClienteLocal(sintetico.generar(200))
+    _precalcular(cliente)
+    _comparar(cliente)
+
+
+def test_contratos_con_cambios_se_recalculan():
+    cliente = ClienteLocal(sintetico.generar(200))
+    _precalcular(cliente)
+    pago = cliente.tablas["pagos"][0]
+    cliente.table("pagos").update({"monto": pago["monto"] + 5000.0}).eq("id", pago["id"]).execute()
+    venta = next(v for v in cliente.tablas["ventas"] if v["id"] != pago["venta_id"])
+    cliente.table("ventas").update({"comision_monto": 12345.0}).eq("id", venta["id"]).execute()
+    cliente.table("pagos").insert({"venta_id": venta["id"], "monto": 800.0, "fecha": "2025-02-03"}).execute()
+    _comparar(cliente)
+
+
+def test_sin_tabla_precalculada_calcula_todo():
+    cliente = ClienteLocal(sintetico.generar(50))
+    _comparar(cliente)
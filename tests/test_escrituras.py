@@ -0,0 +1,245 @@
+import threading
+import types
+
+import pytest
+
+from modulos import datos
+from modulos.cliente_local import ClienteLocal
+
+
+class _Pausada:
+    # Consulta de ClienteLocal que se detiene en `puerta` al ejecutarse: las
+    # lecturas después de leer (devuelven lo de antes) y las escrituras antes
+    def __init__(self, consulta, puerta, leida):
+        self._consulta, self._puerta, self._leida = consulta, puerta, leida
+
+    def __getattr__(self, nombre):
+        metodo = getattr(self._consulta, nombre)
+
+        def encadenar(*args, **kwargs):
+            metodo(*args, **kwargs)
+            return self
+        return encadenar
+
+    def execute(self):
+        if self._consulta._operacion == "select":
+            respuesta = self._consulta.execute()
+            self._leida.set()
+            assert self._puerta.wait(5)
+            return respuesta
+        assert self._puerta.wait(5)
+        return self._consulta.execute()
+
+
+class ClienteLento(ClienteLocal):
+    """ClienteLocal cuyas consultas a las tablas en `pausas` esperan a que
+    se abra su puerta (threading.Event). `leida` se activa cuando una lectura
+    pausada ya leyó."""
+
+    def __init__(self, tablas):
+        super().__init__(tablas)
+        self.pausas = {}
+        self.leida = threading.Event()
+
+    def table(self, nombre):
+        consulta = super().table(nombre)
+        return _Pausada(consulta, self.pausas[nombre], self.leida) if nombre in self.pausas else consulta
+
+
+@pytest.fixture(autouse=True)
+def cache_limpia():
+    datos.limpiar_cache()
+    yield
+    datos.limpiar_cache()
+
+
+def _tablas():
+    return {
+        "ventas": [{"id": 1, "ubicacion_id": 1, "precio": 120000.0}, {"id": 2, "ubicacion_id": 2, "precio": 90000.0}],
+        "ubicaciones": [{"id": 1, "etapa": 1, "manzana": 1, "lote": 1, "precio": 120000.0, "enganche_req": 12000.0},
+                        {"id": 2, "etapa": 1, "manzana": 1, "lote": 2, "precio": 90000.0, "enganche_req": 9000.0}],
+        "pagos": [{"id": 1, "venta_id": 1, "monto": 100000.0, "fecha": "2025-01-05", "folio": "A1"},
+                  {"id": 2, "venta_id": 1, "monto": 2000.0, "fecha": "2025-02-05", "folio": "A2"},
+                  {"id": 3, "venta_id": 2, "monto": 9000.0, "fecha": "2025-01-10", "folio": "B1"}],
+        "gastos": [{"id": 1, "fecha": "2025-01-03", "categoria": "Luz", "monto": 500.0}],
+    }
+
+
+def _total(cliente, venta_id):
+    filas = datos.consultar(cliente, "vista_totales_pagos", "venta_id, total_pagado")
+    return next(f["total_pagado"] for f in filas if f["venta_id"] == venta_id)
+
+
+def test_lectura_cruzada_con_una_escritura_no_queda_en_cache():
+    cliente = ClienteLento(_tablas())
+    lectura = cliente.pausas["vista_totales_pagos"] = threading.Event()
+    escritura = cliente.pausas["pagos"] = threading.Event()
+
+    # La lectura sale antes de la escritura y vuelve mientras ésta viaja
+    lector = datos._pool.submit(_total, cliente, 1)
+    assert cliente.leida.wait(5)
+    futuro = datos.escribir(cliente, "pagos", "insert", {"venta_id": 1, "monto": 1000.0, "fecha": "2025-03-05"})
+    lectura.set()
+    assert lector.result(5) == 102000.0
+    escritura.set()
+    futuro.result(5)
+
+    assert _total(cliente, 1) == 103000.0
+
+
+def test_lectura_cruzada_con_escritura_directa_no_queda_en_cache():
+    cliente = ClienteLento(_tablas())
+    lectura = cliente.pausas["vista_totales_pagos"] = threading.Event()
+    lector = datos._pool.submit(_total, cliente, 1)
+    assert cliente.leida.wait(5)
+    escritor = datos._pool_escrituras.submit(datos.insertar, cliente, "pagos",
+                                              {"venta_id": 1, "monto": 1000.0, "fecha": "2025-03-05"})
+    escritor.result(5)
+    lectura.set()
+    assert lector.result(5) == 102000.0
+
+    assert _total(cliente, 1) == 103000.0
+
+
+# --- AJUSTE OPTIMISTA DE LA CACHÉ ---
+PAGOS_VENTA_1 = ("pagos", "*", [("eq", "venta_id", 1)], [("id", False)])
+TOTALES = ("vista_totales_pagos", "*", [], [("venta_id", False)])
+LOTES = ("vista_estatus_lotes", "*", [], [("ubicacion_id", False)])
+GASTOS_MES = ("gastos_mensuales", "*", [], [("mes", False), ("categoria", False)])
+CONSULTAS = [PAGOS_VENTA_1, TOTALES, LOTES, GASTOS_MES, ("ventas", "id, ubicacion_id", [], [])]
+
+PAGO_3 = {"venta_id": 2, "monto": 9000.0, "fecha": "2025-01-10", "folio": "B1"}
+GASTO_1 = {"fecha": "2025-01-03", "categoria": "Luz", "monto": 500.0}
+
+
+def _leer(cliente, consulta):
+    tabla, columnas, filtros, orden = consulta
+    filas = datos.consultar(cliente, tabla, columnas, filtros=filtros, orden=orden)
+    # Los ids provisionales y las marcas de la base no se comparan
+    return [{c: v for c, v in f.items() if c not in ("id", "updated_at")} for f in filas]
+
+
+def _en_base(cliente, tabla, operacion, valores, id_registro):
+    # Lo que quedaría en la base tras la escritura, en un cliente aparte
+    verdad = ClienteLocal(cliente.tablas)
+    datos._ejecutar_escritura(verdad, tabla, operacion, valores, id_registro)
+    return verdad
+
+
+@pytest.mark.parametrize("tabla, operacion, valores, id_registro, anterior, ajustadas", [
+    ("pagos", "insert", {"venta_id": 1, "monto": 1000.0, "fecha": "2025-03-05", "folio": "A3"}, None, None,
+     [PAGOS_VENTA_1, TOTALES, LOTES]),
+    ("pagos", "insert", {"venta_id": 2, "monto": 500.0, "fecha": "2025-03-07", "folio": "B2"}, None, None,
+     [PAGOS_VENTA_1, TOTALES, LOTES]),
+    ("pagos", "update", {"monto": 9500.0}, 3, PAGO_3, [PAGOS_VENTA_1, TOTALES, LOTES]),
+    ("pagos", "delete", None, 3, PAGO_3, [PAGOS_VENTA_1]),
+    ("ubicaciones", "update", {"precio": 125000.0}, 1, {"precio": 120000.0, "enganche_req": 12000.0}, [LOTES]),
+    ("gastos", "insert", {"fecha": "2025-01-20", "categoria": "Luz", "monto": 250.0}, None, None, [GASTOS_MES]),
+    ("gastos", "insert", {"fecha": "2025-02-01", "categoria": "Agua", "monto": 80.0}, None, None, [GASTOS_MES]),
+    ("gastos", "update", {"monto": 650.0}, 1, GASTO_1, [GASTOS_MES]),
+    ("gastos", "delete", None, 1, GASTO_1, [GASTOS_MES]),
+])
+def test_escritura_optimista_ajusta_la_cache(tabla, operacion, valores, id_registro, anterior, ajustadas):
+    cliente = ClienteLento(_tablas())
+    for consulta in CONSULTAS:
+        _leer(cliente, consulta)
+    verdad = _en_base(cliente, tabla, operacion, valores, id_registro)
+    puerta = cliente.pausas[tabla] = threading.Event()
+
+    futuro = datos.escribir(cliente, tabla, operacion, valores, id_registro, anterior=anterior)
+    # Antes de confirmar, lo ajustado en caché ya es lo que quedará en la base
+    for consulta in ajustadas:
+        assert _leer(cliente, consulta) == _leer(verdad, consulta), consulta[0]
+    puerta.set()
+    futuro.result(5)
+
+    datos.limpiar_cache()
+    esperado = {c[0]: _leer(verdad, c) for c in CONSULTAS}
+    for consulta in CONSULTAS:
+        assert _leer(cliente, consulta) == esperado[consulta[0]], consulta[0]
+
+
+def test_insert_confirmado_toma_el_id_de_la_base():
+    cliente = ClienteLocal(_tablas())
+    _leer(cliente, PAGOS_VENTA_1)
+    futuro = datos.escribir(cliente, "pagos", "insert", {"venta_id": 1, "monto": 10.0, "fecha": "2025-04-01"})
+    creada = futuro.result(5)[0]
+    filas = datos.consultar(cliente, *PAGOS_VENTA_1[:2], filtros=PAGOS_VENTA_1[2], orden=PAGOS_VENTA_1[3])
+    assert filas[-1]["id"] == creada["id"] == 4
+
+
+def test_escritura_rechazada_deshace_el_cambio():
+    cliente = ClienteLento(_tablas())
+    for consulta in CONSULTAS:
+        _leer(cliente, consulta)
+    antes = {c[0]: _leer(cliente, c) for c in CONSULTAS}
+
+    class Rechazada(ClienteLocal):
+        def table(self, nombre):
+            return cliente.table(nombre) if nombre != "pagos" else self._falla()
+
+        def _falla(self):
+            raise RuntimeError("violación de llave foránea")
+
+    futuro = datos.escribir(Rechazada(), "pagos", "insert", {"venta_id": 1, "monto": 1000.0, "fecha": "2025-03-05"})
+    with pytest.raises(RuntimeError):
+        futuro.result(5)
+    for consulta in CONSULTAS:
+        assert _leer(cliente, consulta) == antes[consulta[0]], consulta[0]
+
+
+# --- AVISOS DE LAS ESCRITURAS ---
+@pytest.fixture
+def st(monkeypatch):
+    st = pytest.importorskip("streamlit")
+    from modulos import escrituras
+    avisos = []
+
+    class Rerun(Exception):
+        pass
+
+    def rerun():
+        raise Rerun()
+    monkeypatch.setattr(st, "session_state", {})
+    monkeypatch.setattr(st, "toast", lambda texto, icon=None: avisos.append(("toast", texto)))
+    monkeypatch.setattr(st, "error", lambda texto: avisos.append(("error", texto)))
+    monkeypatch.setattr(st, "rerun", rerun)
+    return types.SimpleNamespace(avisos=avisos, Rerun=Rerun, escrituras=escrituras, session_state=st.session_state)
+
+
+def test_aviso_de_exito_solo_al_confirmar(st):
+    cliente = ClienteLento(_tablas())
+    puerta = cliente.pausas["pagos"] = threading.Event()
+    st.escrituras.escribir(cliente, "pagos", "insert", {"venta_id": 1, "monto": 1.0, "fecha": "2025-05-01"},
+                           aviso="Pago registrado")
+    st.escrituras.revisar()
+    assert st.avisos == []
+
+    puerta.set()
+    st.escrituras.revisar(esperar=5)
+    assert st.avisos == [("toast", "Pago registrado")]
+    assert st.session_state["escrituras"] == []
+
+
+def test_borrado_rechazado_avisa_el_error(st):
+    class Rechaza(ClienteLocal):
+        def table(self, nombre):
+            raise RuntimeError("tiene ventas asociadas")
+
+    futuro = st.escrituras.escribir(Rechaza(_tablas()), "directorio", "delete", id_registro=1, aviso="Registro eliminado")
+    # El borrado esperó la respuesta de la base
+    assert futuro.done()
+    st.escrituras.revisar()
+    assert st.avisos[0][0] == "error" and "tiene ventas asociadas" in st.avisos[0][1]
+
+
+def test_rechazo_tras_dibujar_vuelve_a_dibujar(st):
+    class Rechaza(ClienteLocal):
+        def table(self, nombre):
+            raise RuntimeError("rechazada")
+
+    st.escrituras.escribir(Rechaza(_tablas()), "pagos", "insert", {"venta_id": 1, "monto": 1.0, "fecha": "2025-05-01"})
+    with pytest.raises(st.Rerun):
+        st.escrituras.revisar(esperar=5)
+    st.escrituras.revisar()
+    assert [tipo for tipo, _ in st.avisos] == ["error"]
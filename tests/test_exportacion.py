@@ -0,0 +1,58 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from benchmarks import sintetico
+from modulos import datos, exportacion
+from modulos.cliente_local import ClienteLocal
+
+# Tipos que st.download_button acepta como `data` (además de un callable)
+TIPOS_DESCARGA = (str, bytes, io.BytesIO, io.BufferedReader, io.RawIOBase)
+
+
+def test_zip_temporal_se_entrega_como_acepta_el_boton():
+    cliente = ClienteLocal(sintetico.generar(60))
+    avances = []
+    with exportacion.zip_temporal(cliente, ("csv",), True, avance=lambda h, t: avances.append((h, t))) as (total, archivo):
+        assert isinstance(archivo, TIPOS_DESCARGA)
+        contenido = archivo.read()
+
+    assert total == 60
+    assert avances[-1] == (60, 60)
+    with zipfile.ZipFile(io.BytesIO(contenido)) as zf:
+        nombres = zf.namelist()
+        assert {"cartera.csv", "plan_de_pagos.csv"} <= set(nombres)
+        assert sum(n.startswith("estados_de_cuenta/csv/") for n in nombres) == total
+        assert len(zf.read("cartera.csv").decode("utf-8-sig").splitlines()) == total + 1
+
+
+def test_zip_temporal_borra_el_archivo_al_salir():
+    cliente = ClienteLocal(sintetico.generar(5))
+    with exportacion.zip_temporal(cliente, estados=False) as (_, archivo):
+        ruta = archivo.name
+    assert archivo.closed
+    assert not os.path.exists(ruta)
+
+
+def test_estados_de_cuenta_en_todos_los_formatos():
+    pytest.importorskip("openpyxl")
+    pytest.importorskip("fpdf")
+    cliente = ClienteLocal(sintetico.generar(4))
+    with exportacion.zip_temporal(cliente, exportacion.FORMATOS, True) as (total, archivo):
+        with zipfile.ZipFile(archivo) as zf:
+            nombres = zf.namelist()
+    for formato in exportacion.FORMATOS:
+        assert sum(n.startswith(f"estados_de_cuenta/{formato}/") for n in nombres) == total
+
+
+def test_cada_cliente_exporta_su_propia_cartera():
+    # Sin cartera explícita se calcula con el cliente recibido, no con la
+    # copia global de antiguedad.cartera
+    for n in (7, 3):
+        datos.limpiar_cache()
+        with exportacion.zip_temporal(ClienteLocal(sintetico.generar(n)), estados=False) as (total, archivo):
+            with zipfile.ZipFile(archivo) as zf:
+                filas = zf.read("cartera.csv").decode("utf-8-sig").splitlines()
+        assert total == n and len(filas) == n + 1
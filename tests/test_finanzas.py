@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from modulos import finanzas
+
+# Las funciones vectorizadas de finanzas deben dar lo mismo que el cálculo
+# fila por fila que tenían Inicio (mora) y Detalle de Crédito (plan de pagos)
+
+HOY = pd.Timestamp("2025-06-15 10:30")
+
+
+def _mora_por_fila(row, hoy):
+    # Cálculo original de modulos/inicio.py
+    try:
+        precio, enganche, plazo = float(row['precio']), float(row['enganche_req']), int(row['plazo'] or 12)
+        mensualidad = (precio - enganche) / plazo if plazo > 0 else 0
+        f_vta = pd.to_datetime(row['fecha_venta'])
+        meses = (hoy.year - f_vta.year) * 12 + (hoy.month - f_vta.month)
+        esperado = enganche + (max(0, meses) * mensualidad)
+        pagado = float(row['pagado'])
+        saldo = max(0.0, esperado - pagado)
+
+        dias = 0
+        if saldo > 100:
+            meses_c = (pagado - enganche) / mensualidad if mensualidad > 0 else 0
+            vence = f_vta + pd.DateOffset(months=int(max(0, meses_c)) + 1)
+            dias = (hoy - vence).days
+        return pd.Series([max(0, dias), saldo])
+    except Exception:
+        return pd.Series([0, 0.0])
+
+
+def _plan_por_fila(row):
+    # Cálculo original de modulos/credito.py
+    precio_vta, e_requerido = float(row['precio']), float(row['enganche_req'])
+    plazo_meses = int(row['plazo'] or 12)
+    mensualidad_base = (precio_vta - e_requerido) / plazo_meses if plazo_meses > 0 else 0
+    bolsa_para_mensualidades = max(0.0, float(row['pagado']) - e_requerido)
+    saldo_insoluto = precio_vta - e_requerido
+    fecha_inicio = pd.to_datetime(row['fecha_venta'])
+
+    filas = []
+    for i in range(1, plazo_meses + 1):
+        fecha_pago = fecha_inicio + relativedelta(months=i)
+        if bolsa_para_mensualidades >= (mensualidad_base - 0.05):
+            status_pago, abono = finanzas.CUBIERTO, mensualidad_base
+            bolsa_para_mensualidades -= mensualidad_base
+        elif bolsa_para_mensualidades > 0:
+            status_pago, abono = finanzas.PARCIAL, bolsa_para_mensualidades
+            bolsa_para_mensualidades = 0
+        else:
+            status_pago, abono = finanzas.PENDIENTE, 0.0
+        saldo_insoluto = max(0.0, saldo_insoluto - abono)
+        filas.append({"venta_id": row['id'], "num_cuota": i, "vencimiento": fecha_pago, "cuota": mensualidad_base,
+                      "abonado": abono, "saldo": saldo_insoluto, "estatus": status_pago})
+    return filas
+
+
+def _registros(df):
+    # Filas como llegaban de Supabase: None en lugar de NaN
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+@pytest.fixture
+def cartera():
+    return pd.DataFrame([
+        # id, fecha_venta, plazo, precio, enganche_req, pagado
+        (1, "2024-03-10", 24, 120000.0, 12000.0, 30000.0),    # atrasado
+        (2, "2024-09-01", 0, 60000.0, 6000.0, 15000.0),       # plazo 0 -> 12
+        (3, "2024-09-01", None, 60000.0, 6000.0, 15000.0),    # sin plazo -> 12
+        (4, "2024-01-15", 12, 50000.0, 5000.0, 80000.0),      # sobrepago
+        (5, "2025-06-01", 12, 70000.0, 7000.0, 17500.0),      # pagó antes del primer vencimiento
+        (6, "2025-08-01", 12, 70000.0, 7000.0, 7000.0),       # venta con fecha futura
+        (7, "2024-01-31", 18, 90000.0, 9000.0, 20000.0),      # fin de mes (29 de febrero)
+        (8, "2024-05-20", 36, 100000.0, 20000.0, 5000.0),     # no cubre el enganche
+        (9, "2023-07-07", 7, 100000.0, 0.0, 100000.0 / 7 * 3),  # cuota periódica en binario
+        (10, "2024-02-02", 12, 40000.0, 40000.0, 40000.0),    # sin mensualidades
+        (11, "2024-10-10", 12, 36000.0, 0.0, 3000.0 * 4 + 1234.56),  # abono parcial
+    ], columns=["id", "fecha_venta", "plazo", "precio", "enganche_req", "pagado"])
+
+
+def test_mora_igual_al_calculo_por_fila(cartera):
+    esperado = pd.DataFrame([_mora_por_fila(r, HOY).tolist() for r in _registros(cartera)],
+                            columns=["atraso", "monto_vencido"])
+    mora = finanzas.calcular_mora(cartera, HOY)
+
+    assert mora["atraso"].tolist() == esperado["atraso"].astype(int).tolist()
+    np.testing.assert_allclose(mora["monto_vencido"], esperado["monto_vencido"], atol=1e-6)
+
+
+def test_mora_tolerancia_y_plazo_por_omision(cartera):
+    mora = finanzas.calcular_mora(cartera, HOY)
+    # Plazo 0 y sin plazo se calculan a 12 meses
+    assert mora.loc[1].tolist() == mora.loc[2].tolist()
+    # Debajo de la tolerancia no hay días de atraso aunque haya saldo
+    apenas = cartera.loc[[0]].assign(pagado=float(mora.loc[0, "esperado"]) - finanzas.TOLERANCIA_MORA)
+    assert finanzas.calcular_mora(apenas, HOY)["atraso"].iloc[0] == 0
+
+
+def test_plan_igual_al_calculo_por_fila(cartera):
+    esperado = pd.DataFrame([f for r in _registros(cartera) for f in _plan_por_fila(r)])
+    plan = finanzas.plan_de_pagos(cartera)
+
+    assert len(plan) == len(esperado)
+    assert plan["venta_id"].tolist() == esperado["venta_id"].tolist()
+    assert plan["num_cuota"].tolist() == esperado["num_cuota"].tolist()
+    assert plan["vencimiento"].tolist() == esperado["vencimiento"].tolist()
+    np.testing.assert_allclose(plan["cuota"], esperado["cuota"])
+    # Única diferencia documentada: un resto de menos de medio centavo ya no
+    # es abono parcial
+    ruido = (esperado["estatus"] == finanzas.PARCIAL) & (esperado["abonado"] <= 0.005)
+    assert (plan["estatus"] == esperado["estatus"].where(~ruido, finanzas.PENDIENTE)).all()
+    np.testing.assert_allclose(plan["abonado"], esperado["abonado"], atol=0.005)
+    np.testing.assert_allclose(plan["saldo"], esperado["saldo"], atol=0.005 * len(esperado))
+
+
+def test_plan_casos_limite(cartera):
+    plan = finanzas.plan_de_pagos(cartera).groupby("venta_id")
+    # Sobrepago: todas las cuotas cubiertas y saldo en cero, sin cuotas extra
+    sobrepago = plan.get_group(4)
+    assert len(sobrepago) == 12 and (sobrepago["estatus"] == finanzas.CUBIERTO).all()
+    assert sobrepago["saldo"].iloc[-1] == 0
+    # Plazo 0 se toma como 12 meses
+    assert len(plan.get_group(2)) == 12
+    # Pago adelantado: cuotas cubiertas aunque todavía no vencen
+    assert plan.get_group(5)["estatus"].tolist()[:2] == [finanzas.CUBIERTO] * 2
+    # Abono parcial en la cuota que sigue a las cubiertas
+    parcial = plan.get_group(11).set_index("num_cuota")
+    assert parcial.loc[5, "estatus"] == finanzas.PARCIAL
+    assert parcial.loc[5, "abonado"] == pytest.approx(1234.56)
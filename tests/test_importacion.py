@@ -0,0 +1,117 @@
+import io
+
+import pandas as pd
+import pytest
+
+from modulos import datos
+from modulos.cliente_local import ClienteLocal
+
+pytest.importorskip("streamlit")
+from modulos import importacion  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cache_limpia():
+    datos.limpiar_cache()
+    yield
+    datos.limpiar_cache()
+
+
+@pytest.fixture
+def cliente():
+    return ClienteLocal({
+        "directorio": [{"id": 1, "nombre": "Ana López", "tipo": "Cliente"}],
+        "ubicaciones": [{"id": 1, "etapa": 1, "manzana": 2, "lote": 3, "precio": 100000.0, "enganche_req": 10000.0}],
+        "ventas": [{"id": 7, "ubicacion_id": 1, "cliente_id": 1}],
+        "pagos": [{"id": 1, "venta_id": 7, "monto": 1500.0, "fecha": "2025-01-10", "folio": "R1"},
+                  {"id": 2, "venta_id": 7, "monto": 1500.0, "fecha": "2025-02-10", "folio": None}],
+    })
+
+
+def _csv(filas):
+    return io.BytesIO(pd.DataFrame(filas).to_csv(index=False).encode("utf-8"))
+
+
+def _errores(errores):
+    # fila del archivo (con encabezado en la fila 1) -> mensaje
+    return dict(zip(errores["fila"], errores["error"]))
+
+
+def test_directorio_reporta_cada_fila(cliente):
+    archivo = _csv([
+        {"nombre": "Beto Ruiz", "tipo": "cliente", "telefono": "(55) 1234-5678", "correo": "Beto@Mail.com"},
+        {"nombre": "", "tipo": "Cliente", "telefono": "", "correo": ""},
+        {"nombre": "Caro Paz", "tipo": "Socio", "telefono": "", "correo": ""},
+        {"nombre": "Dani Gil", "tipo": "Vendedor", "telefono": "55123", "correo": "sin-arroba"},
+        {"nombre": "ana lópez", "tipo": "Cliente", "telefono": "", "correo": ""},
+        {"nombre": "Beto Ruiz", "tipo": "Cliente", "telefono": "", "correo": ""},
+        {"nombre": "Beto Ruiz", "tipo": "Vendedor", "telefono": "", "correo": ""},
+    ])
+    registros, errores = importacion.validar_archivo(cliente, "directorio", archivo, "contactos.csv")
+
+    assert registros == [
+        {"nombre": "Beto Ruiz", "tipo": "Cliente", "telefono": "5512345678", "correo": "beto@mail.com"},
+        {"nombre": "Beto Ruiz", "tipo": "Vendedor", "telefono": None, "correo": None},
+    ]
+    assert _errores(errores) == {
+        3: "El nombre es obligatorio.",
+        4: "El tipo debe ser Cliente o Vendedor.",
+        5: "El teléfono debe tener 10 dígitos. El correo no es válido.",
+        6: "El Cliente 'ana lópez' ya existe.",
+        7: "El Cliente 'Beto Ruiz' ya existe.",
+    }
+
+
+def test_ubicaciones_valida_numeros_y_lotes_repetidos(cliente):
+    archivo = _csv([
+        {"etapa": "1", "manzana": "2", "lote": "4", "precio": "120000", "enganche_req": ""},
+        {"etapa": "0", "manzana": "2", "lote": "5", "precio": "1", "enganche_req": "1"},
+        {"etapa": "1", "manzana": "a", "lote": "1.5", "precio": "1", "enganche_req": "1"},
+        {"etapa": "1", "manzana": "2", "lote": "6", "precio": "-5", "enganche_req": "x"},
+        {"etapa": "1", "manzana": "2", "lote": "3", "precio": "1", "enganche_req": "1"},
+        {"etapa": "1", "manzana": "2", "lote": "4", "precio": "1", "enganche_req": "1"},
+    ])
+    registros, errores = importacion.validar_archivo(cliente, "ubicaciones", archivo, "lotes.csv")
+
+    assert registros == [{"etapa": 1, "manzana": 2, "lote": 4, "precio": 120000.0, "enganche_req": 0.0}]
+    assert _errores(errores) == {
+        3: "Etapa debe ser un entero mayor a 0.",
+        4: "Manzana debe ser un entero mayor a 0. Lote debe ser un entero mayor a 0.",
+        5: "El precio no es válido. El enganche no es válido.",
+        6: "El lote E1-M2-L3 ya existe.",
+        7: "El lote E1-M2-L4 ya existe.",
+    }
+
+
+def test_pagos_detecta_duplicados_por_folio_y_por_venta_fecha_monto(cliente):
+    archivo = _csv([
+        {"venta_id": "7", "monto": "1500", "fecha": "2025-03-10", "folio": "R2", "comentarios": "ok"},
+        {"venta_id": "99", "monto": "100", "fecha": "2025-03-10", "folio": "", "comentarios": ""},
+        {"venta_id": "7", "monto": "0", "fecha": "no es fecha", "folio": "", "comentarios": ""},
+        {"venta_id": "7", "monto": "1500", "fecha": "2025-04-10", "folio": "R1", "comentarios": ""},
+        {"venta_id": "7", "monto": "1500.00", "fecha": "2025-02-10", "folio": "", "comentarios": ""},
+        {"venta_id": "7", "monto": "1500", "fecha": "2025-05-10", "folio": "R2", "comentarios": ""},
+        {"venta_id": "7", "monto": "800", "fecha": "2025-03-10", "folio": "", "comentarios": ""},
+    ])
+    registros, errores = importacion.validar_archivo(cliente, "pagos", archivo, "pagos.csv")
+
+    assert [(r["folio"], r["monto"], r["fecha"]) for r in registros] == [
+        ("R2", 1500.0, "2025-03-10"), ("", 800.0, "2025-03-10")]
+    assert _errores(errores) == {
+        3: "La venta no existe.",
+        4: "El monto debe ser mayor a 0. La fecha no es válida.",
+        5: "El folio R1 ya está registrado.",
+        6: "El pago ya está registrado (misma venta, fecha y monto).",
+        7: "El folio R2 ya está registrado.",
+    }
+
+
+def test_excel_se_valida_igual_que_csv(cliente):
+    pytest.importorskip("openpyxl")
+    archivo = io.BytesIO()
+    pd.DataFrame([{"Nombre": "Eva Sol", "Tipo": "Cliente", "Telefono": "5512345678", "Correo": ""},
+                  {"Nombre": "Eva Sol", "Tipo": "Cliente", "Telefono": "", "Correo": ""}]).to_excel(archivo, index=False)
+    registros, errores = importacion.validar_archivo(cliente, "directorio", archivo, "contactos.xlsx")
+
+    assert [r["nombre"] for r in registros] == ["Eva Sol"]
+    assert _errores(errores) == {3: "El Cliente 'Eva Sol' ya existe."}
@@ -0,0 +1,152 @@
+import pytest
+
+from modulos import datos, sincronizacion
+from modulos.almacen import AlmacenMemoria
+from modulos.cliente_local import ClienteLocal
+
+MARCA = "2025-01-01T12:00:00+00:00"
+
+
+@pytest.fixture(autouse=True)
+def copia_vacia():
+    def limpiar():
+        for estado in (sincronizacion._snapshot, sincronizacion._cursores, sincronizacion._ultima_reconciliacion,
+                       sincronizacion._vistas, sincronizacion._versiones):
+            estado.clear()
+        sincronizacion._almacen = AlmacenMemoria()
+        sincronizacion._activo = False
+        datos.registrar_fuente_local(None)
+        if sincronizacion._aplicar_escritura in datos._suscriptores:
+            datos._suscriptores.remove(sincronizacion._aplicar_escritura)
+        datos.limpiar_cache()
+    limpiar()
+    yield
+    limpiar()
+
+
+@pytest.fixture
+def cliente():
+    return ClienteLocal({
+        "directorio": [{"id": 1, "nombre": "Ana López", "tipo": "Cliente", "updated_at": MARCA},
+                       {"id": 2, "nombre": "Beto Ruiz", "tipo": "Cliente", "updated_at": MARCA},
+                       {"id": 3, "nombre": "Vera Paz", "tipo": "Vendedor", "updated_at": MARCA}],
+        "ubicaciones": [{"id": 1, "etapa": 1, "manzana": 1, "lote": 1, "precio": 100000.0, "enganche_req": 10000.0,
+                         "updated_at": MARCA},
+                        {"id": 2, "etapa": 1, "manzana": 1, "lote": 2, "precio": 80000.0, "enganche_req": 8000.0,
+                         "updated_at": MARCA},
+                        {"id": 3, "etapa": 2, "manzana": 4, "lote": 1, "precio": 90000.0, "enganche_req": 9000.0,
+                         "updated_at": MARCA}],
+        "ventas": [{"id": 1, "ubicacion_id": 1, "cliente_id": 1, "vendedor_id": 3, "fecha_venta": "2024-05-01",
+                    "plazo": 12, "updated_at": MARCA},
+                   {"id": 2, "ubicacion_id": 2, "cliente_id": 2, "vendedor_id": 3, "fecha_venta": "2024-07-01",
+                    "plazo": 24, "updated_at": MARCA}],
+        "pagos": [{"id": i, "venta_id": 1 + i % 2, "monto": 1000.0 * i, "fecha": f"2024-08-{i:02d}",
+                   "folio": f"F{i}", "updated_at": MARCA} for i in range(1, 7)],
+        "gastos": [{"id": 1, "fecha": "2024-08-03", "categoria": "Luz", "monto": 700.0, "updated_at": MARCA}],
+    })
+
+
+def _ids(tabla):
+    return set(sincronizacion._snapshot[tabla])
+
+
+def test_sincronizacion_incremental_por_cursor(cliente):
+    assert sincronizacion.sincronizar(cliente, reconciliar=False) == set(sincronizacion.TABLAS)
+    assert sincronizacion._cursores["pagos"] == (MARCA, 6)
+    # Sin cambios: lo releído dentro del margen no cuenta como cambio
+    assert sincronizacion.sincronizar(cliente, reconciliar=False) == set()
+
+    cliente.table("pagos").update({"monto": 9999.0}).eq("id", 2).execute()
+    cliente.table("pagos").insert({"venta_id": 1, "monto": 50.0, "fecha": "2024-09-01"}).execute()
+    assert sincronizacion.sincronizar(cliente, reconciliar=False) == {"pagos"}
+    assert sincronizacion._snapshot["pagos"][2]["monto"] == 9999.0
+    assert _ids("pagos") == set(range(1, 8))
+    assert sincronizacion._cursores["pagos"][1] == 7
+
+
+def test_relee_filas_confirmadas_tarde_dentro_del_margen(cliente):
+    sincronizacion.sincronizar(cliente, reconciliar=False)
+    cursor = sincronizacion._cursores["gastos"]
+    # Una transacción larga confirma una fila con marca anterior al cursor
+    cliente.tablas["gastos"].append({"id": 2, "fecha": "2024-08-09", "categoria": "Agua", "monto": 300.0,
+                                     "updated_at": "2025-01-01T11:58:00+00:00"})
+    assert sincronizacion.sincronizar(cliente, reconciliar=False) == {"gastos"}
+    assert _ids("gastos") == {1, 2}
+    # El cursor no retrocede
+    assert sincronizacion._cursores["gastos"] == cursor
+
+
+def test_reconciliacion_detecta_borrados_y_recupera_faltantes(cliente):
+    sincronizacion.sincronizar(cliente, reconciliar=False)
+    cliente.tablas["pagos"] = [f for f in cliente.tablas["pagos"] if f["id"] != 3]
+    # Fila con marca más vieja que el margen: la lectura por cursor no la ve
+    cliente.tablas["pagos"].append({"id": 40, "venta_id": 2, "monto": 10.0, "fecha": "2024-01-01",
+                                    "folio": "F40", "updated_at": "2024-06-01T00:00:00+00:00"})
+    assert sincronizacion.sincronizar(cliente, reconciliar=False) == set()
+    assert 3 in _ids("pagos") and 40 not in _ids("pagos")
+
+    assert sincronizacion.sincronizar(cliente, reconciliar=True) == {"pagos"}
+    assert _ids("pagos") == {1, 2, 4, 5, 6, 40}
+
+
+def test_escritura_provisional_se_deshace_si_falla(cliente):
+    sincronizacion.activar(cliente)
+    n = len(datos.consultar(cliente, "pagos", "id"))
+
+    class Rechaza(ClienteLocal):
+        def table(self, nombre):
+            raise RuntimeError("rechazada")
+
+    futuro = datos.escribir(Rechaza(), "pagos", "update", {"monto": 1.0}, 2, anterior={"venta_id": 1, "monto": 2000.0})
+    with pytest.raises(RuntimeError):
+        futuro.result(5)
+    futuro = datos.escribir(Rechaza(), "pagos", "insert", {"venta_id": 1, "monto": 5.0, "fecha": "2024-09-09"})
+    with pytest.raises(RuntimeError):
+        futuro.result(5)
+    futuro = datos.escribir(Rechaza(), "pagos", "delete", id_registro=4, anterior={"venta_id": 1, "monto": 4000.0})
+    with pytest.raises(RuntimeError):
+        futuro.result(5)
+
+    filas = datos.consultar(cliente, "pagos", "id, monto")
+    assert len(filas) == n
+    assert {f["id"]: f["monto"] for f in filas}[2] == 2000.0
+    assert 4 in {f["id"] for f in filas}
+
+
+def test_escritura_provisional_se_ve_antes_de_confirmar(cliente):
+    sincronizacion.activar(cliente)
+    cerrar = sincronizacion._aplicar_provisional("pagos", "insert", {"id": -1, "venta_id": 2, "monto": 7.0}, None)
+    total = {f["venta_id"]: f["total_pagado"] for f in datos.consultar(cliente, "vista_totales_pagos", "*")}
+    assert total[2] == 1000.0 * (1 + 3 + 5) + 7.0
+
+    cerrar([{"id": 99, "venta_id": 2, "monto": 7.0}])
+    assert -1 not in _ids("pagos") and 99 in _ids("pagos")
+
+
+@pytest.mark.parametrize("tabla, columnas, filtros, orden, limite", [
+    ("pagos", "*", [("eq", "venta_id", 2)], [("monto", True)], None),
+    ("pagos", "id, folio", [("gte", "monto", 2000.0), ("lt", "monto", 6000.0)], [("id", False)], 2),
+    ("pagos", "id", [("in_", "id", (1, 4, 5))], [("fecha", True)], None),
+    ("ventas", "id, cliente:directorio!cliente_id(nombre), ubicacion:ubicaciones(etapa, lote)", [], [("id", False)], None),
+    ("vista_totales_pagos", "*", [], [("venta_id", False)], None),
+    ("vista_estatus_lotes", "*", [("neq", "estatus_actual", "VENDIDO")], [("ubicacion_id", False)], None),
+    ("gastos_mensuales", "*", [], [("mes", False)], None),
+])
+def test_consulta_a_la_copia_igual_que_la_base(cliente, tabla, columnas, filtros, orden, limite):
+    sincronizacion.sincronizar(cliente, reconciliar=False)
+    local = sincronizacion.consultar_snapshot(tabla, columnas, filtros, orden, limite)
+
+    q = cliente.table(tabla).select(columnas)
+    for metodo, columna, valor in filtros:
+        q = getattr(q, metodo)(columna, valor)
+    for columna, desc in orden:
+        q = q.order(columna, desc=desc)
+    if limite:
+        q = q.limit(limite)
+    assert local == q.execute().data
+
+
+def test_consulta_no_sincronizada_va_a_la_base(cliente):
+    sincronizacion.sincronizar(cliente, reconciliar=False)
+    assert sincronizacion.consultar_snapshot("vista_saldos_comisiones", "*", [], [], None) is None
+    assert sincronizacion.consultar_snapshot("pagos", "*", [("ilike", "folio", "%1%")], [], None) is None
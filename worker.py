@@ -0,0 +1,198 @@
+import argparse
+import json
+import os
+import sys
+import time
+import tomllib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from itertools import repeat
+from pathlib import Path
+
+import pandas as pd
+
+from modulos import antiguedad, datos, exportacion, finanzas
+
+# --- WORKER DE RECÁLCULO NOCTURNO ---
+# Recalcula fuera de Streamlit la antigüedad, el plan de pagos y el devengo
+# de comisiones de toda la cartera, repartiendo los contratos en un pool de
+# procesos (por etapa o por rangos de contratos), y guarda los resultados en
+# bloque en las tablas de sql/precalculos.sql. La app los lee con el secreto
+# antiguedad_precalculada (Antigüedad, el plan del contrato en Detalle de
+# Crédito y los saldos de Comisiones).
+#
+#   python worker.py
+#   python worker.py --particion rango --tamano 2000 --procesos 4
+#   python worker.py --reporte /respaldos/cartera.zip
+#   python worker.py --sintetico 10000 --seco      # prueba sin red ni escrituras
+
+TAREAS = ("antiguedad", "plan", "comisiones")
+TABLAS = {"antiguedad": ("cartera_antiguedad", "venta_id"), "plan": ("plan_pagos", "venta_id, num_cuota"),
+          "comisiones": ("comisiones_devengo", "venta_id, periodo")}
+
+
+def conectar():
+    # Credenciales de las variables de entorno o de .streamlit/secrets.toml
+    url, key = os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")
+    secretos = Path(__file__).resolve().parent / ".streamlit" / "secrets.toml"
+    if not (url and key) and secretos.exists():
+        conf = tomllib.loads(secretos.read_text())
+        url, key = url or conf.get("supabase_url"), key or conf.get("supabase_key")
+    if not (url and key):
+        raise SystemExit("Faltan SUPABASE_URL y SUPABASE_KEY (o .streamlit/secrets.toml)")
+    from supabase import create_client
+    return create_client(url, key)
+
+
+def particionar(base, etapas, modo, tamano):
+    if modo == "etapa":
+        grupo = base["id"].map(etapas).astype("object").fillna("sin etapa").astype(str)
+        return [bloque for _, bloque in base.groupby(grupo, sort=True)]
+    base = base.sort_values("id")
+    return [base.iloc[i:i + tamano] for i in range(0, len(base), tamano)]
+
+
+def repartir_pagos(pagos, bloques):
+    # Los pagos de los contratos de cada bloque, en el orden de `bloques`
+    bloque_de = pd.concat([pd.Series(i, index=b["id"]) for i, b in enumerate(bloques)])
+    grupos = dict(tuple(pagos.groupby(pagos["venta_id"].map(bloque_de))))
+    return [grupos.get(i, pagos.iloc[:0]) for i in range(len(bloques))]
+
+
+def calcular_particion(bloque, pagos, hoy, tareas):
+    # Corre en un proceso del pool: solo lógica pura de modulos
+    salida = {}
+    if "antiguedad" in tareas:
+        salida["antiguedad"] = antiguedad.calcular(bloque, hoy)
+    if "plan" in tareas:
+        salida["plan"] = finanzas.plan_de_pagos(bloque)
+    if "comisiones" in tareas:
+        mensual = finanzas.devengo_mensual(finanzas.devengar(bloque, pagos))
+        # Con lo que la app decide si la fila sigue vigente
+        contrato = bloque.set_index("id")
+        for col in ("vendedor_id", "precio", "comision_monto", "pagado"):
+            mensual[col] = mensual["venta_id"].map(contrato[col])
+        mensual["num_pagos"] = mensual["venta_id"].map(pagos.groupby("venta_id").size())
+        salida["comisiones"] = mensual
+    return salida
+
+
+def _registros(df):
+    # JSON nativo (sin tipos de numpy ni NaN) para el cliente de Supabase
+    return json.loads(df.to_json(orient="records"))
+
+
+def filas_antiguedad(df, hoy, marca):
+    return _registros(pd.DataFrame({
+        "venta_id": df["id"],
+        "precio": df["precio"].round(2),
+        "enganche_req": df["enganche_req"].round(2),
+        "plazo": df["plazo"],
+        "pagado": df["pagado"].round(2),
+        "esperado": df["esperado"].round(2),
+        "monto_vencido": df["monto_vencido"].round(2),
+        "atraso": df["atraso"],
+        "estatus": df["estatus"],
+        "fecha_corte": hoy.strftime("%Y-%m-%d"),
+        "calculado_el": marca,
+    }))
+
+
+def filas_plan(df, hoy, marca):
+    return _registros(pd.DataFrame({
+        "venta_id": df["venta_id"],
+        "num_cuota": df["num_cuota"],
+        "vencimiento": df["vencimiento"].dt.strftime("%Y-%m-%d"),
+        "cuota": df["cuota"].round(2),
+        "abonado": df["abonado"].round(2),
+        "saldo": df["saldo"].round(2),
+        "estatus": df["estatus"],
+        "fecha_corte": hoy.strftime("%Y-%m-%d"),
+        "calculado_el": marca,
+    }))
+
+
+def filas_comisiones(df, hoy, marca):
+    return _registros(pd.DataFrame({
+        "venta_id": df["venta_id"],
+        "periodo": df["periodo"].astype(str) + "-01",
+        "vendedor_id": df["vendedor_id"],
+        "precio": df["precio"].round(2),
+        "comision_monto": df["comision_monto"].round(2),
+        "pagado": df["pagado"].round(2),
+        "num_pagos": df["num_pagos"],
+        "cobrado": df["cobrado"].round(2),
+        "devengado": df["devengado"].round(2),
+        "calculado_el": marca,
+    }))
+
+
+def escribir(supabase, tarea, filas, marca):
+    tabla, conflicto = TABLAS[tarea]
+    datos.guardar_lote(supabase, tabla, filas, conflicto, tamano=1000)
+    # Lo que no se tocó en esta corrida ya no existe (contratos borrados, plazos reducidos)
+    supabase.table(tabla).delete().lt("calculado_el", marca).execute()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recálculo nocturno de Valle Mart")
+    parser.add_argument("--tareas", nargs="+", choices=TAREAS, default=list(TAREAS))
+    parser.add_argument("--particion", choices=["etapa", "rango"], default="etapa")
+    parser.add_argument("--tamano", type=int, default=2000, help="contratos por bloque con --particion rango")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count())
+    parser.add_argument("--reporte", help="además genera el zip de exportación en esta ruta")
+    parser.add_argument("--seco", action="store_true", help="calcula sin escribir en la base")
+    parser.add_argument("--sintetico", type=int, help="usa N contratos sintéticos en memoria")
+    args = parser.parse_args(argv)
+
+    inicio = time.perf_counter()
+    if args.sintetico:
+        from benchmarks import sintetico
+        from modulos.cliente_local import ClienteLocal
+        supabase = ClienteLocal(sintetico.generar(args.sintetico))
+    else:
+        supabase = conectar()
+
+    hoy = pd.Timestamp.now().normalize()
+    marca = datetime.now(timezone.utc).isoformat()
+    base = antiguedad.leer(supabase)
+    ventas = datos.cargar_ventas(supabase)
+    etapas = ventas.set_index("id")["etapa"]
+    if "comisiones" in args.tareas:
+        base = base.merge(ventas[["id", "vendedor_id", "comision_monto"]], on="id", how="left")
+        pagos = pd.DataFrame(datos.consultar(supabase, "pagos", "venta_id, fecha, monto"),
+                             columns=["venta_id", "fecha", "monto"])
+    bloques = particionar(base, etapas, args.particion, args.tamano)
+    pagos = repartir_pagos(pagos, bloques) if "comisiones" in args.tareas else repeat(None)
+    print(f"{len(base)} contratos en {len(bloques)} bloques ({args.particion}), "
+          f"lectura {time.perf_counter() - inicio:.1f}s", file=sys.stderr)
+
+    paso = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.procesos) as pool:
+        parciales = list(pool.map(calcular_particion, bloques, pagos, repeat(hoy), repeat(args.tareas)))
+    print(f"cálculo en {args.procesos} procesos: {time.perf_counter() - paso:.1f}s", file=sys.stderr)
+
+    convertir = {"antiguedad": filas_antiguedad, "plan": filas_plan, "comisiones": filas_comisiones}
+    for tarea in args.tareas:
+        df = pd.concat([p[tarea] for p in parciales], ignore_index=True)
+        filas = convertir[tarea](df, hoy, marca)
+        if args.seco:
+            print(f"{tarea}: {len(filas)} filas (sin escribir)", file=sys.stderr)
+            continue
+        paso = time.perf_counter()
+        escribir(supabase, tarea, filas, marca)
+        print(f"{tarea}: {len(filas)} filas guardadas en {time.perf_counter() - paso:.1f}s", file=sys.stderr)
+
+    if args.reporte:
+        # La antigüedad ya calculada en esta corrida, del mismo cliente
+        cartera = (pd.concat([p["antiguedad"] for p in parciales], ignore_index=True)
+                   if "antiguedad" in args.tareas else None)
+        total = exportacion.exportar(supabase, args.reporte, cartera=cartera)
+        print(f"reporte: {total} contratos en {args.reporte}", file=sys.stderr)
+
+    print(f"total {time.perf_counter() - inicio:.1f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())